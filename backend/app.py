@@ -1,106 +1,266 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, send_from_directory
+import json
+import os
 import requests
-from textblob import TextBlob
 from flask_cors import CORS
-from modules.summarizer import generate_summary   # 🧠 NEW
-from modules.tts_generator import generate_audio   # 🔊 NEW
+from modules.tts_generator import store as audio_store, AUDIO_DIR, AUDIO_URL   # 🔊 NEW
+from modules.jobs import JobStore
+from modules.response_cache import ResponseCache
+from stocklens.sentiment import analyze_sentiment, analyze_sentiments  # noqa: F401  (batch scorer, same thresholds)
+from stocklens.http_client import HTTPClient, CircuitOpenError
+from stocklens import metrics, serving
+from stocklens.core import StockLens
+from stocklens.daemon import WatchlistDaemon
+from stocklens.summarizer import FAILED_SUMMARY as SDK_FAILED_SUMMARY
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Your n8n webhook URL (production URL)
 N8N_WEBHOOK = "https://owl-winning-legally.ngrok-free.app/webhook/sentiment"
+# (connect, read) timeouts so a slow n8n instance cannot hold a worker forever
+N8N_TIMEOUT = (5, 30)
 
-def analyze_sentiment(text):
-    """Returns sentiment label and score based on polarity."""
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
-    if polarity > 0.1:
-        sentiment = "Positive"
-    elif polarity < -0.1:
-        sentiment = "Negative"
-    else:
-        sentiment = "Neutral"
-    return sentiment, round(polarity, 2)
+# Shared n8n client: keep-alive pool, bounded concurrency, jittered retries, circuit breaker,
+# and concurrent requests for the same stock coalesced into one upstream call
+n8n = HTTPClient(timeout=N8N_TIMEOUT, max_concurrency=16, retries=2, headers={"ngrok-skip-browser-warning": "true"})
 
-@app.route("/api/sentiment", methods=["GET"])
-def get_sentiment():
-    """Fetch stock news from n8n, analyze sentiment, summarize, and generate audio."""
-    symbol = request.args.get("stock", "")
-    if not symbol:
-        return jsonify({"error": "Please provide a stock symbol, e.g., ?stock=INFY"}), 400
+# Summary + audio run here in async mode, off the request thread
+jobs = JobStore(max_workers=2)
 
-    print(f"🔹 Requested stock: {symbol}")
+# Finished /api/sentiment responses per symbol: fresh for 60 s, then served stale for up to
+# 5 more minutes while one background refresh reruns the pipeline
+SENTIMENT_TTL = 60
+SENTIMENT_STALE_TTL = 300
+responses = ResponseCache(ttl=SENTIMENT_TTL, stale_ttl=SENTIMENT_STALE_TTL)
+
+FAILED_SUMMARY = "Summary generation failed."
+
+# Optional pre-computation: STOCKLENS_WATCHLIST="INFY,TCS" keeps those symbols refreshed in the
+# background every STOCKLENS_WATCH_INTERVAL seconds and puts each result in the response cache,
+# so requests for them are answered from memory. The cache is per process, so the daemon only
+# starts with STOCKLENS_WATCHLIST_DAEMON=1, meant for a single-process server (python app.py,
+# gunicorn -w 1 --threads N); with several workers each would refresh the whole watchlist itself
+WATCHLIST = os.environ.get("STOCKLENS_WATCHLIST", "").replace(",", " ").split()
+WATCH_INTERVAL = float(os.environ.get("STOCKLENS_WATCH_INTERVAL", SENTIMENT_TTL))
+WATCH_DAEMON = os.environ.get("STOCKLENS_WATCHLIST_DAEMON", "").lower() in ("1", "true", "yes")
 
-    # 1️⃣ Fetch news from n8n webhook
+# /metrics also reports the n8n client's counters and how many responses are cached
+metrics.REGISTRY.add_collector(lambda: {f"n8n_{name}_total": value for name, value in n8n.stats.items()})
+metrics.REGISTRY.add_collector(lambda: {"response_cache_entries": len(responses)})
+
+# Optional shared model worker: with STOCKLENS_INFERENCE=127.0.0.1:6011 (python -m stocklens.serving)
+# every web worker sends its summaries there, batched with the others, instead of loading its own BART
+inference = serving.remote_client()
+if inference is not None:
+    metrics.REGISTRY.add_collector(lambda: {"inference_worker_up": float(inference.breaker.state == "closed")})
+
+
+# The request pipeline is the SDK's: fetch -> score -> aggregate -> summarize -> speak as
+# stocklens.pipeline stages, sharing the n8n client and the audio directory served below
+sl = StockLens(N8N_WEBHOOK, audio_output_dir=AUDIO_DIR, http_client=n8n, background_audio=True)
+
+
+def summarize_and_speak(articles, symbol):
+    """Generate the LLM summary and TTS audio; failures degrade to a placeholder summary and no audio."""
     try:
-        n8n_url = f"{N8N_WEBHOOK}?stock={symbol}"
-        print(f"🔗 Fetching from n8n: {n8n_url}")
-        response = requests.get(n8n_url)
-        print(f"📦 n8n Response Code: {response.status_code}")
+        print("📝 Generating summary, queueing audio...")
+        # Scored articles are passed in, so only the summary and audio stages run
+        ctx = sl.run_stages(symbol, ["summary", "audio"], score=articles)
+        audio_url = AUDIO_URL + os.path.basename(ctx["audio"]) if ctx["audio"] else None  # synthesis runs in the background
+        print("✅ Summary generated, audio queued")
+        return {"summary_text": ctx["summary"], "audio_url": audio_url}
     except Exception as e:
-        print("❌ Error fetching from n8n:", e)
-        return jsonify({"error": "Failed to reach n8n webhook"}), 500
+        print("⚠️ LLM or TTS Error:", e)
+        return {"summary_text": FAILED_SUMMARY, "audio_url": None}
 
-    if response.status_code != 200:
-        return jsonify({"error": "Failed to fetch news from n8n"}), 500
 
+def fetch_and_score(symbol):
+    """Fetch stock news from n8n and score per-article and overall sentiment; returns ``(body, status)``."""
     try:
-        data = response.json()
-        print("✅ Data received from n8n")
-    except Exception as e:
+        print(f"🔗 Fetching from n8n and scoring: {N8N_WEBHOOK}?stock={symbol}")
+        ctx = sl.run_stages(symbol, ["aggregate"])
+    except CircuitOpenError as e:
+        print("⛔ n8n circuit open:", e)
+        return {"error": "News service temporarily unavailable, try again shortly"}, 503
+    except requests.HTTPError as e:
+        print(f"📦 n8n Response Code: {e.response.status_code if e.response is not None else '?'}")
+        return {"error": "Failed to fetch news from n8n"}, 500
+    except ValueError as e:
         print("❌ JSON parse error:", e)
-        return jsonify({"error": "Invalid JSON from n8n"}), 500
-
-    # 2️⃣ Unwrap if it's a list
-    if isinstance(data, list) and len(data) > 0:
-        data = data[0]
-
-    # 3️⃣ Ensure symbol is consistent
-    data["symbol"] = symbol.upper()
-
-    # 4️⃣ Perform sentiment analysis
-    print("🧠 Analyzing sentiment for articles...")
-    for article in data.get("articles", []):
-        combined_text = f"{article['headline']} {article['summary']}"
-        sentiment, score = analyze_sentiment(combined_text)
-        article["sentiment"] = sentiment
-        article["score"] = score
+        return {"error": "Invalid JSON from n8n"}, 500
+    except Exception as e:
+        print("❌ Error fetching from n8n:", e)
+        return {"error": "Failed to reach n8n webhook"}, 500
+
+    data = ctx["news"]
+    data["overall_sentiment"] = ctx["aggregate"]
     print("✅ Sentiment analysis complete")
+    return data, 200
+
+
+def cacheable_summary(summary_text):
+    """Responses whose summary failed (the backend's placeholder or the SDK's) are never cached or given an ETag."""
+    return summary_text not in (FAILED_SUMMARY, SDK_FAILED_SUMMARY)
 
-    # 5️⃣ Compute overall sentiment
-    sentiments = [a["sentiment"] for a in data.get("articles", [])]
-    pos, neg, neu = sentiments.count("Positive"), sentiments.count("Negative"), sentiments.count("Neutral")
-    total = len(sentiments)
-    overall = "Positive"
-    if neg > pos:
-        overall = "Negative"
-    elif pos == neg:
-        overall = "Neutral"
-    data["overall_sentiment"] = {
-        "positive_articles": pos,
-        "negative_articles": neg,
-        "neutral_articles": neu,
-        "total_articles": total,
-        "overall": overall
-    }
-
-    # 6️⃣ Generate LLM-based summary and TTS audio
-    try:
-        print("📝 Generating summary...")
-        summary_text = generate_summary(data.get("articles", []))
-        print("🔊 Generating audio...")
-        audio_path = generate_audio(summary_text, symbol)
-        data["summary_text"] = summary_text
-        data["audio_url"] = audio_path
-        print("✅ Summary and audio generated successfully")
-    except Exception as e:
-        data["summary_text"] = "Summary generation failed."
-        data["audio_url"] = None
-        print("⚠️ LLM or TTS Error:", e)
 
+def build_sentiment_response(symbol):
+    """The full synchronous pipeline; returns ``(body, status, cacheable)`` for the response cache."""
+    data, status = fetch_and_score(symbol)
+    if status != 200:
+        return data, status, False
+    data.update(summarize_and_speak(data.get("articles", []), symbol))
     print("✅ Completed processing request for:", symbol)
-    return jsonify(data)
+    return data, 200, cacheable_summary(data["summary_text"])
+
+
+def publish_snapshot(symbol, snap):
+    """Store a watchlist daemon result in the response cache, in the same shape /api/sentiment returns."""
+    if not cacheable_summary(snap.get("summary_text")):
+        return
+    body = {k: v for k, v in snap.items() if k not in ("analysis", "news_digest", "updated", "audio_path")}
+    body["audio_url"] = AUDIO_URL + os.path.basename(snap["audio_path"]) if snap.get("audio_path") else None
+    responses.put(symbol, body)
+
+
+watchlist = None
+# Under `python app.py` the reloader's watcher process imports this module too; only the server it spawns runs the daemon
+_reloader_watcher = __name__ == "__main__" and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+if WATCHLIST and not WATCH_DAEMON:
+    print("⚠️ STOCKLENS_WATCHLIST is set but STOCKLENS_WATCHLIST_DAEMON=1 is not; the watchlist is not refreshed here")
+elif WATCHLIST and not _reloader_watcher:
+    watchlist = WatchlistDaemon(sl, WATCHLIST, interval=WATCH_INTERVAL, on_result=publish_snapshot).start()
+    print("👀 Keeping watchlist warm:", ", ".join(WATCHLIST))
+
+
+def _cached_response(entry, state):
+    """JSON response with ETag/Cache-Control so browsers and CDNs can reuse it (304 on If-None-Match)."""
+    resp = jsonify(entry["body"])
+    resp.status_code = entry["status"]
+    resp.headers["X-Cache"] = state.upper()
+    if entry["status"] != 200 or not cacheable_summary(entry["body"].get("summary_text")):
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+    max_age = 0 if state == "stale" else responses.max_age(entry)
+    resp.headers["Cache-Control"] = f"public, max-age={max_age}, stale-while-revalidate={SENTIMENT_STALE_TTL}"
+    resp.set_etag(entry["etag"])
+    return resp.make_conditional(request)
+
+
+@app.route("/api/sentiment", methods=["GET"])
+def get_sentiment():
+    """Fetch stock news from n8n, analyze sentiment, summarize, and generate audio.
+
+    Responses are cached per symbol (``ResponseCache``): repeats within the TTL are served
+    from memory, slightly older ones are served stale while refreshing in the background,
+    and concurrent requests for one symbol share a single pipeline run.
+
+    With ``?async=1`` the response is returned as soon as sentiment is scored; summary and
+    audio follow via ``job_id`` (poll ``/api/jobs/<job_id>`` or stream ``/api/jobs/<job_id>/events``).
+    A cached full response is returned directly instead.
+    """
+    symbol = request.args.get("stock", "")
+    if not symbol:
+        return jsonify({"error": "Please provide a stock symbol, e.g., ?stock=INFY"}), 400
+    run_async = request.args.get("async", "").lower() in ("1", "true", "yes")
+    key = symbol.strip().upper()
+
+    print(f"🔹 Requested stock: {symbol}")
+
+    if not run_async or responses.get(key)[0] is not None:
+        entry, state = responses.get_or_compute(key, lambda: build_sentiment_response(symbol))
+        metrics.inc("sentiment_requests", cache=state)
+        return _cached_response(entry, state)
+
+    metrics.inc("sentiment_requests", cache="async")
+    data, status = fetch_and_score(symbol)
+    if status != 200:
+        return jsonify(data), status
+
+    # 6️⃣ Generate LLM-based summary and TTS audio in the background; the finished response is cached
+    base = dict(data)
+    articles = [dict(a) for a in data.get("articles", [])]
+
+    def summarize_and_cache():
+        result = summarize_and_speak(articles, symbol)
+        responses.put(key, {**base, **result}, cacheable=cacheable_summary(result["summary_text"]))
+        return result
+
+    job_id = jobs.submit(data["symbol"], summarize_and_cache)
+    data["job_id"] = job_id
+    data["summary_status"] = "pending"
+    data["summary_text"] = None
+    data["audio_url"] = None
+    print("⏳ Summary and audio queued as job", job_id)
+    return jsonify(data), 202
+
+
+def _job_view(job):
+    view = {"job_id": job["job_id"], "symbol": job["symbol"], "status": job["status"]}
+    if job["status"] == "done":
+        view.update(job["result"])
+    elif job["status"] == "error":
+        view["error"] = job["error"]
+    return view
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Poll an async summary/audio job started by /api/sentiment?async=1."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+    return jsonify(_job_view(job))
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Server-Sent Events stream that emits one ``done``/``error`` event when the job finishes."""
+    if jobs.get(job_id) is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+
+    def stream():
+        while True:
+            job = jobs.wait(job_id, timeout=15)
+            if job is None:
+                return
+            if job["status"] != "pending":
+                yield f"event: {job['status']}\ndata: {json.dumps(_job_view(job))}\n\n"
+                return
+            yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/api/audio/<name>", methods=["GET"])
+def get_audio(name):
+    """Serve a summary's audio, or 503 with ``Retry-After`` at once while it is still being synthesized.
+
+    The pending state is read from markers in the audio directory, so any worker process can answer.
+    """
+    state = audio_store.status(name)
+    if state == "ready":
+        # Names are content hashes, so a file never changes once written
+        return send_from_directory(os.path.abspath(audio_store.output_dir), os.path.basename(name), max_age=86400)
+    if state == "pending":
+        return jsonify({"status": "pending"}), 503, {"Retry-After": "2"}
+    if state == "failed":
+        print("⚠️ TTS generation failed:", audio_store.error(name))
+        return jsonify({"error": "Audio generation failed"}), 404
+    return jsonify({"error": "Unknown audio file"}), 404
+
+
+@app.route("/api/watchlist", methods=["GET"])
+def get_watchlist():
+    """Refresh schedule and health of the pre-computed watchlist (empty when none is configured)."""
+    return jsonify(watchlist.status() if watchlist is not None else {})
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Per-stage latency histograms and counters in the Prometheus text format."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 
 @app.route("/")
@@ -0,0 +1,63 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobStore:
+    """Runs slow follow-up work (summary + audio) off the request thread and keeps results for polling.
+
+    Jobs are plain dicts: ``{"job_id", "symbol", "status", "result", "error"}`` with status
+    ``pending`` -> ``done`` | ``error``. Finished jobs are dropped after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_workers=2, ttl=600):
+        # Model inference is CPU-bound; a small dedicated pool keeps it from starving request threads
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, symbol, fn, *args):
+        self._expire()
+        job_id = uuid.uuid4().hex
+        job = {"job_id": job_id, "symbol": symbol, "status": "pending", "result": None, "error": None,
+               "created": time.time(), "done_event": threading.Event()}
+        with self._lock:
+            self._jobs[job_id] = job
+        self.executor.submit(self._run, job, fn, *args)
+        return job_id
+
+    def _run(self, job, fn, *args):
+        try:
+            job["result"] = fn(*args)
+            job["status"] = "done"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "error"
+        finally:
+            job["finished"] = time.time()
+            job["done_event"].set()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {k: v for k, v in job.items() if k != "done_event"}
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job finishes (or ``timeout``); returns the job view, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job["done_event"].wait(timeout)
+        return self.get(job_id)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            stale = [jid for jid, job in self._jobs.items() if job.get("finished", time.time()) < cutoff]
+            for jid in stale:
+                del self._jobs[jid]
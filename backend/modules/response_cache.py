@@ -0,0 +1,120 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def etag_for(body):
+    """Strong ETag (unquoted) for a JSON-serializable response body."""
+    payload = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Per-key response cache with TTL, stale-while-revalidate and single-flight computation.
+
+    - Fresh (younger than ``ttl``): served from memory.
+    - Stale (within a further ``stale_ttl``): served immediately while one background
+      refresh recomputes it.
+    - Missing/expired: the first request computes it; concurrent requests for the same
+      key wait for that result instead of running the pipeline again.
+
+    ``compute`` returns ``(body, status)`` or ``(body, status, cacheable)``; only
+    cacheable 200 responses are stored. Entries are dicts
+    ``{"body", "status", "etag", "created"}``.
+    """
+
+    def __init__(self, ttl=60, stale_ttl=300, max_entries=512, refresh_workers=2):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, "miss"
+        age = time.time() - entry["created"]
+        if age < self.ttl:
+            self._entries.move_to_end(key)
+            return entry, "hit"
+        if age < self.ttl + self.stale_ttl:
+            return entry, "stale"
+        del self._entries[key]
+        return None, "miss"
+
+    def get(self, key):
+        """Return ``(entry, state)`` without computing anything; state is ``hit``, ``stale`` or ``miss``."""
+        with self._lock:
+            return self._lookup(key)
+
+    def get_or_compute(self, key, compute):
+        """Return ``(entry, state)`` where state is ``hit``, ``stale``, ``miss`` or ``coalesced``."""
+        with self._lock:
+            entry, state = self._lookup(key)
+            if state == "hit":
+                return entry, state
+            if state == "stale":
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._refresher.submit(self._refresh, key, compute)
+                return entry, state
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {"done": threading.Event(), "entry": None, "error": None}
+        if not leader:
+            flight["done"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["entry"], "coalesced"
+        try:
+            flight["entry"] = self._compute(key, compute)
+            return flight["entry"], "miss"
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight["done"].set()
+
+    def put(self, key, body, status=200, cacheable=True):
+        entry = {"body": body, "status": status, "etag": etag_for(body), "created": time.time()}
+        if status == 200 and cacheable:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def max_age(self, entry):
+        """Seconds a client may keep reusing ``entry`` without revalidating."""
+        return max(0, int(self.ttl - (time.time() - entry["created"])))
+
+    def _compute(self, key, compute):
+        return self.put(key, *compute())
+
+    def _refresh(self, key, compute):
+        try:
+            self._compute(key, compute)
+        except Exception as e:
+            print("⚠️ Background refresh failed for", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
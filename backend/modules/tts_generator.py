@@ -1,21 +1,15 @@
-from gtts import gTTS
-import os, time
+import os
 
-def generate_audio(summary_text, symbol):
-    # Ensure audio folder exists
-    audio_dir = os.path.join("static", "audio")
-    os.makedirs(audio_dir, exist_ok=True)
+# Shared with the SDK: pluggable engines (offline pyttsx3/espeak first, gTTS as fallback),
+# one background synthesis queue, files named by text hash and pruned to a size budget
+from stocklens.tts import audio_store
+
+AUDIO_DIR = os.path.join("static", "audio")
+AUDIO_URL = "/api/audio/"
 
-    if not summary_text or summary_text.strip() == "":
-        summary_text = "No summary text available for this stock."
+store = audio_store(AUDIO_DIR)
 
-    filename = f"{symbol}_{int(time.time())}.mp3"
-    filepath = os.path.join(audio_dir, filename)
 
-    try:
-        tts = gTTS(summary_text)
-        tts.save(filepath)
-        return f"/static/audio/{filename}"
-    except Exception as e:
-        print("⚠️ TTS generation failed:", e)
-        return None
+def generate_audio(summary_text, symbol):
+    """Queue speech for ``summary_text`` and return its URL at once; the URL serves the file when it is ready."""
+    return AUDIO_URL + os.path.basename(store.submit(summary_text))
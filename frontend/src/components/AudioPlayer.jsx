@@ -1,5 +1,26 @@
+import { useEffect, useRef, useState } from "react";
+
+// The backend answers 503 while the audio is still being synthesized; retry every 2 s for up to a minute
+const RETRY_MS = 2000;
+const MAX_RETRIES = 30;
+
 export default function AudioPlayer({ audioUrl }) {
+  const [attempt, setAttempt] = useState(0);
+  const timer = useRef(null);
+
+  useEffect(() => {
+    setAttempt(0);
+    return () => clearTimeout(timer.current);
+  }, [audioUrl]);
+
   if (!audioUrl) return null;
+
+  const retry = () => {
+    if (attempt < MAX_RETRIES) {
+      timer.current = setTimeout(() => setAttempt((n) => n + 1), RETRY_MS);
+    }
+  };
+  const src = `${import.meta.env.VITE_API_URL}${audioUrl}${attempt ? `?retry=${attempt}` : ""}`;
   
   return (
     <div className="space-y-4">
@@ -14,7 +35,8 @@ export default function AudioPlayer({ audioUrl }) {
         <div className="flex items-center justify-center">
           <audio 
             controls 
-            src={`${import.meta.env.VITE_API_URL}${audioUrl}`} 
+            src={src}
+            onError={retry}
             className="w-full max-w-md bg-dark-700 rounded-lg"
             style={{
               filter: 'invert(1) hue-rotate(180deg)',
@@ -10,19 +10,45 @@ export default function Dashboard() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
 
+  const pollJob = async (jobId) => {
+    // Summary and audio are produced in the background; poll until the job settles
+    for (let attempt = 0; attempt < 120; attempt++) {
+      const res = await axios.get(`${import.meta.env.VITE_API_URL}/api/jobs/${jobId}`);
+      if (res.data.status !== "pending") return res.data;
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+    return { status: "error" };
+  };
+
   const handleSearch = async (symbol) => {
     setLoading(true);
     setError("");
     setData(null);
 
     try {
-      console.log("Calling API:", `${import.meta.env.VITE_API_URL}/api/sentiment?stock=${symbol}`);
+      console.log("Calling API:", `${import.meta.env.VITE_API_URL}/api/sentiment?stock=${symbol}&async=1`);
 
       const res = await axios.get(
-        `${import.meta.env.VITE_API_URL}/api/sentiment?stock=${symbol}`
+        `${import.meta.env.VITE_API_URL}/api/sentiment?stock=${symbol}&async=1`
       );
 
+      // Sentiment arrives first; render it right away
       setData(res.data);
+      setLoading(false);
+
+      if (res.data.job_id) {
+        const job = await pollJob(res.data.job_id);
+        setData((prev) =>
+          prev && prev.job_id === res.data.job_id
+            ? {
+                ...prev,
+                summary_status: job.status,
+                summary_text: job.status === "done" ? job.summary_text : "Summary generation failed.",
+                audio_url: job.status === "done" ? job.audio_url : null,
+              }
+            : prev
+        );
+      }
     } catch (err) {
       console.error(err);
       setError("❌ Failed to fetch sentiment data. Please try again.");
@@ -91,6 +117,11 @@ export default function Dashboard() {
             </div>
 
             {/* AI Summary Text */}
+            {data.summary_status === "pending" && (
+              <div className="glass-effect rounded-2xl p-8 text-center">
+                <p className="text-gray-300 text-lg font-medium">🧠 Generating AI summary and audio...</p>
+              </div>
+            )}
             {data.summary_text && (
               <div className="glass-effect rounded-2xl p-8 card-hover">
                 <div className="flex items-center mb-6">
@@ -0,0 +1,71 @@
+"""Offline benchmark suite for the StockLens pipeline (asv-style, stdlib only).
+
+Each ``bench_*.py`` module registers cases with ``@benchmark``. A case is a setup
+function that receives one parameter value and returns the zero-argument callable to
+time; setup cost (loading fixtures, warming models) is never measured. Setup raises
+``SkipBenchmark`` when an optional dependency such as transformers is missing.
+
+Network I/O is replaced by recorded fixtures (``benchmarks/data``): price histories are
+served by ``LocalFileProvider`` and news payloads by a local HTTP server speaking the
+n8n webhook's format, so timings are reproducible and offline.
+
+Run from ``sdk_python``::
+
+    python -m benchmarks                       # run everything, compare with baseline.json
+    python -m benchmarks -k indicators         # only cases whose name contains "indicators"
+    python -m benchmarks --save-baseline       # record the current numbers as the baseline
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark's setup when it cannot run here (e.g. an optional dependency is missing)."""
+
+
+class Benchmark:
+    def __init__(self, name: str, setup: Callable[[Any], Callable[[], Any]], params: Sequence[Any],
+                 items: Optional[Callable[[Any], int]], unit: str):
+        self.name = name
+        self.setup = setup
+        self.params = list(params)
+        self.items = items
+        self.unit = unit
+
+    def case_name(self, param) -> str:
+        return self.name if param is None else f"{self.name}[{param}]"
+
+
+REGISTRY: List[Benchmark] = []
+
+
+def benchmark(name: Optional[str] = None, *, params: Sequence[Any] = (None,), items: Optional[Callable[[Any], int]] = None,
+              unit: str = "items"):
+    """Register a benchmark setup function.
+
+    ``params`` runs one case per value (the value is passed to the setup function).
+    ``items(param)`` is the amount of work per call (bars, texts, requests...) and turns
+    the timing into a throughput in ``unit``/s.
+    """
+
+    def decorate(setup):
+        module = setup.__module__.rsplit(".", 1)[-1].replace("bench_", "")
+        REGISTRY.append(Benchmark(f"{module}.{name or setup.__name__}", setup, params, items, unit))
+        return setup
+
+    return decorate
+
+
+def load_all() -> List[Benchmark]:
+    """Import every ``bench_*`` module so its cases register; returns the registry."""
+    import importlib
+    import pkgutil
+
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("bench_"):
+            importlib.import_module(f"{__name__}.{info.name}")
+    # Group by module (imports between bench modules would otherwise interleave them)
+    return sorted(REGISTRY, key=lambda bench: bench.name.split(".", 1)[0])
+
+
+__all__ = ["Benchmark", "REGISTRY", "SkipBenchmark", "benchmark", "load_all"]
+
@@ -0,0 +1,163 @@
+"""Run the benchmark suite and compare it with a stored baseline.
+
+Each case is warmed up once, then timed in ``repeat`` rounds of ``number`` calls, where
+``number`` is chosen so one round takes about ``--min-time`` seconds. The median
+per-call time is what gets compared: a case regresses when it is more than
+``--tolerance`` slower than its baseline, and the run exits with status 1.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Dict
+
+from . import SkipBenchmark, load_all
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def _calibrate(func, min_time: float) -> int:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            return number
+        number *= 10 if elapsed < min_time / 10 else 2
+
+
+def measure(func, *, min_time: float = 0.2, repeat: int = 5) -> Dict[str, float]:
+    func()  # warm-up: lazy imports, model loads, first-touch caches
+    number = _calibrate(func, min_time)
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return {
+        "median": statistics.median(rounds),
+        "min": min(rounds),
+        "mean": statistics.fmean(rounds),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def _environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "processor": platform.processor() or None,
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> Dict[str, float]:
+    """``{case: ratio}`` for cases slower than ``baseline`` by more than ``tolerance``."""
+    regressions = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "median" not in result or not base.get("median"):
+            continue
+        ratio = result["median"] / base["median"]
+        if ratio > 1 + tolerance:
+            regressions[name] = ratio
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="StockLens offline benchmark suite")
+    parser.add_argument("-k", dest="pattern", default=None, help="Only run cases whose name contains this substring")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Target seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--json", dest="json_out", default=None, help="Also write the results to this file")
+    parser.add_argument("--list", action="store_true", help="List cases without running them")
+    args = parser.parse_args(argv)
+
+    baseline, recorded = {}, {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            recorded = json.load(fh)
+        baseline = recorded.get("results", {})
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for bench in load_all():
+        for param in bench.params:
+            name = bench.case_name(param)
+            if args.pattern and args.pattern not in name:
+                continue
+            if args.list:
+                print(name)
+                continue
+            try:
+                # The code under test may print progress (the backend does); keep the report readable
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    func = bench.setup() if param is None else bench.setup(param)
+                    result = measure(func, min_time=args.min_time, repeat=args.repeat)
+            except SkipBenchmark as e:
+                print(f"{name:<48} skipped: {e}", flush=True)
+                continue
+            except Exception as e:
+                print(f"{name:<48} failed: {type(e).__name__}: {e}", flush=True)
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+                continue
+            line = f"{name:<48} {_format_time(result['median']):>10}"
+            if bench.items is not None:
+                items = bench.items(param)
+                result["throughput"] = items / result["median"]
+                line += f"  {result['throughput']:>12,.1f} {bench.unit}/s"
+            base = baseline.get(name, {}).get("median")
+            if base:
+                line += f"  x{result['median'] / base:.2f} vs baseline"
+            print(line, flush=True)
+            results[name] = result
+    if args.list:
+        return 0
+
+    environment = _environment()
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), **environment, "results": results}
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=1)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    failed = [name for name, result in results.items() if "error" in result]
+    regressions = compare(results, baseline, args.tolerance)
+    # Timings from another host say nothing about this change: report them, but do not fail on them
+    other_host = bool(baseline) and any(recorded.get(key) != value for key, value in environment.items())
+    label = "slower (baseline from another host)" if other_host else "REGRESSION"
+    for name, ratio in sorted(regressions.items(), key=lambda item: -item[1]):
+        print(f"{label} {name}: {ratio:.2f}x slower than baseline (tolerance {1 + args.tolerance:.2f}x)")
+    if not baseline:
+        print("No baseline to compare with; record one with --save-baseline")
+    elif other_host:
+        print(f"Note: the baseline was recorded on {recorded.get('machine')} ({recorded.get('cpus')} CPUs, "
+              f"Python {recorded.get('python')}, {recorded.get('created')}); this is {environment['machine']} "
+              f"({environment['cpus']} CPUs, Python {environment['python']}), so slowdowns are not treated as "
+              "regressions. Record a baseline here with --save-baseline to check for them.")
+    return 1 if failed or (regressions and not other_host) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Flask backend request throughput through the test client (no sockets for the API itself).
+
+The backend's ``StockLens`` is pointed at the local ``NewsServer``; summaries are
+pre-seeded in its result cache and TTS is replaced by a fixed path, as in ``bench_pipeline``.
+"""
+import importlib.util
+import os
+import sys
+
+from . import SkipBenchmark, benchmark
+from stocklens.result_cache import articles_digest
+
+from .fixtures import articles, news_server, symbols
+from .bench_pipeline import RECORDED_SUMMARY
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "backend")
+
+_app = None
+
+
+def _backend():
+    global _app
+    if _app is None:
+        if importlib.util.find_spec("flask") is None or importlib.util.find_spec("flask_cors") is None:
+            raise SkipBenchmark("flask/flask-cors are not installed")
+        if not os.path.exists(os.path.join(BACKEND_DIR, "app.py")):
+            raise SkipBenchmark(f"backend not found at {BACKEND_DIR}")
+        if BACKEND_DIR not in sys.path:
+            sys.path.insert(0, BACKEND_DIR)
+        import app
+
+        app.N8N_WEBHOOK = app.sl.n8n_webhook_url = news_server().url
+        for symbol in symbols():
+            app.sl.result_cache.set("summary:" + articles_digest(articles(symbol)), RECORDED_SUMMARY)
+        app.sl._speak = lambda summary_text, symbol: f"static/audio/{symbol}.mp3"
+        _app = app
+    return _app
+
+
+@benchmark(params=("miss", "hit", "not_modified"), items=lambda _: 1, unit="requests")
+def sentiment_request(mode):
+    """``miss`` runs the whole pipeline per request; ``hit`` is served from the response cache;
+    ``not_modified`` revalidates with ``If-None-Match`` and gets a bodyless 304."""
+    app = _backend()
+    client = app.app.test_client()
+    symbol = symbols()[0]
+    url = f"/api/sentiment?stock={symbol}"
+    first = client.get(url)
+    if first.status_code != 200:
+        raise SkipBenchmark(f"backend returned {first.status_code}: {first.get_data(as_text=True)[:200]}")
+    if mode == "miss":
+        def run():
+            app.responses.invalidate(symbol)
+            return client.get(url)
+
+        return run
+    if mode == "hit":
+        return lambda: client.get(url)
+    headers = {"If-None-Match": first.headers["ETag"]}
+    return lambda: client.get(url, headers=headers)
+
+
+@benchmark(items=lambda _: 1, unit="requests")
+def metrics_scrape():
+    client = _backend().app.test_client()
+    return lambda: client.get("/metrics")
@@ -0,0 +1,41 @@
+"""Near-duplicate detection over feed-sized article lists, with and without a populated signature index."""
+import copy
+
+from stocklens.dedup import SignatureIndex, dedupe
+
+from . import benchmark
+from .fixtures import articles, symbols
+
+FEED_SIZES = (12, 50, 200)
+
+
+def _feed(n):
+    recorded = [a for s in symbols() for a in articles(s)]
+    # Every third article is a re-headlined copy, as syndicated wire stories arrive
+    feed = []
+    for i in range(n):
+        article = dict(recorded[i % len(recorded)], id=i)
+        if i % 3 == 2:
+            article["headline"] = "UPDATE 1-" + article["headline"]
+        else:
+            article["summary"] = f"{article['summary']} ({i})"
+        feed.append(article)
+    return feed
+
+
+@benchmark(params=FEED_SIZES, items=lambda n: n, unit="articles")
+def dedupe_feed(n):
+    feed = _feed(n)
+    return lambda: dedupe(copy.deepcopy(feed))
+
+
+@benchmark(params=FEED_SIZES, items=lambda n: n, unit="articles")
+def dedupe_with_index(n):
+    """Every story is already in the index, so each one is matched and marked seen."""
+    feed = _feed(n)
+    index = SignatureIndex()
+    reps, sigs = dedupe(copy.deepcopy(feed))
+    for article in reps:
+        article.update(sentiment="Neutral", score=0.0)
+    index.add("BENCH", sigs, reps)
+    return lambda: dedupe(copy.deepcopy(feed), index=index, symbol="BENCH")
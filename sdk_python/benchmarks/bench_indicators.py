@@ -0,0 +1,54 @@
+"""Indicator engine: full recomputation across history lengths and universe widths, plus streaming updates."""
+from stocklens.backtest import backtest
+from stocklens.streaming import IndicatorState
+from stocklens.technicals import compute_indicators
+
+from . import benchmark
+from .fixtures import synthetic_closes, synthetic_ohlcv
+
+LENGTHS = (250, 1000, 5000)
+WIDTHS = (10, 100, 500)
+
+
+@benchmark(params=LENGTHS, items=lambda n: n, unit="bars")
+def compute_latest(n_bars):
+    data = synthetic_ohlcv(n_bars)
+    close, high, low = data["Close"].to_numpy(), data["High"].to_numpy(), data["Low"].to_numpy()
+    return lambda: compute_indicators(close, high, low)
+
+
+@benchmark(params=LENGTHS, items=lambda n: n, unit="bars")
+def compute_full_series(n_bars):
+    close = synthetic_closes(n_bars)
+    return lambda: compute_indicators(close, full=True)
+
+
+@benchmark(params=WIDTHS, items=lambda width: 250 * width, unit="bars")
+def compute_universe(width):
+    """One wide (250 x symbols) matrix, the path ``get_technical_indicators_many`` takes."""
+    close = synthetic_closes(250, width)
+    return lambda: compute_indicators(close)
+
+
+@benchmark(params=(1, 20), items=lambda n: n, unit="bars")
+def streaming_update(n_new):
+    """Folding ``n_new`` fresh bars into a warm ``IndicatorState`` (what a repeated ``analyze`` does)."""
+    data = synthetic_ohlcv(1000 + n_new)
+    close, high, low = data["Close"].to_numpy(), data["High"].to_numpy(), data["Low"].to_numpy()
+    stamps = list(data.index)
+    warm = IndicatorState()
+    warm.extend(close[:1000], stamps[:1000], high[:1000], low[:1000])
+    snapshot = warm.to_dict()
+
+    def run():
+        state = IndicatorState.from_dict(snapshot)
+        state.extend(close[1000:], stamps[1000:], high[1000:], low[1000:])
+        return state.values()
+
+    return run
+
+
+@benchmark(params=(1000, 5000), items=lambda n: n, unit="bars")
+def backtest_history(n_bars):
+    close = synthetic_closes(n_bars)
+    return lambda: backtest(close)
@@ -0,0 +1,63 @@
+"""End-to-end ``process_symbol``/``analyze`` with network I/O replaced by recorded fixtures.
+
+News comes from the local ``NewsServer`` through the real ``HTTPClient``, prices from
+``LocalFileProvider``, and summaries are pre-seeded in the ``ResultCache`` (what a
+repeat run with unchanged news sees), so the numbers cover everything except BART,
+gTTS and the remote round trips.
+"""
+from stocklens.core import StockLens
+from stocklens.http_client import HTTPClient
+from stocklens.result_cache import ResultCache, articles_digest
+
+from . import benchmark
+from .fixtures import articles, news_server, price_provider, symbols
+
+RECORDED_SUMMARY = "Recorded summary used by the benchmarks in place of a BART run."
+
+
+def _stocklens():
+    cache = ResultCache()
+    for symbol in symbols():
+        cache.set("summary:" + articles_digest(articles(symbol)), RECORDED_SUMMARY)
+    return StockLens(news_server().url, price_provider=price_provider(), result_cache=cache,
+                     http_client=HTTPClient(retries=0))
+
+
+@benchmark(items=lambda _: 1, unit="symbols")
+def process_symbol():
+    sl = _stocklens()
+    symbol = symbols()[0]
+    return lambda: sl.process_symbol(symbol, do_tts=False)
+
+
+@benchmark(params=(1, 4), items=lambda _: 12, unit="symbols")
+def process_symbols(workers):
+    sl = _stocklens()
+    watchlist = symbols() * (12 // len(symbols()) or 1)
+    return lambda: list(sl.process_symbols(watchlist, max_workers=workers, do_tts=False))
+
+
+@benchmark(params=("cold", "warm"), items=lambda _: 1, unit="symbols")
+def analyze(state):
+    """``cold`` seeds indicators from the full history each call; ``warm`` folds in only recent bars."""
+    sl = _stocklens()
+    symbol = symbols()[0]
+    sl.analyze(symbol)
+    if state == "warm":
+        return lambda: sl.analyze(symbol)
+
+    def run():
+        sl._indicator_states.clear()
+        return sl.analyze(symbol)
+
+    return run
+
+
+@benchmark(items=lambda _: len(symbols()), unit="symbols")
+def technical_indicators_many():
+    from stocklens.indicators import get_technical_indicators_many
+
+    provider = price_provider()
+    names = symbols()
+    get_technical_indicators_many(names, provider=provider)
+    return lambda: get_technical_indicators_many(names, provider=provider)
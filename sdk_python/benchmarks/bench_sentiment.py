@@ -0,0 +1,39 @@
+"""Article sentiment scoring across batch sizes (lexicon scorer vs. one TextBlob per text)."""
+import importlib.util
+
+from stocklens.models import get_model
+from stocklens.sentiment import analyze_sentiment, analyze_sentiments
+
+from . import SkipBenchmark, benchmark
+from .fixtures import article_texts
+
+BATCH_SIZES = (1, 32, 256)
+
+
+def _texts(n):
+    texts = article_texts()
+    # Distinct strings so the batch scorer's duplicate folding does not shrink the work
+    return [f"{texts[i % len(texts)]} ({i})" for i in range(n)]
+
+
+@benchmark(params=BATCH_SIZES, items=lambda n: n, unit="texts")
+def lexicon_batch(batch_size):
+    texts = _texts(batch_size)
+    get_model("sentiment_lexicon")
+    return lambda: analyze_sentiments(texts)
+
+
+@benchmark(params=BATCH_SIZES, items=lambda n: n, unit="texts")
+def textblob_per_text(batch_size):
+    texts = _texts(batch_size)
+    analyze_sentiment(texts[0])
+    return lambda: [analyze_sentiment(t) for t in texts]
+
+
+@benchmark(params=(8, 32), items=lambda n: n, unit="texts")
+def transformer_batch(batch_size):
+    if importlib.util.find_spec("transformers") is None:
+        raise SkipBenchmark("transformers is not installed")
+    texts = _texts(batch_size)
+    analyze_sentiments(texts[:1], backend="transformer")
+    return lambda: analyze_sentiments(texts, backend="transformer", batch_size=batch_size)
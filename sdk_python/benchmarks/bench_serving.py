@@ -0,0 +1,43 @@
+"""Shared inference worker: transport overhead, and concurrent summaries with and without micro-batching.
+
+The worker runs in this process on an ephemeral port, so both modes share one model copy
+and the difference is batching alone: ``in-process`` callers each run their own
+batch-of-one forward passes; ``worker`` callers are collected into padded batches.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from stocklens.serving import InferenceClient, InferenceServer
+
+from . import benchmark
+from .bench_summarizer import _require_model
+from .fixtures import articles, symbols
+
+CALLERS = 8
+
+
+def _worker():
+    server = InferenceServer("127.0.0.1:0").start()
+    return server, InferenceClient(server.address, fallback=False)
+
+
+@benchmark(items=lambda _: 1, unit="requests")
+def round_trip():
+    _, client = _worker()
+    client.ping()
+    return client.ping
+
+
+@benchmark(params=("in-process", "worker"), items=lambda _: CALLERS, unit="summaries")
+def concurrent_summaries(mode):
+    _require_model()
+    from stocklens.summarizer import summarize_local
+
+    names = symbols()
+    sets = [articles(names[i % len(names)]) for i in range(CALLERS)]
+    if mode == "worker":
+        _, client = _worker()
+        summarize = client.summarize
+    else:
+        summarize = summarize_local
+    pool = ThreadPoolExecutor(max_workers=CALLERS)
+    return lambda: list(pool.map(lambda news: summarize([news], 1), sets))
@@ -0,0 +1,39 @@
+"""Summarization throughput: one symbol at a time vs. batched across symbols.
+
+Runs whichever model ``STOCKLENS_SUMMARIZER`` selects (fp32 BART by default); see
+``benchmarks.summary_quality`` for comparing backends against each other.
+"""
+import importlib.util
+
+from . import SkipBenchmark, benchmark
+from .fixtures import articles, symbols
+
+
+def _require_model():
+    if importlib.util.find_spec("transformers") is None or importlib.util.find_spec("torch") is None:
+        raise SkipBenchmark("transformers/torch are not installed")
+    from stocklens.models import get_model
+
+    try:
+        get_model("summarizer")
+    except Exception as e:  # e.g. no cached weights and no network
+        raise SkipBenchmark(f"summarizer model unavailable: {e}")
+
+
+@benchmark(items=lambda _: 1, unit="summaries")
+def generate_summary():
+    _require_model()
+    from stocklens.summarizer import generate_summary
+
+    news = articles(symbols()[0])
+    return lambda: generate_summary(news)
+
+
+@benchmark(params=(1, 3, 9), items=lambda n: n, unit="summaries")
+def generate_summaries(n_sets):
+    _require_model()
+    from stocklens.summarizer import generate_summaries
+
+    names = symbols()
+    sets = [articles(names[i % len(names)]) for i in range(n_sets)]
+    return lambda: generate_summaries(sets)
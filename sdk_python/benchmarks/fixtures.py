@@ -0,0 +1,174 @@
+"""Recorded inputs for the benchmarks and the stub services that serve them.
+
+- ``data/news/{SYMBOL}.json``: n8n webhook payloads (``[{"stock", "articles": [...]}]``).
+- ``data/prices/{SYMBOL}_1d.csv``: daily OHLCV histories, read through ``LocalFileProvider``.
+
+``python -m benchmarks.fixtures record INFY TCS --webhook URL`` replaces them with a
+live recording (prices from the default Yahoo chain); ``python -m benchmarks.fixtures
+generate`` rebuilds the price files from a seeded random walk for fully offline setups.
+"""
+import argparse
+import json
+import os
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+NEWS_DIR = os.path.join(DATA_DIR, "news")
+PRICE_DIR = os.path.join(DATA_DIR, "prices")
+
+
+def symbols() -> List[str]:
+    """Symbols that have both a news payload and a price history."""
+    news = {name[:-5] for name in os.listdir(NEWS_DIR) if name.endswith(".json")}
+    prices = {name.split("_")[0] for name in os.listdir(PRICE_DIR) if name.endswith(".csv")}
+    return sorted(news & prices)
+
+
+@lru_cache(maxsize=None)
+def _news_bytes(symbol: str) -> bytes:
+    with open(os.path.join(NEWS_DIR, f"{symbol.upper()}.json"), "rb") as fh:
+        return fh.read()
+
+
+def news_payload(symbol: str) -> Any:
+    """The recorded webhook response for ``symbol`` (a fresh copy on every call)."""
+    return json.loads(_news_bytes(symbol))
+
+
+def articles(symbol: str) -> List[Dict[str, Any]]:
+    payload = news_payload(symbol)
+    return (payload[0] if isinstance(payload, list) else payload).get("articles", [])
+
+
+def article_texts() -> List[str]:
+    """Every recorded headline + summary, in a stable order."""
+    return [f"{a.get('headline', '')} {a.get('summary', '')}".strip() for s in symbols() for a in articles(s)]
+
+
+def price_provider():
+    from stocklens.providers import LocalFileProvider
+
+    return LocalFileProvider(PRICE_DIR)
+
+
+def synthetic_ohlcv(n_bars: int, seed: int = 0, start_price: float = 1000.0, end: str = "2024-06-28"):
+    """Deterministic daily OHLCV random walk with ``n_bars`` business days ending at ``end``."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0004, 0.015, n_bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([start_price], close[:-1])) * (1 + rng.normal(0, 0.003, n_bars))
+    spread = np.abs(rng.normal(0, 0.008, n_bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(200_000, 5_000_000, n_bars)
+    index = pd.bdate_range(end=end, periods=n_bars, name="Date")
+    return pd.DataFrame(
+        {"Open": open_.round(2), "High": high.round(2), "Low": low.round(2), "Close": close.round(2), "Volume": volume},
+        index=index,
+    )
+
+
+def synthetic_closes(n_bars: int, columns: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """Close prices only: shape ``(n_bars,)`` or ``(n_bars, columns)`` for wide-matrix benchmarks."""
+    rng = np.random.default_rng(seed)
+    shape = (n_bars,) if columns is None else (n_bars, columns)
+    return 100.0 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, shape), axis=0))
+
+
+class _NewsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        symbol = (parse_qs(urlsplit(self.path).query).get("stock") or [""])[0].upper()
+        try:
+            body = _news_bytes(symbol)
+        except OSError:
+            body = json.dumps([{"stock": symbol, "articles": []}]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # keep benchmark output clean
+        pass
+
+
+class NewsServer:
+    """Local stand-in for the n8n webhook that answers ``?stock=SYMBOL`` with the recorded payload."""
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _NewsHandler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/webhook/sentiment"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="bench-news", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def news_server() -> NewsServer:
+    """One shared server per benchmark run."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = NewsServer()
+        return _server
+
+
+def _record(args):
+    from stocklens.core import StockLens
+    from stocklens.indicators import load_price_history
+
+    provider = price_provider()
+    sl = StockLens(args.webhook)
+    os.makedirs(NEWS_DIR, exist_ok=True)
+    for symbol in args.symbols:
+        payload = sl.fetch_news(symbol)
+        with open(os.path.join(NEWS_DIR, f"{symbol.upper()}.json"), "w", encoding="utf-8") as fh:
+            json.dump([payload], fh, indent=1, ensure_ascii=False)
+        _, data = load_price_history(symbol, period=args.period)
+        if data is not None:
+            provider.save(symbol, data)
+        print(symbol, len(payload.get("articles", [])), "articles,", 0 if data is None else len(data), "bars")
+
+
+def _generate(args):
+    from stocklens.providers import LocalFileProvider
+
+    provider = LocalFileProvider(PRICE_DIR)
+    for seed, symbol in enumerate(args.symbols or symbols()):
+        provider.save(symbol, synthetic_ohlcv(args.bars, seed=seed, start_price=500.0 + 700 * seed))
+        print(symbol, args.bars, "bars")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or regenerate benchmark fixtures")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="Record live news payloads and price histories")
+    record.add_argument("symbols", nargs="+")
+    record.add_argument("--webhook", default=None, help="n8n webhook URL (defaults to StockLens' default)")
+    record.add_argument("--period", default="5y")
+    record.set_defaults(func=_record)
+    generate = sub.add_parser("generate", help="Rebuild price files from a seeded random walk")
+    generate.add_argument("symbols", nargs="*")
+    generate.add_argument("--bars", type=int, default=1250)
+    generate.set_defaults(func=_generate)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
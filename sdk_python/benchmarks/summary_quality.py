@@ -0,0 +1,203 @@
+"""Compare summarizer backends against the fp32 BART pipeline on the recorded news.
+
+Every spec (see ``stocklens.inference``) runs in its own fresh process, so load time and
+peak resident memory are measured per backend and not mixed up with models loaded
+earlier. Each candidate's summaries are scored against the reference's with ROUGE-1/-2/-L
+F1, and the report shows them next to the per-summary latency and speedup::
+
+    python -m benchmarks.summary_quality distilbart:onnx-int8 bart:onnx-int8 --min-rouge-l 0.4
+
+With ``--min-rouge-l`` the exit status is 1 when a candidate scores below it, so the
+harness can gate a switch of ``STOCKLENS_SUMMARIZER``. ``--reference-cache`` keeps the
+slow reference run on disk between invocations.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+from .fixtures import articles, symbols
+
+DEFAULT_REFERENCE = "bart:torch"
+DEFAULT_CANDIDATES = ("distilbart:torch", "bart:onnx-int8", "distilbart:onnx-int8")
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _ngrams(tokens: Sequence[str], n: int) -> Dict[tuple, int]:
+    counts: Dict[tuple, int] = {}
+    for i in range(len(tokens) - n + 1):
+        gram = tuple(tokens[i:i + n])
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def _f1(overlap: int, candidate: int, reference: int) -> float:
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / candidate, overlap / reference
+    return 2 * precision * recall / (precision + recall)
+
+
+def _lcs(a: Sequence[str], b: Sequence[str]) -> int:
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def rouge(candidate: str, reference: str) -> Dict[str, float]:
+    """ROUGE-1, ROUGE-2 and ROUGE-L F1 of ``candidate`` against ``reference`` (lowercased word tokens)."""
+    cand, ref = _tokens(candidate), _tokens(reference)
+    scores = {}
+    for n in (1, 2):
+        c, r = _ngrams(cand, n), _ngrams(ref, n)
+        overlap = sum(min(count, r.get(gram, 0)) for gram, count in c.items())
+        scores[f"rouge{n}"] = _f1(overlap, sum(c.values()), sum(r.values()))
+    scores["rougeL"] = _f1(_lcs(cand, ref), len(cand), len(ref))
+    return scores
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+
+def _run_spec(spec: str, article_sets: List[List[Dict[str, Any]]], repeat: int) -> Dict[str, Any]:
+    # Runs in a child process: a fresh interpreter per spec keeps the memory numbers honest
+    from stocklens.inference import configure_summarizer
+    from stocklens.models import get_model
+    from stocklens.summarizer import generate_summary
+
+    configure_summarizer(spec)
+    start = time.perf_counter()
+    get_model("summarizer")
+    load_seconds = time.perf_counter() - start
+    generate_summary(article_sets[0])  # warm-up
+    summaries, latencies = [], []
+    for news in article_sets:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            summary = generate_summary(news)
+            times.append(time.perf_counter() - start)
+        summaries.append(summary)
+        latencies.append(statistics.median(times))
+    return {"spec": spec, "summaries": summaries, "latencies": latencies, "load_seconds": load_seconds,
+            "peak_rss_mb": _peak_rss_mb()}
+
+
+def _child(conn, spec, article_sets, repeat):
+    try:
+        conn.send(_run_spec(spec, article_sets, repeat))
+    except BaseException as e:
+        conn.send({"spec": spec, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_spec(spec: str, article_sets: List[List[Dict[str, Any]]], repeat: int = 1) -> Dict[str, Any]:
+    """Summarize ``article_sets`` with ``spec`` in a new process; returns summaries, latencies and memory."""
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(child, spec, article_sets, repeat))
+    process.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {"spec": spec, "error": "worker process died"}
+    process.join()
+    return result
+
+
+def compare(reference: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """Mean ROUGE of ``candidate``'s summaries against ``reference``'s, plus the latency ratio."""
+    per_set = [rouge(c, r) for c, r in zip(candidate["summaries"], reference["summaries"])]
+    report = {name: statistics.fmean(s[name] for s in per_set) for name in ("rouge1", "rouge2", "rougeL")}
+    report["latency"] = statistics.fmean(candidate["latencies"])
+    report["speedup"] = statistics.fmean(reference["latencies"]) / report["latency"] if report["latency"] else None
+    report["peak_rss_mb"] = candidate.get("peak_rss_mb")
+    report["load_seconds"] = candidate.get("load_seconds")
+    return report
+
+
+def _line(spec, latency, speedup, rss, scores=None):
+    rss_text = f"{rss:8.0f} MB" if rss is not None else "       ? MB"
+    speed_text = f"x{speedup:5.2f}" if speedup else "      "
+    line = f"{spec:<28} {latency * 1000:9.1f} ms {speed_text} {rss_text}"
+    if scores is not None:
+        line += f"  R1 {scores['rouge1']:.3f}  R2 {scores['rouge2']:.3f}  RL {scores['rougeL']:.3f}"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.summary_quality",
+                                     description="Summary quality, latency and memory of summarizer backends vs. fp32 BART")
+    parser.add_argument("candidates", nargs="*", default=list(DEFAULT_CANDIDATES), help="Specs such as distilbart:onnx-int8")
+    parser.add_argument("--reference", default=DEFAULT_REFERENCE, help="Spec the candidates are scored against")
+    parser.add_argument("--reference-cache", default=None, help="JSON file to reuse (or store) the reference run")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per article set (median is reported)")
+    parser.add_argument("--min-rouge-l", type=float, default=None, help="Exit with status 1 if a candidate scores lower")
+    parser.add_argument("--json", dest="json_out", default=None, help="Also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    names = symbols()
+    article_sets = [articles(symbol) for symbol in names]
+
+    reference = None
+    if args.reference_cache and os.path.exists(args.reference_cache):
+        with open(args.reference_cache, "r", encoding="utf-8") as fh:
+            cached = json.load(fh)
+        if cached.get("spec") == args.reference and cached.get("symbols") == names:
+            reference = cached
+    if reference is None:
+        reference = run_spec(args.reference, article_sets, args.repeat)
+        if "error" in reference:
+            print(f"reference {args.reference} failed: {reference['error']}")
+            return 2
+        if args.reference_cache:
+            with open(args.reference_cache, "w", encoding="utf-8") as fh:
+                json.dump({**reference, "symbols": names}, fh, indent=1)
+
+    print(f"{len(article_sets)} article sets ({', '.join(names)}); ROUGE F1 against {args.reference}")
+    print(_line(args.reference, statistics.fmean(reference["latencies"]), None, reference.get("peak_rss_mb")))
+    report = {"reference": reference, "candidates": {}}
+    failed = False
+    for spec in args.candidates:
+        result = run_spec(spec, article_sets, args.repeat)
+        if "error" in result:
+            print(f"{spec:<28} failed: {result['error']}")
+            report["candidates"][spec] = result
+            failed = True
+            continue
+        scores = compare(reference, result)
+        report["candidates"][spec] = {**result, **scores}
+        line = _line(spec, scores["latency"], scores["speedup"], scores["peak_rss_mb"], scores)
+        if args.min_rouge_l is not None and scores["rougeL"] < args.min_rouge_l:
+            line += f"  BELOW {args.min_rouge_l}"
+            failed = True
+        print(line, flush=True)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=1)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,42 @@
-from .summarizer import generate_summary
-from .indicators import get_technical_indicators
-from .tts import generate_audio
-from .sentiment import analyze_sentiment
-from .core import StockLens
+import importlib
+
+from .models import warmup
+
+# Public names resolve lazily (PEP 562) so `import stocklens` stays cheap; heavy
+# dependencies load on first use of the function that needs them.
+_EXPORTS = {
+    "generate_summary": ".summarizer",
+    "generate_summaries": ".summarizer",
+    "get_technical_indicators": ".indicators",
+    "get_technical_indicators_many": ".indicators",
+    "generate_audio": ".tts",
+    "analyze_sentiment": ".sentiment",
+    "analyze_sentiments": ".sentiment",
+    "StockLens": ".core",
+}
 
 __all__ = [
     "generate_summary",
+    "generate_summaries",
     "get_technical_indicators",
+    "get_technical_indicators_many",
     "generate_audio",
     "analyze_sentiment",
+    "analyze_sentiments",
     "StockLens",
+    "warmup",
 ]
 
 __version__ = "0.1.0"
 
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,34 +1,174 @@
 import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
 from .core import StockLens
 from .storage import MongoStorage
 
+# With storage or an archive, finished symbols reach the checkpoint after each flush of this many
+CHECKPOINT_BATCH = 100
+
+
+def _console_record(result):
+    if "error" in result:
+        return {"symbol": result.get("symbol"), "error": result["error"]}
+    return {
+        "symbol": result.get("symbol"),
+        "overall_sentiment": result.get("overall_sentiment"),
+        "summary_text": result.get("summary_text"),
+        "audio_path": result.get("audio_path"),
+        "articles": len(result.get("articles", [])),
+    }
+
+
+def _read_symbols(path):
+    """Yield symbols lazily from a file (or stdin for ``-``): whitespace/comma separated, ``#`` starts a comment."""
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line in stream:
+            for symbol in line.split("#", 1)[0].replace(",", " ").split():
+                yield symbol
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as fh:
+        return {line.strip().upper() for line in fh if line.strip()}
+
+
+def _mark_done(checkpoint, symbols, *sinks):
+    # A symbol is only recorded once its buffered storage/archive writes are on disk
+    for sink in sinks:
+        if sink is not None:
+            sink.flush()
+    checkpoint.write("".join(symbol + "\n" for symbol in symbols))
+    checkpoint.flush()
+    symbols.clear()
+
+
+class _NDJSONWriter:
+    """Thread-safe NDJSON emitter: one JSON object per line, flushed immediately."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
 
 def main():
     parser = argparse.ArgumentParser(description="StockLens CLI")
-    parser.add_argument("symbol", help="Stock symbol, e.g., INFY")
-    parser.add_argument("--webhook", required=True, help="n8n webhook URL that returns articles JSON")
+    parser.add_argument("symbols", nargs="*", metavar="symbol", help="One or more stock symbols, e.g., INFY TCS")
+    parser.add_argument("--input", "-i", default=None, help="Read symbols from a file, or '-' for stdin (one per line)")
+    parser.add_argument("--webhook", default=None, help="n8n webhook URL that returns articles JSON")
     parser.add_argument("--no-tts", action="store_true", help="Disable TTS generation")
     parser.add_argument("--audio-dir", default="static/audio", help="Directory for mp3 output")
     parser.add_argument("--mongo-uri", default=None, help="MongoDB URI for persistence (optional)")
     parser.add_argument("--mongo-db", default="stocklens", help="MongoDB database name")
+    parser.add_argument("--archive", default=None, help="Directory of a Parquet archive to append scored articles to (needs pyarrow)")
+    parser.add_argument("--workers", type=int, default=8, help="Symbols processed concurrently when several are given")
+    parser.add_argument("--ndjson", action="store_true", help="Emit one JSON record per line as each symbol finishes")
+    parser.add_argument("--events", action="store_true", help="With --ndjson, also emit stage events (news, sentiment, summary, audio)")
+    parser.add_argument("--full", action="store_true", help="With --ndjson, emit the full result including articles")
+    parser.add_argument("--checkpoint", default=None, help="File of finished symbols: skipped on start, appended as symbols succeed")
+    parser.add_argument("--daemon", action="store_true", help="Keep the symbols warm: refresh them on a schedule until interrupted")
+    parser.add_argument("--interval", type=float, default=300, help="With --daemon, seconds between refreshes of each symbol")
     args = parser.parse_args()
 
+    if args.input is None and not args.symbols and not sys.stdin.isatty():
+        args.input = "-"
+    if args.input is None and not args.symbols:
+        parser.error("give symbols as arguments or with --input FILE|-")
+    streaming = args.ndjson or args.input is not None or args.checkpoint is not None
+
     storage = None
     if args.mongo_uri:
         storage = MongoStorage(args.mongo_uri, db_name=args.mongo_db)
 
-    sl = StockLens(args.webhook, audio_output_dir=args.audio_dir)
-    result = sl.process_symbol(args.symbol, do_tts=(not args.no_tts), storage=storage)
-    # Minimal console output
-    print({
-        "symbol": result.get("symbol"),
-        "overall_sentiment": result.get("overall_sentiment"),
-        "summary_text": result.get("summary_text"),
-        "audio_path": result.get("audio_path"),
-        "articles": len(result.get("articles", [])),
-    })
+    archive = None
+    if args.archive:
+        from .archive import ArticleArchive
+        archive = ArticleArchive(args.archive)
+
+    sl = StockLens(args.webhook, audio_output_dir=args.audio_dir, archive=archive)
+    if args.daemon:
+        from .daemon import WatchlistDaemon
+
+        # One NDJSON line per refresh; runs until Ctrl+C
+        out = _NDJSONWriter(sys.stdout)
+        symbols = list(itertools.chain(args.symbols, _read_symbols(args.input) if args.input is not None else ()))
+        daemon = WatchlistDaemon(sl, symbols, interval=args.interval, storage=storage, do_tts=(not args.no_tts),
+                                 max_workers=args.workers,
+                                 on_result=lambda symbol, snap: out.write({"type": "result", "ts": time.time(), **_console_record(snap)}))
+        daemon.run_forever()
+        return
+
+    if len(args.symbols) == 1 and not streaming:
+        result = sl.process_symbol(args.symbols[0], do_tts=(not args.no_tts), storage=storage)
+        # Minimal console output
+        print(_console_record(result))
+        return
+
+    if not streaming:
+        # Watchlist mode: one line per symbol, printed as soon as it finishes
+        failed = 0
+        for result in sl.process_symbols(args.symbols, max_workers=args.workers, do_tts=(not args.no_tts), storage=storage):
+            failed += "error" in result
+            print(_console_record(result), flush=True)
+        if failed:
+            raise SystemExit(1)
+        return
+
+    # Streaming mode: symbols are read lazily and results written as NDJSON, so memory stays
+    # flat for any list length; finished symbols go to the checkpoint so a rerun resumes
+    out = _NDJSONWriter(sys.stdout)
+    done = _load_checkpoint(args.checkpoint)
+    source = itertools.chain(args.symbols, _read_symbols(args.input) if args.input is not None else ())
+    symbols = (s for s in source if s.upper() not in done)
+
+    on_event = None
+    if args.events:
+        def on_event(stage, info):
+            out.write({"type": "event", "event": stage, "ts": time.time(), **info})
+
+    checkpoint = open(args.checkpoint, "a", encoding="utf-8") if args.checkpoint else None
+    buffered = storage is not None or archive is not None
+    unsaved = []  # finished symbols whose writes may still be buffered
+    failed = 0
+    results = sl.process_symbols(symbols, max_workers=args.workers, do_tts=(not args.no_tts), storage=storage,
+                                 on_event=on_event)
+    try:
+        for result in results:
+            ok = "error" not in result
+            failed += not ok
+            record = result if args.full and ok else _console_record(result)
+            out.write({"type": "result", "status": "ok" if ok else "error", "ts": time.time(), **record})
+            if ok and checkpoint is not None:
+                unsaved.append(result["symbol"].upper())
+                if not buffered or len(unsaved) >= CHECKPOINT_BATCH:
+                    _mark_done(checkpoint, unsaved, storage, archive)
+    finally:
+        try:
+            results.close()  # process_symbols flushes storage and archive, also when stopped early
+            if unsaved:
+                _mark_done(checkpoint, unsaved)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+    if failed:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
     main()
-
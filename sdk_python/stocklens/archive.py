@@ -0,0 +1,403 @@
+"""Append-only columnar archive of scored articles for history queries.
+
+Rows are written as Parquet files under a Hive-style layout, one directory per symbol
+and period (``day``, ``month`` or ``year``; fixed when the archive is created)::
+
+    {root}/symbol=INFY/period=2024-06/part-<time>-<id>.parquet
+
+Each row holds ``timestamp`` (UTC), ``article_hash``, ``sentiment`` and ``score`` as
+typed columns. ``symbol`` and ``period`` come from the path, and ``date`` is derived from
+``timestamp``. Opening a Parquet file costs about a millisecond whatever its size, so the
+period sets the trade-off: 300 symbols over two years is 219,000 day partitions, 7,200
+month partitions or 600 year partitions (the default; about a second to aggregate those
+2.2 million rows on one core).
+
+Queries go through ``pyarrow.dataset`` with memory-mapped files and read only the
+requested columns. Symbol and date filters skip whole directories before any file is
+opened, and the timestamp filter uses Parquet row-group statistics within a period.
+``daily_sentiment`` aggregates batch by batch, so memory stays flat however many rows
+match.
+
+Writes are buffered like ``MongoStorage``. ``flush`` writes one file per (symbol, period)
+in the buffer. A partition that reaches ``max_files`` files is merged back into one
+(``compact`` does it for all of them). Needs pyarrow.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from . import metrics
+from .storage import article_hash
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None  # optional dependency
+
+DateLike = Union[date, datetime, str]
+
+
+def _schemas():
+    rows = pa.schema([
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("article_hash", pa.string()),
+        ("sentiment", pa.dictionary(pa.int8(), pa.string())),
+        ("score", pa.float32()),
+    ])
+    partitions = pa.schema([("symbol", pa.string()), ("period", pa.string())])
+    return rows, partitions
+
+
+# Period keys are ISO date prefixes, so they sort (and compare) chronologically as strings
+PERIODS = {"day": 10, "month": 7, "year": 4}
+_META = "_archive.json"
+
+
+def _as_date(value: DateLike) -> date:
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).date() if value.tzinfo else value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _flush_at_exit(ref):
+    archive = ref()
+    if archive is not None:
+        try:
+            archive.flush()
+        except Exception:
+            pass
+
+
+class ArticleArchive:
+    """Parquet archive of scored articles under ``root``, partitioned by symbol and ``period``.
+
+    ``period`` applies when the archive is created and is stored with it; reopening
+    uses the stored one (None) and rejects a different one. ``write`` buffers rows until
+    ``buffer_size`` are pending or the oldest is ``flush_interval`` seconds old;
+    ``flush``/``close`` and interpreter exit write the rest.
+    """
+
+    def __init__(self, root: str, *, period: Optional[str] = None, buffer_size: int = 5000, flush_interval: float = 30.0,
+                 max_files: int = 32):
+        if pa is None:
+            raise RuntimeError("pyarrow is not installed. Install with `pip install pyarrow`.")
+        self.root = os.path.expanduser(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.period = self._load_period(period)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_files = max_files
+        self.schema, self.partition_schema = _schemas()
+        self._pending: Dict[tuple, Dict[str, list]] = {}
+        self._count = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        # Held while writing or compacting, so two flushes never merge the same partition at once
+        self._flush_lock = threading.RLock()
+        # Memory-mapped reads: pages are loaded as the scan touches them, not copied up front
+        self._fs = pafs.LocalFileSystem(use_mmap=True)
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    def _load_period(self, period: Optional[str]) -> str:
+        path = os.path.join(self.root, _META)
+        stored = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fh:
+                stored = json.load(fh).get("period")
+        if stored is not None:
+            if period is not None and period != stored:
+                raise ValueError(f"Archive at {self.root} is partitioned by {stored}, not {period}")
+            return stored
+        period = period or "year"
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period} (choose from {', '.join(PERIODS)})")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"period": period, "version": 1}, fh)
+        return period
+
+    def _period_key(self, day: date) -> str:
+        return day.isoformat()[:PERIODS[self.period]]
+
+    # Writes
+    def write(self, symbol: str, articles: Iterable[Dict[str, Any]], timestamp: Optional[datetime] = None) -> int:
+        """Queue one row per scored article; returns how many were queued.
+
+        Articles marked ``seen`` (already scored in an earlier run, see ``stocklens.dedup``)
+        were archived then and are skipped, so each story is counted on the day it first appeared.
+        """
+        now = timestamp or datetime.now(timezone.utc)
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+        key = (symbol.upper(), self._period_key(now.astimezone(timezone.utc).date()))
+        queued = 0
+        with self._lock:
+            rows = self._pending.setdefault(key, {name: [] for name in self.schema.names})
+            for article in articles:
+                if article.get("seen") or article.get("sentiment") is None:
+                    continue
+                rows["timestamp"].append(now)
+                rows["article_hash"].append(article_hash(article))
+                rows["sentiment"].append(article["sentiment"])
+                rows["score"].append(article.get("score"))
+                queued += 1
+            self._count += queued
+            if self._oldest is None and queued:
+                self._oldest = time.time()
+            due = self._count >= self.buffer_size or (
+                self._oldest is not None and time.time() - self._oldest >= self.flush_interval)
+        if due:
+            self.flush()
+        return queued
+
+    def flush(self) -> int:
+        """Write all buffered rows (one new file per symbol and period); returns the number of rows written.
+
+        Rows leave the buffer only once their file is written. If a partition fails, the
+        others are still written and the first error is raised; the failed rows stay
+        queued for the next flush.
+        """
+        written, error = 0, None
+        with self._flush_lock:
+            with self._lock:
+                pending = [(key, {name: list(column) for name, column in rows.items()})
+                           for key, rows in self._pending.items() if rows["timestamp"]]
+            for (symbol, period), rows in pending:
+                table = pa.Table.from_pydict(rows, schema=self.schema)
+                directory = os.path.join(self.root, f"symbol={symbol}", f"period={period}")
+                try:
+                    with metrics.span("archive_write"):
+                        self._write_file(directory, table)
+                except Exception as e:
+                    error = error or e
+                    continue
+                self._dequeue((symbol, period), table.num_rows)
+                written += table.num_rows
+                if self.max_files and len(self._parts(directory)) >= self.max_files:
+                    try:
+                        self._compact_dir(directory)
+                    except Exception as e:
+                        error = error or e
+        if written:
+            metrics.inc("archive_rows", written)
+        if error is not None:
+            raise error
+        return written
+
+    def _dequeue(self, key: tuple, count: int) -> None:
+        # Drop the first ``count`` rows of a partition's buffer; ``write`` may have appended more meanwhile
+        with self._lock:
+            rows = self._pending[key]
+            for column in rows.values():
+                del column[:count]
+            if not rows["timestamp"]:
+                del self._pending[key]
+            self._count -= count
+            if not self._count:
+                self._oldest = None
+
+    def _write_file(self, directory: str, table) -> str:
+        # Written under a dot-name (ignored by readers) and renamed, so a scan never sees half a file
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = os.path.join(directory, "." + name)
+        # Row groups of 64k rows give the timestamp filter statistics to skip on in large partitions
+        pq.write_table(table, tmp, compression="zstd", row_group_size=65536)
+        os.replace(tmp, os.path.join(directory, name))
+        return name
+
+    def _partitions(self, symbols=None, start=None, end=None):
+        # (symbol, directory) for each period directory overlapping [start, end)
+        first = self._period_key(_as_date(start)) if start is not None else None
+        last = self._period_key(_as_date(end) - timedelta(days=1)) if end is not None else None
+        wanted = {s.upper() for s in symbols} if symbols is not None else None
+        for symbol_dir in sorted(os.listdir(self.root)):
+            symbol = symbol_dir[7:]
+            if not symbol_dir.startswith("symbol=") or (wanted is not None and symbol not in wanted):
+                continue
+            for period_dir in sorted(os.listdir(os.path.join(self.root, symbol_dir))):
+                period = period_dir[7:]
+                if (first is not None and period < first) or (last is not None and period > last):
+                    continue
+                yield symbol, os.path.join(self.root, symbol_dir, period_dir)
+
+    def compact(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> int:
+        """Merge each partition's files into one (periods overlapping ``[start, end)``); returns partitions rewritten."""
+        rewritten = 0
+        with self._flush_lock:
+            self.flush()
+            for _, directory in list(self._partitions(start=start, end=end)):
+                rewritten += self._compact_dir(directory)
+        return rewritten
+
+    @staticmethod
+    def _parts(directory: str) -> List[str]:
+        return sorted(n for n in os.listdir(directory) if n.endswith(".parquet") and not n.startswith("."))
+
+    def _compact_dir(self, directory: str) -> int:
+        # Called with _flush_lock held. The merged file is in place before the parts are removed; a reader in between sees rows twice, never zero times
+        parts = self._parts(directory)
+        if len(parts) < 2:
+            return 0
+        table = pa.concat_tables([pq.read_table(os.path.join(directory, n), schema=self.schema) for n in parts])
+        self._write_file(directory, table.sort_by("timestamp"))
+        for name in parts:
+            os.remove(os.path.join(directory, name))
+        return 1
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Reads (pending rows are flushed first so callers always see their own writes)
+    def dataset(self):
+        """The archive as a ``pyarrow.dataset.Dataset`` (columns: the row schema plus ``symbol`` and ``period``)."""
+        self.flush()
+        return ds.dataset(self.root, schema=pa.unify_schemas([self.schema, self.partition_schema]), format="parquet",
+                          filesystem=self._fs, partitioning=ds.partitioning(self.partition_schema, flavor="hive"),
+                          exclude_invalid_files=False, ignore_prefixes=[".", "_"])
+
+    def _filter(self, symbols: Optional[Sequence[str]], start: Optional[DateLike], end: Optional[DateLike]):
+        # Partition fields (symbol, period) prune directories; the timestamp bounds use row-group statistics
+        expr = None
+        parts = []
+        if symbols is not None:
+            parts.append(ds.field("symbol").isin([s.upper() for s in symbols]))
+        if start is not None:
+            start = _as_date(start)
+            parts.append(ds.field("period") >= self._period_key(start))
+            parts.append(ds.field("timestamp") >= pa.scalar(datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+                                                             self.schema.field("timestamp").type))
+        if end is not None:
+            end = _as_date(end)
+            parts.append(ds.field("period") <= self._period_key(end - timedelta(days=1)))
+            parts.append(ds.field("timestamp") < pa.scalar(datetime(end.year, end.month, end.day, tzinfo=timezone.utc),
+                                                            self.schema.field("timestamp").type))
+        for part in parts:
+            expr = part if expr is None else expr & part
+        return expr
+
+    def scanner(self, columns: Optional[List[str]] = None, *, symbols: Optional[Sequence[str]] = None,
+                start: Optional[DateLike] = None, end: Optional[DateLike] = None, batch_size: int = 131072):
+        """A scanner over ``columns`` for ``symbols`` and days in ``[start, end)``; filters prune partitions.
+
+        ``columns`` may include ``date``, the UTC day of ``timestamp``.
+        """
+        projection = None
+        if columns is not None:
+            projection = {name: ds.field("timestamp").cast(pa.date32()) if name == "date" else ds.field(name)
+                          for name in columns}
+        return self.dataset().scanner(columns=projection, filter=self._filter(symbols, start, end), batch_size=batch_size)
+
+    def scan(self, columns: Optional[List[str]] = None, *, symbols: Optional[Sequence[str]] = None,
+             start: Optional[DateLike] = None, end: Optional[DateLike] = None):
+        """Matching rows as a ``pyarrow.Table`` (call ``.to_pandas()`` for a DataFrame)."""
+        return self.scanner(columns, symbols=symbols, start=start, end=end).to_table()
+
+    def daily_sentiment(self, symbols: Optional[Sequence[str]] = None, start: Optional[DateLike] = None,
+                        end: Optional[DateLike] = None, *, chunk_size: int = 1_000_000):
+        """Per symbol and day: ``articles``, ``mean_score`` and ``positive``/``negative``/``neutral`` counts.
+
+        Returns a pandas DataFrame sorted by symbol and date. Only ``symbol``, ``date``,
+        ``sentiment`` and ``score`` are read, and every ``chunk_size`` rows are reduced to
+        partial sums before more are loaded.
+        """
+        keys = ["symbol", "date"]
+        partials, chunk, chunk_rows = [], [], 0
+
+        def reduce_chunk():
+            # Partial sums per (symbol, day) for a chunk of batches; a chunk is at most ~chunk_size rows
+            table = pa.Table.from_batches(chunk)
+            sentiment = pc.cast(table.column("sentiment"), pa.string())
+            table = pa.table({
+                "symbol": table.column("symbol"),
+                "date": table.column("date"),
+                "score": pc.cast(table.column("score"), pa.float64()),
+                "positive": pc.cast(pc.equal(sentiment, "Positive"), pa.int64()),
+                "negative": pc.cast(pc.equal(sentiment, "Negative"), pa.int64()),
+                "neutral": pc.cast(pc.equal(sentiment, "Neutral"), pa.int64()),
+            })
+            partials.append(table.group_by(keys).aggregate([
+                ("score", "sum"), ("score", "count"), ("positive", "count"), ("positive", "sum"), ("negative", "sum"),
+                ("neutral", "sum"),
+            ]))
+            chunk.clear()
+
+        scanner = self.scanner(["symbol", "date", "sentiment", "score"], symbols=symbols, start=start, end=end)
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                chunk.append(batch)
+                chunk_rows += batch.num_rows
+            if chunk_rows >= chunk_size:
+                reduce_chunk()
+                chunk_rows = 0
+        if chunk:
+            reduce_chunk()
+        columns = ["symbol", "date", "articles", "mean_score", "positive", "negative", "neutral"]
+        if not partials:
+            import pandas as pd
+
+            return pd.DataFrame(columns=columns)
+        totals = pa.concat_tables(partials).group_by(keys).aggregate([
+            ("score_sum", "sum"), ("score_count", "sum"), ("positive_count", "sum"), ("positive_sum", "sum"), ("negative_sum", "sum"),
+            ("neutral_sum", "sum"),
+        ])
+        frame = totals.to_pandas()
+        frame["articles"] = frame["positive_count_sum"]  # every row has a positive flag, so this counts rows
+        frame["mean_score"] = frame["score_sum_sum"] / frame["score_count_sum"]
+        frame = frame.rename(columns={"positive_sum_sum": "positive", "negative_sum_sum": "negative",
+                                      "neutral_sum_sum": "neutral"})
+        return frame[columns].sort_values(["symbol", "date"]).reset_index(drop=True)
+
+    def symbols(self) -> List[str]:
+        """Every symbol with at least one archived row."""
+        return sorted({symbol for symbol, _ in self._partitions()})
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m stocklens.archive", description="Query or compact an article archive")
+    parser.add_argument("root", help="Archive directory")
+    parser.add_argument("--period", choices=list(PERIODS), default=None, help="Partition period for a new archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    daily = sub.add_parser("daily", help="Daily sentiment per symbol as CSV")
+    daily.add_argument("symbols", nargs="*", help="Symbols (default: all)")
+    daily.add_argument("--start", default=None, help="First day, YYYY-MM-DD")
+    daily.add_argument("--end", default=None, help="Day after the last one, YYYY-MM-DD")
+    daily.add_argument("--days", type=int, default=None, help="Only the last N days (instead of --start)")
+    compact = sub.add_parser("compact", help="Merge each partition's small files")
+    compact.add_argument("--start", default=None)
+    compact.add_argument("--end", default=None)
+    args = parser.parse_args(argv)
+
+    archive = ArticleArchive(args.root, period=args.period)
+    if args.command == "compact":
+        print(archive.compact(args.start, args.end), "partitions compacted")
+        return 0
+    start = args.start
+    if args.days is not None:
+        start = datetime.now(timezone.utc).date() - timedelta(days=args.days - 1)
+    frame = archive.daily_sentiment(args.symbols or None, start=start, end=args.end)
+    print(frame.to_csv(index=False), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,283 @@
+"""Vectorized backtest of the ``StockLens.analyze`` scoring rule.
+
+``analyze`` scores only the latest bar. Here the same ``ScoringRule`` is applied to
+every bar of a price history at once: indicators come from the NumPy engine as full
+series, news sentiment is bucketed per bar from archived articles, and scores, labels,
+forward returns, hit rates and turnover are all array operations. Inputs may be 1-D
+(one symbol) or 2-D (time x symbols), like ``technicals``.
+
+``sweep`` evaluates a grid of rules over a panel of symbols on a process pool. The
+indicators do not depend on the rule, so they are computed once and shipped to each
+worker once; every grid point is then just a few ``np.where`` calls.
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .scoring import ScoringRule
+from .technicals import as_price_array, compute_indicators
+
+LABEL_NAMES = np.array(["Negative", "Neutral", "Positive"])
+
+# (positive, negative, total) article counts per bar, each shaped like the price array
+NewsCounts = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def tech_scores(rsi, macd, signal, rule: ScoringRule) -> np.ndarray:
+    """``ScoringRule.tech_score`` for every bar; undefined indicators contribute 0."""
+    rsi, macd, signal = np.asarray(rsi, float), np.asarray(macd, float), np.asarray(signal, float)
+    score = np.where(rsi >= rule.rsi_upper, rule.rsi_weight, np.where(rsi <= rule.rsi_lower, -rule.rsi_weight, 0.0))
+    return score + np.where(macd > signal, rule.macd_weight, np.where(macd < signal, -rule.macd_weight, 0.0))
+
+
+def news_scores(news: NewsCounts, rule: ScoringRule) -> Tuple[np.ndarray, np.ndarray]:
+    """``ScoringRule.news_score`` for every bar; returns ``(score, has_news)``."""
+    pos, neg, total = (np.asarray(x, float) for x in news)
+    total_safe = np.maximum(total, 1.0)
+    score = np.where(pos > neg, rule.news_weight * (pos / total_safe),
+                     np.where(neg > pos, -rule.news_weight * (neg / total_safe), 0.0))
+    return score, total > 0
+
+
+def combined_scores(tech: np.ndarray, rule: ScoringRule, news: Optional[NewsCounts] = None) -> np.ndarray:
+    if news is None:
+        return tech
+    news_score, has_news = news_scores(news, rule)
+    return np.where(has_news, tech * rule.tech_blend + news_score * (1.0 - rule.tech_blend), tech)
+
+
+def labels_from_scores(score: np.ndarray, rule: ScoringRule) -> np.ndarray:
+    """+1 / 0 / -1 for Positive / Neutral / Negative (use ``label_names`` for strings)."""
+    return np.where(score >= rule.threshold, 1, np.where(score <= -rule.threshold, -1, 0)).astype(np.int8)
+
+
+def label_names(labels: np.ndarray) -> np.ndarray:
+    return LABEL_NAMES[np.asarray(labels) + 1]
+
+
+def forward_returns(close, horizon: int = 5) -> np.ndarray:
+    """Simple return from each bar's close to the close ``horizon`` bars later (NaN at the end)."""
+    close = as_price_array(close)
+    out = np.full(close.shape, np.nan)
+    if horizon < len(close):
+        out[:-horizon] = close[horizon:] / close[:-horizon] - 1.0
+    return out
+
+
+def news_counts(index, articles: Iterable[Mapping[str, Any]], window: str = "3D", columns: int = 0) -> NewsCounts:
+    """Bucket archived articles into per-bar sentiment counts.
+
+    Each bar counts the articles timestamped in ``(bar - window, bar]``, so a bar only
+    sees news published up to its own timestamp. ``articles`` are dicts with
+    ``timestamp`` and ``sentiment`` (``MongoStorage.sentiment_history`` rows).
+    With ``columns`` > 0 the counts are repeated into a (time x columns) matrix.
+    """
+    import pandas as pd
+
+    bars = pd.to_datetime(index, utc=True).as_unit("ns").asi8
+    lookback = bars - pd.Timedelta(window).value
+    stamps = {"Positive": [], "Negative": [], None: []}
+    for article in articles:
+        if article.get("timestamp") is None or not article.get("sentiment"):
+            continue
+        stamp = pd.Timestamp(article["timestamp"])
+        stamp = stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+        stamps[None].append(stamp.as_unit("ns").value)
+        if article["sentiment"] in stamps:
+            stamps[article["sentiment"]].append(stamp.as_unit("ns").value)
+
+    def count(values):
+        values = np.sort(np.asarray(values, dtype=np.int64))
+        counts = (np.searchsorted(values, bars, side="right") - np.searchsorted(values, lookback, side="right")).astype(float)
+        return np.repeat(counts[:, None], columns, axis=1) if columns else counts
+
+    return count(stamps["Positive"]), count(stamps["Negative"]), count(stamps[None])
+
+
+def _counts(labels: np.ndarray, fwd: np.ndarray, valid: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-column sums that the statistics are ratios of (summable across symbols and chunks)."""
+    scored = valid & np.isfinite(fwd)
+    signals = scored & (labels != 0)
+    strategy = np.where(scored, labels * np.where(scored, fwd, 0.0), 0.0)
+    moves = np.abs(np.diff(labels.astype(np.int16), axis=0))
+    pairs = valid[1:] & valid[:-1]
+    return {
+        "bars": valid.sum(axis=0),
+        "scored": scored.sum(axis=0),
+        "signals": signals.sum(axis=0),
+        "hits": (signals & (np.sign(fwd) == labels)).sum(axis=0),
+        "return_sum": strategy.sum(axis=0),
+        "moves": np.where(pairs, moves, 0).sum(axis=0),
+        "transitions": pairs.sum(axis=0),
+    }
+
+
+def _stats(counts: Mapping[str, Any]) -> Dict[str, Any]:
+    def ratio(num, den):
+        num, den = np.asarray(num, float), np.asarray(den, float)
+        out = np.divide(num, den, out=np.full(np.broadcast(num, den).shape, np.nan), where=den > 0)
+        return float(out) if out.ndim == 0 else out
+
+    def total(value):
+        return int(value) if np.ndim(value) == 0 else value
+
+    return {
+        "hit_rate": ratio(counts["hits"], counts["signals"]),
+        "coverage": ratio(counts["signals"], counts["scored"]),
+        "mean_return": ratio(counts["return_sum"], counts["scored"]),
+        "turnover": ratio(counts["moves"], counts["transitions"]),
+        "signals": total(counts["signals"]),
+        "bars": total(counts["bars"]),
+    }
+
+
+def evaluate(labels, fwd, valid=None) -> Dict[str, Any]:
+    """Hit rate, coverage, mean strategy return and turnover of a label series.
+
+    - ``hit_rate``: share of non-neutral labels whose sign matches the forward return.
+    - ``coverage``: share of scored bars with a non-neutral label.
+    - ``mean_return``: mean of ``label * forward_return`` over scored bars (long/short/flat).
+    - ``turnover``: mean absolute position change per bar (a flip from +1 to -1 counts 2).
+
+    2-D inputs give one value per column (``backtest(..., pool=True)`` pools them instead).
+    """
+    labels = np.asarray(labels)
+    fwd = np.asarray(fwd, float)
+    valid = np.ones(labels.shape, bool) if valid is None else np.asarray(valid, bool)
+    return _stats(_counts(labels, fwd, valid))
+
+
+def backtest(close, *, rule: Optional[ScoringRule] = None, news: Optional[NewsCounts] = None, horizon: int = 5,
+             pool: bool = False, **periods) -> Dict[str, Any]:
+    """Score every bar of ``close`` with ``rule`` and evaluate the labels against forward returns.
+
+    ``periods`` are passed to ``compute_indicators`` (e.g. ``rsi_period=14``). Bars before
+    RSI and the MACD signal line are both defined are excluded from the statistics.
+    Returns the ``score``/``label``/``forward_return``/``valid`` series plus ``stats``;
+    with ``pool=True`` and 2-D input the stats are pooled across columns.
+    """
+    rule = rule or ScoringRule()
+    close = as_price_array(close)
+    series = compute_indicators(close, full=True, **periods)
+    tech = tech_scores(series["RSI"], series["MACD"], series["Signal"], rule)
+    score = combined_scores(tech, rule, news)
+    labels = labels_from_scores(score, rule)
+    fwd = forward_returns(close, horizon)
+    valid = np.isfinite(series["RSI"]) & np.isfinite(series["Signal"])
+    counts = _counts(labels, fwd, valid)
+    if pool:
+        counts = {k: v.sum() for k, v in counts.items()}
+    return {
+        "score": score,
+        "label": labels,
+        "forward_return": fwd,
+        "valid": valid,
+        "indicators": series,
+        "stats": _stats(counts),
+    }
+
+
+def backtest_symbol(symbol: str, *, period: str = "5y", cache=None, storage=None, news_window: str = "3D",
+                    rule: Optional[ScoringRule] = None, horizon: int = 5, provider=None, **periods) -> Dict[str, Any]:
+    """Backtest one symbol from its stored price history and, with ``storage``, its archived news.
+
+    ``provider`` is the ``stocklens.providers`` source of bars (default: the process-wide one).
+    """
+    from .indicators import _column, load_price_history
+
+    resolved, data = load_price_history(symbol, cache=cache, period=period, provider=provider)
+    if data is None:
+        return {"symbol": symbol.upper(), "error": "No price history"}
+    close = _column(data, "Close")
+    news = None
+    if storage is not None:
+        articles = storage.sentiment_history(symbol, since=data.index[0].to_pydatetime(), limit=0)
+        news = news_counts(data.index, articles, news_window)
+    result = backtest(close, rule=rule, news=news, horizon=horizon, **periods)
+    result.update({"symbol": symbol.upper(), "resolved_symbol": resolved, "index": data.index})
+    return result
+
+
+def parameter_grid(grid: Mapping[str, Sequence[Any]], base: Optional[ScoringRule] = None) -> List[ScoringRule]:
+    """Every combination of ``grid`` values (keys are ``ScoringRule.PARAMS``) applied on top of ``base``."""
+    base = base or ScoringRule()
+    unknown = set(grid) - set(ScoringRule.PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown scoring parameters: {sorted(unknown)}")
+    names = list(grid)
+    return [base.replace(**dict(zip(names, values))) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def _pad(columns: List[np.ndarray], length: int) -> np.ndarray:
+    out = np.full((length, len(columns)), np.nan)
+    for j, values in enumerate(columns):
+        out[:len(values), j] = values
+    return out
+
+
+def build_panel(histories: Mapping[str, Any], *, horizon: int = 5, news: Optional[Mapping[str, NewsCounts]] = None,
+                **periods) -> Dict[str, Any]:
+    """Precompute the rule-independent arrays for a sweep: one column per symbol, NaN-padded at the end."""
+    symbols = list(histories)
+    per_symbol = []
+    for symbol in symbols:
+        close = as_price_array(histories[symbol])
+        if close.ndim != 1:
+            raise ValueError(f"History for {symbol} must be 1-D")
+        series = compute_indicators(close, full=True, **periods)
+        per_symbol.append((series["RSI"], series["MACD"], series["Signal"], forward_returns(close, horizon)))
+    length = max((len(s[0]) for s in per_symbol), default=0)
+    rsi, macd, signal, fwd = (_pad([s[i] for s in per_symbol], length) for i in range(4))
+    panel = {"symbols": symbols, "rsi": rsi, "macd": macd, "signal": signal, "fwd": fwd,
+             "valid": np.isfinite(rsi) & np.isfinite(signal), "news": None}
+    if news:
+        empty = np.zeros(0)
+        panel["news"] = tuple(
+            np.nan_to_num(_pad([np.asarray(news[s][i], float) if s in news else empty for s in symbols], length))
+            for i in range(3)
+        )
+    return panel
+
+
+def _evaluate_rules(panel: Mapping[str, Any], rules: Sequence[Dict[str, float]]) -> List[Dict[str, Any]]:
+    results = []
+    for params in rules:
+        rule = ScoringRule.from_dict(params)
+        tech = tech_scores(panel["rsi"], panel["macd"], panel["signal"], rule)
+        labels = labels_from_scores(combined_scores(tech, rule, panel["news"]), rule)
+        counts = {k: v.sum() for k, v in _counts(labels, panel["fwd"], panel["valid"]).items()}
+        results.append({"params": params, **_stats(counts)})
+    return results
+
+
+_PANEL: Optional[Dict[str, Any]] = None
+
+
+def _init_worker(panel):
+    global _PANEL
+    _PANEL = panel
+
+
+def _evaluate_chunk(rules):
+    return _evaluate_rules(_PANEL, rules)
+
+
+def sweep(histories: Mapping[str, Any], grid: Mapping[str, Sequence[Any]], *, base: Optional[ScoringRule] = None,
+          news: Optional[Mapping[str, NewsCounts]] = None, horizon: int = 5, max_workers: Optional[int] = None,
+          chunk_size: int = 64, **periods) -> List[Dict[str, Any]]:
+    """Evaluate every rule in ``grid`` over all ``histories`` ({symbol: closes}); one pooled result per rule.
+
+    Results keep grid order: ``{"params": {...}, "hit_rate", "coverage", "mean_return",
+    "turnover", "signals", "bars"}``. ``max_workers=1`` runs in-process. Rebuild the
+    winner with ``ScoringRule.from_dict(result["params"])``.
+    """
+    panel = build_panel(histories, horizon=horizon, news=news, **periods)
+    rules = [rule.to_dict() for rule in parameter_grid(grid, base)]
+    if max_workers == 1 or len(rules) <= chunk_size:
+        return _evaluate_rules(panel, rules)
+    chunks = [rules[i:i + chunk_size] for i in range(0, len(rules), chunk_size)]
+    # The panel is pickled once per worker (initializer), not once per chunk
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(panel,)) as pool:
+        return [result for chunk in pool.map(_evaluate_chunk, chunks) for result in chunk]
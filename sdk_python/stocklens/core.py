@@ -1,11 +1,21 @@
-import requests
-from typing import Dict, Any, Optional, List, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Optional, List, Tuple, Iterable, Iterator, Callable, TYPE_CHECKING
 
-from .summarizer import generate_summary
+from .summarizer import generate_summary, FAILED_SUMMARY
 from .tts import generate_audio
-from .sentiment import analyze_sentiment
-from .storage import MongoStorage  # optional at runtime if user imports
-from .indicators import get_technical_indicators
+from .sentiment import analyze_sentiments
+from .streaming import IndicatorState
+from .result_cache import ResultCache, articles_digest
+from .scoring import ScoringRule
+from .http_client import HTTPClient, default_client
+from .pipeline import Pipeline, Stage
+from .dedup import SignatureIndex, dedupe
+from . import metrics
+
+if TYPE_CHECKING:
+    from .archive import ArticleArchive
+    from .storage import MongoStorage  # optional at runtime; only needed for annotations
 
 
 def _compute_overall_sentiment(articles: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -28,8 +38,45 @@ def _compute_overall_sentiment(articles: List[Dict[str, Any]]) -> Dict[str, Any]
     }
 
 
+def _run_batch(func: Callable[[str], Dict[str, Any]], symbols: Iterable[str], max_workers: int) -> Iterator[Dict[str, Any]]:
+    """Run ``func`` for every symbol on a bounded thread pool, yielding results as they finish.
+
+    At most ``max_workers`` symbols are in flight at once, so ``symbols`` may be a lazy
+    iterable of any length. A failing symbol yields ``{"symbol": ..., "error": ...}``
+    instead of aborting the batch.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be >= 1")
+    symbols = iter(symbols)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+
+        def submit_next() -> bool:
+            for symbol in symbols:
+                symbol = symbol.strip() if isinstance(symbol, str) else symbol
+                if not symbol:
+                    continue
+                pending[pool.submit(func, symbol)] = symbol
+                return True
+            return False
+
+        while len(pending) < max_workers and submit_next():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = pending.pop(future)
+                try:
+                    result = future.result()
+                    result.setdefault("symbol", symbol.upper())
+                except Exception as e:
+                    result = {"symbol": symbol.upper(), "error": str(e)}
+                yield result
+                submit_next()
+
+
 class StockLens:
-    def __init__(self, n8n_webhook_url: Optional[str] = None, audio_output_dir: str = "static/audio", api_key: Optional[str] = None):
+    def __init__(self, n8n_webhook_url: Optional[str] = None, audio_output_dir: str = "static/audio", api_key: Optional[str] = None, price_cache_dir: Optional[str] = None, result_cache: Optional[ResultCache] = None, scoring_rule: Optional[ScoringRule] = None, price_provider=None, http_client: Optional[HTTPClient] = None, tts_backend: Optional[str] = None, background_audio: bool = False, stage_timeouts: Optional[Dict[str, float]] = None, dedup: bool = True, dedup_index: Optional[SignatureIndex] = None, archive: Optional["ArticleArchive"] = None):
         # Default to your n8n webhook if not provided
         if n8n_webhook_url:
             self.n8n_webhook_url = n8n_webhook_url.rstrip("/")
@@ -37,60 +84,249 @@ class StockLens:
             # Use default webhook URL
             self.n8n_webhook_url = "https://owl-winning-legally.ngrok-free.app/webhook/sentiment"
         self.audio_output_dir = audio_output_dir
+        # TTS engine name for stocklens.tts (None: STOCKLENS_TTS or the first installed offline engine).
+        # With background_audio, process_symbol returns the audio path at once and the file follows
+        self.tts_backend = tts_backend
+        self.background_audio = background_audio
         self.api_key = api_key
+        # Optional on-disk OHLCV cache: later price loads only download bars newer than the cache
+        self.price_cache = None
+        if price_cache_dir:
+            from .price_cache import PriceCache
+            self.price_cache = PriceCache(price_cache_dir)
+        self.http = http_client if http_client is not None else default_client()
+        # Where bars come from (stocklens.providers); None means the adaptive Yahoo chain
+        self.price_provider = price_provider
+        # Summaries keyed by article-set hash, so unchanged news skips BART (audio is content-addressed in stocklens.tts)
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        # Warm per-symbol indicator state so repeated analyze() calls only fold in new bars
+        self._indicator_states: Dict[str, IndicatorState] = {}
+        self._state_lock = threading.Lock()
+        # Thresholds/weights used by analyze(); stocklens.backtest evaluates and tunes the same rule
+        self.scoring_rule = scoring_rule if scoring_rule is not None else ScoringRule()
+        # Near-duplicate articles collapse to one representative before scoring and summarizing; the
+        # index remembers scored stories per symbol (on disk with SignatureIndex(directory=...))
+        self.dedup = dedup
+        self.dedup_index = dedup_index if dedup_index is not None else SignatureIndex()
+        # Default stocklens.archive.ArticleArchive for process_symbol(); every scored article is appended for history queries
+        self.archive = archive
+        # Stage graphs behind process_symbol() and analyze() (stocklens.pipeline); stage_timeouts maps
+        # stage names ("news", "prices", "summary", "audio", ...) to seconds
+        self._build_pipelines(stage_timeouts or {})
 
     def fetch_news(self, symbol: str) -> Dict[str, Any]:
         if not self.n8n_webhook_url:
             raise ValueError("n8n_webhook_url is not set. Provide it in StockLens(..., n8n_webhook_url=\"...\").")
-        url = f"{self.n8n_webhook_url}?stock={symbol}"
+        params = {"stock": symbol}
         # Optionally forward api_key as query param if provided
         if self.api_key:
-            url += f"&api_key={self.api_key}"
-        
+            params["api_key"] = self.api_key
+
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
         }
         # Add ngrok bypass header if using ngrok URL
         if "ngrok" in self.n8n_webhook_url:
             headers["ngrok-skip-browser-warning"] = "true"
-        
-        resp = requests.get(url, headers=headers, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+
+        # Pooled, retrying, circuit-breaking client; concurrent calls for one symbol share a request
+        with metrics.span("fetch_news"):
+            data = self.http.get_json(self.n8n_webhook_url, params=params, headers=headers)
         if isinstance(data, list) and data:
             data = data[0]
         data["symbol"] = symbol.upper()
         data.setdefault("articles", [])
         return data
 
+    @metrics.timed("analyze_articles")
     def analyze_articles(self, articles: List[Dict[str, Any]]) -> None:
-        for article in articles:
-            combined_text = f"{article.get('headline', '')} {article.get('summary', '')}".strip()
-            sentiment, score = analyze_sentiment(combined_text)
+        texts = [f"{article.get('headline', '')} {article.get('summary', '')}".strip() for article in articles]
+        for article, (sentiment, score) in zip(articles, analyze_sentiments(texts)):
             article["sentiment"] = sentiment
             article["score"] = score
 
-    def process_symbol(self, symbol: str, *, do_tts: bool = True, storage: Optional[MongoStorage] = None) -> Dict[str, Any]:
-        data = self.fetch_news(symbol)
-        self.analyze_articles(data.get("articles", []))
+    def _summarize(self, articles: List[Dict[str, Any]]) -> str:
+        # The summary stage on its own (through its article-set cache)
+        return self.pipeline.stages["summary"].run({"score": articles})
+
+    def _speak(self, summary_text: str, symbol: str) -> Optional[str]:
+        # Audio files are named by a hash of the text, so an unchanged summary reuses its file
+        return generate_audio(summary_text, symbol, output_dir=self.audio_output_dir, backend=self.tts_backend,
+                              wait=not self.background_audio)
+
+    def _build_pipelines(self, timeouts: Dict[str, float]) -> None:
+        def persist_articles(ctx):
+            if ctx.get("storage") is not None:
+                ctx["storage"].save_article_analysis(ctx["symbol"], ctx["score"])
 
-        overall = _compute_overall_sentiment(data.get("articles", []))
-        data["overall_sentiment"] = overall
+        def persist_summary(ctx):
+            if ctx.get("storage") is not None:
+                ctx["storage"].save_summary(ctx["symbol"], ctx["summary"], ctx.get("audio"))
+
+        def archive_articles(ctx):
+            if ctx.get("archive") is not None:
+                return ctx["archive"].write(ctx["symbol"], ctx["score"])
+            return 0
+
+        # fetch -> dedup -> score -> aggregate | summarize -> speak -> persist; articles are stored while BART runs
+        self.pipeline = Pipeline([
+            Stage("news", lambda ctx: self.fetch_news(ctx["symbol"]), timeout=timeouts.get("news")),
+            Stage("dedup", lambda ctx: self._dedupe(ctx["news"]), ["news"]),
+            Stage("score", lambda ctx: self._score_articles(ctx["dedup"]), ["dedup"], timeout=timeouts.get("score")),
+            Stage("aggregate", lambda ctx: _compute_overall_sentiment(ctx["score"]), ["score"]),
+            Stage("summary", lambda ctx: generate_summary(ctx["score"]), ["score"], timeout=timeouts.get("summary"),
+                  cache=self.result_cache, key=lambda ctx: "summary:" + articles_digest(ctx["score"]),
+                  cache_if=lambda text: text != FAILED_SUMMARY),
+            Stage("audio", lambda ctx: self._speak(ctx["summary"], ctx["symbol"]), ["summary"], timeout=timeouts.get("audio")),
+            Stage("persist_articles", persist_articles, ["score"], timeout=timeouts.get("persist")),
+            Stage("persist_summary", persist_summary, ["summary", "audio"], timeout=timeouts.get("persist")),
+            Stage("archive_articles", archive_articles, ["score"], timeout=timeouts.get("persist")),
+        ])
+
+        # analyze(): prices and news are fetched concurrently; any news failure leaves a technical-only result
+        self.analysis_pipeline = Pipeline([
+            Stage("prices", lambda ctx: self._refresh_indicators(ctx["symbol"]), timeout=timeouts.get("prices")),
+            Stage("news", lambda ctx: self.fetch_news(ctx["symbol"]), timeout=timeouts.get("news"), optional=True),
+            Stage("dedup", lambda ctx: self._dedupe(ctx["news"]) if ctx["news"] else None, ["news"], optional=True),
+            Stage("score", lambda ctx: self._score_articles(ctx["dedup"]) if ctx["dedup"] else None, ["dedup"], optional=True),
+            Stage("aggregate", lambda ctx: _compute_overall_sentiment(ctx["score"]) if ctx["score"] else None, ["score"],
+                  optional=True),
+            Stage("analysis", lambda ctx: self._score(ctx["prices"], ctx["aggregate"]), ["prices", "aggregate"]),
+        ])
+
+    def _dedupe(self, news: Dict[str, Any]) -> Dict[str, Any]:
+        # Replaces news["articles"] with one representative per story; seen stories carry their stored sentiment
+        articles = news.get("articles", [])
+        if not self.dedup:
+            return {"symbol": news["symbol"], "articles": articles, "signatures": None}
+        unique, signatures = dedupe(articles, index=self.dedup_index, symbol=news["symbol"])
+        news["articles"] = unique
+        news["duplicates_removed"] = len(articles) - len(unique)
+        return {"symbol": news["symbol"], "articles": unique, "signatures": signatures}
+
+    def _score_articles(self, deduped: Dict[str, Any]) -> List[Dict[str, Any]]:
+        articles = deduped["articles"]
+        fresh = [i for i, article in enumerate(articles) if not article.get("seen")]
+        self.analyze_articles([articles[i] for i in fresh])
+        if deduped["signatures"] is not None and fresh:
+            self.dedup_index.add(deduped["symbol"], deduped["signatures"][fresh], [articles[i] for i in fresh])
+        return articles
+
+    def run_stages(self, symbol: str, targets: Iterable[str], *, on_stage: Optional[Callable[[str, Any], None]] = None,
+                   **known: Any) -> Dict[str, Any]:
+        """Run some stages of ``self.pipeline`` for ``symbol``; returns the run context (stage name -> output).
+
+        ``known`` supplies outputs computed earlier, e.g. ``run_stages(s, ["summary", "audio"], score=articles)``
+        summarizes and speaks already scored articles without fetching again.
+        """
+        return self.pipeline.run({"symbol": symbol, **known}, targets, on_stage=on_stage)
+
+    @metrics.timed("process_symbol")
+    def process_symbol(self, symbol: str, *, do_tts: bool = True, storage: Optional["MongoStorage"] = None, flush: bool = True,
+                       on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None, summarize: bool = True,
+                       archive: Optional["ArticleArchive"] = None) -> Dict[str, Any]:
+        """Fetch news, score sentiment, summarize, speak and optionally store one symbol.
+
+        Runs the stages of ``self.pipeline``; storing the scored articles overlaps with
+        summarization. ``summarize=False`` stops after sentiment (no summary or audio).
+        Scored articles are appended to ``archive`` (default: ``self.archive``) if there is one.
+        ``on_event(stage, info)`` is called as each stage finishes: ``news_fetched``,
+        ``sentiment_done``, ``summary_done``, ``audio_done`` and ``stored``.
+        """
+        emit = on_event or (lambda stage, info: None)
+        key = symbol.upper()
 
-        summary_text = generate_summary(data.get("articles", []))
-        data["summary_text"] = summary_text
+        def on_stage(name, value):
+            if name == "news":
+                emit("news_fetched", {"symbol": value["symbol"], "articles": len(value.get("articles", []))})
+            elif name == "aggregate":
+                emit("sentiment_done", {"symbol": key, "overall_sentiment": value})
+            elif name == "summary":
+                emit("summary_done", {"symbol": key, "failed": value == FAILED_SUMMARY})
+            elif name == "audio":
+                emit("audio_done", {"symbol": key, "audio_path": value, "pending": self.background_audio})
 
-        audio_path = None
-        if do_tts:
-            audio_path = generate_audio(summary_text, symbol, output_dir=self.audio_output_dir)
-        data["audio_path"] = audio_path
+        archive = archive if archive is not None else self.archive
+        targets = ["aggregate"]
+        known: Dict[str, Any] = {"storage": storage, "archive": archive}
+        if summarize:
+            targets.append("summary")
+            if do_tts:
+                targets.append("audio")
+            else:
+                known["audio"] = None
+        if storage is not None:
+            targets += ["persist_articles", "persist_summary"] if summarize else ["persist_articles"]
+        if archive is not None:
+            targets.append("archive_articles")
+        ctx = self.run_stages(symbol, targets, on_stage=on_stage, **known)
 
+        data = ctx["news"]
+        data["overall_sentiment"] = ctx["aggregate"]
+        if summarize:
+            data["summary_text"] = ctx["summary"]
+            data["audio_path"] = ctx["audio"]
         if storage is not None:
-            storage.save_article_analysis(symbol, data.get("articles", []))
-            storage.save_summary(symbol, summary_text, audio_path)
+            if flush:
+                storage.flush()
+            emit("stored", {"symbol": data["symbol"]})
+        if archive is not None and flush:
+            archive.flush()
 
         return data
 
+    def process_symbols(self, symbols: Iterable[str], *, max_workers: int = 8, do_tts: bool = True, storage: Optional["MongoStorage"] = None,
+                        on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                        archive: Optional["ArticleArchive"] = None) -> Iterator[Dict[str, Any]]:
+        """Run ``process_symbol`` for a watchlist, overlapping the network-bound stages across symbols.
+
+        Results are yielded in completion order as each symbol finishes. Symbols that fail
+        yield ``{"symbol": ..., "error": ...}`` and the rest of the batch keeps going.
+        ``on_event`` is passed to every ``process_symbol`` call and runs on worker threads.
+        Buffered storage and archive writes are flushed when the generator finishes or is closed.
+        """
+        # Storage and archive writes from all symbols share their buffers and go out as bulk writes
+        archive = archive if archive is not None else self.archive
+        try:
+            yield from _run_batch(
+                lambda s: self.process_symbol(s, do_tts=do_tts, storage=storage, flush=False, on_event=on_event, archive=archive),
+                symbols,
+                max_workers,
+            )
+        finally:
+            # Also when the caller stops iterating early (break, exception, close())
+            try:
+                if storage is not None:
+                    storage.flush()
+            finally:
+                if archive is not None:
+                    archive.flush()
+
+    def _refresh_indicators(self, symbol: str) -> Dict[str, Any]:
+        key = symbol.upper()
+        # Take the state out while refreshing so concurrent calls for one symbol never share it
+        with self._state_lock:
+            state = self._indicator_states.pop(key, None)
+        from .indicators import get_streaming_indicators  # pandas/yfinance load only when prices are needed
+
+        indicators, state = get_streaming_indicators(symbol, state, cache=self.price_cache, provider=self.price_provider)
+        if state is not None:
+            with self._state_lock:
+                self._indicator_states[key] = state
+        return indicators
+
+    def export_indicator_state(self) -> Dict[str, Any]:
+        """Serialize the warm indicator state (JSON-compatible), e.g. to survive a worker restart."""
+        with self._state_lock:
+            return {symbol: state.to_dict() for symbol, state in self._indicator_states.items()}
+
+    def load_indicator_state(self, data: Dict[str, Any]) -> None:
+        """Restore state produced by ``export_indicator_state``."""
+        states = {symbol: IndicatorState.from_dict(item) for symbol, item in data.items()}
+        with self._state_lock:
+            self._indicator_states.update(states)
+
+    @metrics.timed("analyze")
     def analyze(self, symbol: str, use_news: bool = True) -> Dict[str, Any]:
         """Analyze stock sentiment combining technical indicators and optionally news sentiment.
         
@@ -100,59 +336,27 @@ class StockLens:
         
         Returns a dict with: { label: str, score: float, indicators: dict, news_sentiment: dict (optional) }
         """
-        indicators = get_technical_indicators(symbol)
+        # Prices and news are fetched concurrently; if the news stage fails (or times out) the
+        # result is based on technical indicators only
+        known = {} if use_news and self.n8n_webhook_url else {"news": None}
+        return self.analysis_pipeline.run({"symbol": symbol, **known}, ["analysis"])["analysis"]
+
+    def _score(self, indicators: Dict[str, Any], news_sentiment: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Label/score for already computed indicators and (optional) overall news sentiment."""
+        rule = self.scoring_rule
         tech_score = 0.0
-        news_score = 0.0
-        news_sentiment = None
-        
+        news_score = None
+
         # Calculate technical indicators score
         if "error" not in indicators:
-            rsi = indicators.get("RSI")
-            macd = indicators.get("MACD")
-            signal = indicators.get("Signal")
-            
-            if isinstance(rsi, (int, float)):
-                if rsi >= 60:
-                    tech_score += 0.35
-                elif rsi <= 40:
-                    tech_score -= 0.35
-            
-            if isinstance(macd, (int, float)) and isinstance(signal, (int, float)):
-                if macd > signal:
-                    tech_score += 0.45
-                elif macd < signal:
-                    tech_score -= 0.45
-        
-        # Optionally fetch and analyze news sentiment
-        if use_news and self.n8n_webhook_url:
-            try:
-                news_data = self.fetch_news(symbol)
-                articles = news_data.get("articles", [])
-                if articles:
-                    self.analyze_articles(articles)
-                    overall = _compute_overall_sentiment(articles)
-                    news_sentiment = overall
-                    # Convert news sentiment to score: Positive=0.5, Neutral=0, Negative=-0.5
-                    if overall["overall"] == "Positive":
-                        news_score = 0.5 * (overall["positive_articles"] / max(overall["total_articles"], 1))
-                    elif overall["overall"] == "Negative":
-                        news_score = -0.5 * (overall["negative_articles"] / max(overall["total_articles"], 1))
-            except Exception:
-                # If news fetch fails, continue with technical indicators only
-                pass
-        
-        # Combine scores (weighted: 60% tech, 40% news if available)
+            tech_score = rule.tech_score(indicators.get("RSI"), indicators.get("MACD"), indicators.get("Signal"))
         if news_sentiment:
-            combined_score = (tech_score * 0.6) + (news_score * 0.4)
-        else:
-            combined_score = tech_score
-        
-        label = "Neutral"
-        if combined_score >= 0.2:
-            label = "Positive"
-        elif combined_score <= -0.2:
-            label = "Negative"
-        
+            news_score = rule.news_score(news_sentiment)
+
+        # Combine scores (weighted tech/news blend when news is available)
+        combined_score = rule.combine(tech_score, news_score)
+        label = rule.label(combined_score)
+
         result = {
             "label": label,
             "score": round(combined_score, 2),
@@ -164,3 +368,18 @@ class StockLens:
         
         return result
 
+    def analyze_many(self, symbols: Iterable[str], *, use_news: bool = True, max_workers: int = 8) -> Iterator[Dict[str, Any]]:
+        """Batch version of ``analyze``; yields one result per symbol (with a ``symbol`` key) as it completes."""
+        return _run_batch(lambda s: self.analyze(s, use_news=use_news), symbols, max_workers)
+
+    def metrics(self, reset: bool = False) -> Dict[str, Any]:
+        """Latency per stage (count, mean, p50/p95/p99, errors), cache counters and HTTP client stats.
+
+        Stage timings come from ``stocklens.metrics`` and cover every ``StockLens`` in the
+        process; ``reset=True`` clears them after reading.
+        """
+        snapshot = metrics.snapshot()
+        snapshot["http"] = dict(self.http.stats)
+        if reset:
+            metrics.REGISTRY.reset()
+        return snapshot
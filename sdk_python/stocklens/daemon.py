@@ -0,0 +1,291 @@
+"""Keep a watchlist warm: scheduled, incremental pre-computation of every symbol's results.
+
+``WatchlistDaemon`` refreshes each symbol on its own cadence:
+
+1. ``news``: fetch articles from the webhook, collapse near-duplicates and score their sentiment;
+2. ``prices``: fold new bars into the symbol's warm ``IndicatorState`` and score it;
+3. ``summary``/``audio``: rerun BART and TTS only when the article set changed;
+4. ``storage``: write articles, summary and indicators to the storage layer.
+
+Newly scored articles also go to ``sl.archive`` when the ``StockLens`` has one.
+
+Due symbols come off a heap ordered by due time, then priority (lower runs first). At
+most ``max_workers`` symbols refresh at once, and each stage has its own concurrency
+budget, so a slow summarizer cannot starve news fetches. A failing symbol is retried
+with exponential backoff instead of on its normal cadence.
+
+The latest result per symbol is kept in memory (``snapshot``) and handed to
+``on_result``, e.g. to seed an HTTP response cache so requests are served precomputed.
+"""
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Union
+
+from . import metrics
+from .core import StockLens
+from .result_cache import articles_digest
+from .summarizer import FAILED_SUMMARY
+
+DEFAULT_STAGE_LIMITS = {"news": 8, "prices": 4, "summary": 1, "audio": 1, "storage": 2}
+
+
+class WatchlistDaemon:
+    """Scheduler that refreshes ``watchlist`` symbols every ``interval`` seconds in the background.
+
+    ``watchlist`` is an iterable of symbols or a ``{symbol: interval_seconds}`` mapping.
+    ``stage_limits`` overrides entries of ``DEFAULT_STAGE_LIMITS``. Failing symbols wait
+    ``backoff * 2**(failures - 1)`` seconds (jittered, capped at ``max_backoff``).
+    """
+
+    def __init__(self, sl: StockLens, watchlist: Union[Iterable[str], Mapping[str, float]] = (), *,
+                 interval: float = 300.0, storage=None, do_tts: bool = True, max_workers: int = 8,
+                 stage_limits: Optional[Mapping[str, int]] = None, backoff: float = 30.0, max_backoff: float = 1800.0,
+                 on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.sl = sl
+        self.interval = interval
+        self.storage = storage
+        self.do_tts = do_tts
+        self.max_workers = max_workers
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.on_result = on_result
+        limits = dict(DEFAULT_STAGE_LIMITS, **(stage_limits or {}))
+        self._stages = {stage: threading.BoundedSemaphore(n) for stage, n in limits.items()}
+        self._heap = []
+        self._seq = 0
+        self._symbols: Dict[str, Dict[str, Any]] = {}
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._running = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        items = watchlist.items() if isinstance(watchlist, Mapping) else ((s, None) for s in watchlist)
+        for symbol, every in items:
+            self.add(symbol, interval=every)
+
+    # Watchlist management
+
+    def add(self, symbol: str, *, interval: Optional[float] = None, priority: int = 0) -> None:
+        """Watch ``symbol`` (refreshing it right away); re-adding updates its cadence and priority."""
+        key = symbol.strip().upper()
+        with self._cond:
+            entry = self._symbols.setdefault(key, {"failures": 0, "last_error": None, "last_success": None})
+            entry["interval"] = interval or self.interval
+            entry["priority"] = priority
+            self._schedule(key, time.time())
+
+    def remove(self, symbol: str) -> None:
+        with self._cond:
+            self._symbols.pop(symbol.strip().upper(), None)
+
+    def refresh_now(self, symbol: str) -> None:
+        """Move ``symbol`` to the front of the queue (adding it if needed); if it is refreshing, it runs again right after."""
+        key = symbol.strip().upper()
+        with self._cond:
+            if key not in self._symbols:
+                self.add(key)
+            self._symbols[key]["priority_boost"] = True
+            self._schedule(key, time.time())
+
+    def _schedule(self, key: str, due: float) -> None:
+        # Caller holds self._cond. Older heap entries for the symbol become stale via the generation number
+        entry = self._symbols[key]
+        if key in self._running:
+            # _run schedules the next refresh when this one finishes; make it no later than ``due``
+            entry["requested"] = min(due, entry.get("requested", due))
+            return
+        entry["due"] = due
+        entry["generation"] = entry.get("generation", 0) + 1
+        priority = -1 if entry.pop("priority_boost", False) else entry["priority"]
+        self._seq += 1
+        heapq.heappush(self._heap, (due, priority, self._seq, key, entry["generation"]))
+        self._cond.notify()
+
+    # Results
+
+    def snapshot(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Latest precomputed result for ``symbol`` (a shallow copy), or None."""
+        snap = self._snapshots.get(symbol.strip().upper())
+        return dict(snap) if snap is not None else None
+
+    def snapshots(self) -> Dict[str, Dict[str, Any]]:
+        return {key: dict(snap) for key, snap in list(self._snapshots.items())}
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per symbol: ``next_run_in``, ``interval``, ``priority``, ``failures``, ``last_error``, ``last_success``, ``running``."""
+        now = time.time()
+        with self._cond:
+            return {
+                key: {
+                    "next_run_in": max(0.0, entry["due"] - now),
+                    "interval": entry["interval"],
+                    "priority": entry["priority"],
+                    "failures": entry["failures"],
+                    "last_error": entry["last_error"],
+                    "last_success": entry["last_success"],
+                    "running": key in self._running,
+                }
+                for key, entry in self._symbols.items()
+            }
+
+    # One refresh
+
+    def refresh(self, symbol: str) -> Dict[str, Any]:
+        """Refresh one symbol now, on the calling thread; returns (and stores) its new snapshot."""
+        key = symbol.strip().upper()
+        sl = self.sl
+        previous = self._snapshots.get(key)
+
+        with self._stages["news"]:
+            # Fetch, collapse near-duplicates and score: the same stages process_symbol runs.
+            # The archive skips stories seen on earlier refreshes, so only new ones are appended
+            targets = ["aggregate"] if sl.archive is None else ["aggregate", "archive_articles"]
+            ctx = sl.run_stages(key, targets, archive=sl.archive)
+            data = ctx["news"]
+            articles = data["articles"]
+            data["overall_sentiment"] = ctx["aggregate"]
+
+        with self._stages["prices"]:
+            indicators = sl._refresh_indicators(key)
+            data["analysis"] = sl._score(indicators, data["overall_sentiment"] if articles else None)
+
+        digest = articles_digest(articles)
+        changed = previous is None or previous.get("news_digest") != digest
+        if changed or previous.get("summary_text") == FAILED_SUMMARY:
+            with self._stages["summary"]:
+                data["summary_text"] = sl._summarize(articles)
+            metrics.inc("daemon_summaries", outcome="generated")
+        else:
+            data["summary_text"] = previous["summary_text"]
+            metrics.inc("daemon_summaries", outcome="unchanged")
+
+        data["audio_path"] = previous.get("audio_path") if previous else None
+        if self.do_tts and (data["audio_path"] is None or data["summary_text"] != previous.get("summary_text")):
+            with self._stages["audio"]:
+                data["audio_path"] = sl._speak(data["summary_text"], key)
+
+        if self.storage is not None:
+            with self._stages["storage"]:
+                if changed:
+                    self.storage.save_article_analysis(key, articles)
+                    self.storage.save_summary(key, data["summary_text"], data["audio_path"])
+                if "error" not in indicators:
+                    self.storage.save_indicators(key, indicators)
+
+        data["news_digest"] = digest
+        data["updated"] = time.time()
+        self._snapshots[key] = data
+        if self.on_result is not None:
+            self.on_result(key, data)
+        return data
+
+    def run_once(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Refresh ``symbols`` (default: the whole watchlist) concurrently and wait; returns ``{symbol: snapshot or error}``."""
+        with self._cond:
+            keys = [s.strip().upper() for s in symbols] if symbols is not None else list(self._symbols)
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for key, future in [(key, pool.submit(self._run, key)) for key in keys]:
+                results[key] = future.result()
+        if self.storage is not None:
+            self.storage.flush()
+        if self.sl.archive is not None:
+            self.sl.archive.flush()
+        return results
+
+    def _run(self, key: str) -> Dict[str, Any]:
+        with self._cond:
+            self._running.add(key)
+        try:
+            with metrics.span("daemon_refresh"):
+                result = self.refresh(key)
+            error = None
+        except Exception as e:
+            result = {"symbol": key, "error": str(e)}
+            error = result["error"]
+        now = time.time()
+        with self._cond:
+            self._running.discard(key)
+            entry = self._symbols.get(key)
+            if entry is not None:
+                if error is None:
+                    entry.update(failures=0, last_error=None, last_success=now)
+                    delay = entry["interval"]
+                else:
+                    entry["failures"] += 1
+                    entry["last_error"] = error
+                    delay = min(self.max_backoff, self.backoff * 2 ** (entry["failures"] - 1))
+                    delay *= 0.5 + random.random() / 2
+                    metrics.inc("daemon_failures", symbol=key)
+                self._schedule(key, min(now + delay, entry.pop("requested", now + delay)))
+            self._cond.notify()
+        return result
+
+    # Background loop
+
+    def start(self) -> "WatchlistDaemon":
+        """Run the scheduler on a background thread; returns self."""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="watchlist")
+        self._thread = threading.Thread(target=self._loop, name="watchlist-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None and wait:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+        if self.storage is not None and wait:
+            self.storage.flush()
+        if self.sl.archive is not None and wait:
+            self.sl.archive.flush()
+
+    def run_forever(self) -> None:
+        """Blocking variant of ``start`` for a dedicated process; stops on KeyboardInterrupt."""
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _next_due(self):
+        """Pop the first live heap entry that is due; returns ``(key, None)`` or ``(None, seconds_to_wait)``."""
+        while self._heap:
+            due, _, _, key, generation = self._heap[0]
+            entry = self._symbols.get(key)
+            if entry is None or entry["generation"] != generation or key in self._running:
+                heapq.heappop(self._heap)  # removed, rescheduled or already refreshing (_run reschedules it)
+                continue
+            wait = due - time.time()
+            if wait > 0:
+                return None, wait
+            heapq.heappop(self._heap)
+            return key, None
+        return None, None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                if len(self._running) >= self.max_workers:
+                    self._cond.wait(1.0)
+                    continue
+                key, wait = self._next_due()
+                if key is None:
+                    self._cond.wait(wait if wait is not None else 1.0)
+                    continue
+                self._running.add(key)
+            self._pool.submit(self._run, key)
@@ -0,0 +1,252 @@
+"""Near-duplicate detection for news articles, using MinHash signatures over headline + summary.
+
+Wire stories are often syndicated several times with slightly different headlines.
+``dedupe`` groups articles whose word-trigram sets are similar (estimated Jaccard at
+or above ``threshold``) and keeps one representative per group. The representative is
+the fullest copy, annotated with ``duplicates`` (how many other copies were dropped), so
+sentiment counts the story once and the summarizer reads it once.
+
+``SignatureIndex`` remembers, per symbol, the signatures of stories already scored along
+with their sentiment, optionally on disk. A story seen in an earlier run is marked
+``seen`` and reuses the stored sentiment instead of being scored again.
+
+Feeds carry tens of articles and the index is capped per symbol, so signatures are
+compared exhaustively with vectorized NumPy; there is no need for LSH buckets.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from . import metrics
+
+NUM_PERM = 64
+SHINGLE_WORDS = 3
+DEFAULT_THRESHOLD = 0.5
+
+_PRIME = (1 << 61) - 1
+_EMPTY = np.uint32(0xFFFFFFFF)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=None)
+def _permutations(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Fixed seed: signatures stored by one process must compare equal in the next
+    rng = np.random.default_rng(1)
+    return rng.integers(1, 1 << 31, num_perm, dtype=np.uint64), rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+
+
+def article_text(article: Any) -> str:
+    if isinstance(article, dict):
+        return f"{article.get('headline') or ''} {article.get('summary') or ''}"
+    return str(article)
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> Set[str]:
+    """Overlapping ``k``-word windows of the lowercased text (the whole text when shorter)."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def signature(text: str, num_perm: int = NUM_PERM) -> np.ndarray:
+    """MinHash signature of ``text``: the minimum of ``num_perm`` hash permutations over its shingles."""
+    grams = shingles(text)
+    if not grams:
+        return np.full(num_perm, _EMPTY, dtype=np.uint32)
+    # crc32 rather than hash(): Python's string hash is salted per process
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    a, b = _permutations(num_perm)
+    values = (np.outer(hashes, a) + b) % _PRIME
+    return (values & 0xFFFFFFFF).min(axis=0).astype(np.uint32)
+
+
+def signatures(articles: Sequence[Any], num_perm: int = NUM_PERM) -> np.ndarray:
+    """``(len(articles), num_perm)`` array of article signatures."""
+    if not articles:
+        return np.empty((0, num_perm), dtype=np.uint32)
+    return np.stack([signature(article_text(a), num_perm) for a in articles])
+
+
+def similarity(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of every row of ``left`` with every row of ``right``.
+
+    Empty texts are similar to nothing (not even each other).
+    """
+    sim = (left[:, None, :] == right[None, :, :]).mean(axis=2)
+    sim[(left == _EMPTY).all(axis=1)] = 0.0
+    sim[:, (right == _EMPTY).all(axis=1)] = 0.0
+    return sim
+
+
+def clusters(sigs: np.ndarray, threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    """Group row indices whose signatures are at least ``threshold`` similar (transitively), in first-seen order."""
+    parent = list(range(len(sigs)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows, cols = np.nonzero(np.triu(similarity(sigs, sigs) >= threshold, 1))
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(sigs)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+class SignatureIndex:
+    """Per-symbol memory of scored stories: signature, headline, sentiment and when it was last seen.
+
+    With ``directory`` set (default: ``STOCKLENS_DEDUP_DIR``, if set) each symbol's index is
+    kept in ``{SYMBOL}.json`` there, so it survives restarts. Entries not seen for ``ttl``
+    seconds are forgotten, and at most ``max_per_symbol`` of the most recently seen are kept.
+    """
+
+    def __init__(self, directory: Optional[str] = None, *, threshold: float = DEFAULT_THRESHOLD,
+                 ttl: Optional[float] = 7 * 86400, max_per_symbol: int = 2000):
+        directory = directory or os.environ.get("STOCKLENS_DEDUP_DIR")
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_symbol = max_per_symbol
+        self._symbols: Dict[str, Tuple[np.ndarray, List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9._-]", "_", symbol) + ".json")
+
+    def _load(self, symbol: str) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        # Caller holds self._lock
+        if symbol in self._symbols:
+            return self._symbols[symbol]
+        sigs, entries = np.empty((0, NUM_PERM), dtype=np.uint32), []
+        if self.directory:
+            try:
+                with open(self._path(symbol), "r", encoding="utf-8") as fh:
+                    stored = json.load(fh)
+                if stored.get("num_perm") == NUM_PERM and stored.get("entries"):
+                    entries = stored["entries"]
+                    sigs = np.array([e.pop("signature") for e in entries], dtype=np.uint32)
+            except (OSError, ValueError, KeyError):
+                pass
+        self._symbols[symbol] = self._trim(sigs, entries)
+        return self._symbols[symbol]
+
+    def _trim(self, sigs, entries):
+        keep = range(len(entries))
+        if self.ttl:
+            cutoff = time.time() - self.ttl
+            keep = [i for i in keep if entries[i]["last_seen"] >= cutoff]
+        keep = sorted(keep, key=lambda i: entries[i]["last_seen"])[-self.max_per_symbol:]
+        keep.sort()
+        return sigs[keep], [entries[i] for i in keep]
+
+    def match(self, symbol: str, sigs: np.ndarray) -> List[Optional[Dict[str, Any]]]:
+        """For each signature, the stored entry it duplicates (its ``last_seen`` is refreshed), or None."""
+        symbol = symbol.upper()
+        with self._lock:
+            stored, entries = self._load(symbol)
+            if not len(stored) or not len(sigs):
+                return [None] * len(sigs)
+            sim = similarity(sigs, stored)
+            best = sim.argmax(axis=1)
+            now = time.time()
+            matches = []
+            for row, col in enumerate(best.tolist()):
+                if sim[row, col] >= self.threshold:
+                    entries[col]["last_seen"] = now
+                    matches.append(dict(entries[col]))
+                else:
+                    matches.append(None)
+            return matches
+
+    def add(self, symbol: str, sigs: np.ndarray, articles: Sequence[Dict[str, Any]]) -> None:
+        """Remember scored ``articles`` (with signatures ``sigs``) for ``symbol`` and persist the index."""
+        if not len(sigs):
+            return
+        symbol = symbol.upper()
+        now = time.time()
+        new = [
+            {"headline": a.get("headline"), "sentiment": a.get("sentiment"), "score": a.get("score"),
+             "first_seen": now, "last_seen": now}
+            for a in articles
+        ]
+        with self._lock:
+            stored, entries = self._load(symbol)
+            self._symbols[symbol] = self._trim(np.concatenate([stored, sigs.astype(np.uint32)]), entries + new)
+            if self.directory:
+                self._save(symbol)
+
+    def _save(self, symbol: str) -> None:
+        # Caller holds self._lock; written to a temporary file and renamed so readers never see half a file
+        sigs, entries = self._symbols[symbol]
+        payload = {"num_perm": NUM_PERM, "entries": [dict(e, signature=s.tolist()) for e, s in zip(entries, sigs)]}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh)
+            os.replace(tmp, self._path(symbol))
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def forget(self, symbol: Optional[str] = None) -> None:
+        """Drop one symbol's index (or all of them), on disk as well."""
+        with self._lock:
+            names = [symbol.upper()] if symbol else list(self._symbols)
+            if not symbol and self.directory:
+                names += [n[:-5] for n in os.listdir(self.directory) if n.endswith(".json")]
+            for name in set(names):
+                self._symbols.pop(name, None)
+                if self.directory:
+                    try:
+                        os.remove(self._path(name))
+                    except OSError:
+                        pass
+
+
+def dedupe(articles: Sequence[Dict[str, Any]], *, threshold: float = DEFAULT_THRESHOLD,
+           index: Optional[SignatureIndex] = None, symbol: Optional[str] = None) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """Collapse near-duplicate ``articles``; returns ``(representatives, their signatures)``.
+
+    Representatives keep feed order and get ``duplicates``, the number of other copies
+    dropped. With an ``index``, a representative matching a story already seen for
+    ``symbol`` gets ``seen: True`` and that story's stored ``sentiment``/``score``.
+    """
+    sigs = signatures(articles)
+    keep = []
+    for group in clusters(sigs, threshold):
+        best = max(group, key=lambda i: len(article_text(articles[i])))  # the fullest copy
+        articles[best]["duplicates"] = len(group) - 1
+        keep.append((group[0], best))
+    keep = [best for _, best in sorted(keep)]
+    reps, rep_sigs = [articles[i] for i in keep], sigs[keep]
+    seen = 0
+    if index is not None and symbol:
+        for article, match in zip(reps, index.match(symbol, rep_sigs)):
+            if match is not None and match.get("sentiment") is not None:
+                article.update(seen=True, sentiment=match["sentiment"], score=match["score"])
+                seen += 1
+    metrics.inc("dedup_articles", len(articles) - len(reps), outcome="duplicate")
+    metrics.inc("dedup_articles", seen, outcome="seen")
+    metrics.inc("dedup_articles", len(reps) - seen, outcome="new")
+    return reps, rep_sigs
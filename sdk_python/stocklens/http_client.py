@@ -0,0 +1,206 @@
+"""Shared HTTP client for upstream JSON calls (the n8n news webhook).
+
+One ``HTTPClient`` holds a pooled keep-alive ``requests.Session`` and adds:
+
+- bounded concurrency: at most ``max_concurrency`` requests in flight upstream;
+- retries with full-jitter exponential backoff on connection errors, timeouts and
+  429/5xx responses (``Retry-After`` is honoured when it is short);
+- a per-host circuit breaker: after ``failure_threshold`` consecutive failures the
+  host is skipped for ``reset_timeout`` seconds (calls fail fast with
+  ``CircuitOpenError``), then a single trial request decides whether it closes again;
+- single-flight coalescing: identical GETs issued while one is already in flight
+  wait for that response instead of sending their own.
+
+Each caller gets its own parsed copy of the JSON body, so callers may mutate it.
+"""
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a host whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open (fail fast) -> half-open (one trial) -> closed."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True  # let exactly one request probe the host
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.body: Optional[bytes] = None
+        self.error: Optional[BaseException] = None
+
+
+class HTTPClient:
+    """Pooled, retrying, circuit-breaking JSON client; share one instance per process."""
+
+    def __init__(self, *, timeout: Union[float, Tuple[float, float]] = (5, 30), max_concurrency: int = 16,
+                 retries: int = 2, backoff: float = 0.5, max_backoff: float = 8.0, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0, pool_maxsize: int = 32, headers: Optional[Mapping[str, str]] = None,
+                 session: Optional[requests.Session] = None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        if headers:
+            session.headers.update(headers)
+        self.session = session
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._flights: Dict[tuple, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "coalesced": 0, "short_circuited": 0}
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def get_json(self, url: str, params: Optional[Mapping[str, Any]] = None,
+                 headers: Optional[Mapping[str, str]] = None) -> Any:
+        """GET ``url`` and parse the JSON body, sharing the upstream call with identical in-flight requests.
+
+        Raises ``CircuitOpenError`` while the host's breaker is open, ``requests.HTTPError``
+        for non-retryable (or exhausted) error statuses, ``requests.RequestException`` for
+        exhausted connection errors and ``ValueError`` for a body that is not JSON.
+        """
+        key = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats["coalesced"] += 1
+        if leader:
+            try:
+                flight.body = self._get(url, params, headers)
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+                flight.done.set()
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return json.loads(flight.body)
+
+    def _get(self, url, params, headers) -> bytes:
+        breaker = self.breaker(url)
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                with self._lock:
+                    self.stats["short_circuited"] += 1
+                raise CircuitOpenError(f"Circuit open for {urlsplit(url).netloc}; retry in up to {self.reset_timeout:.0f}s")
+            retry_after = None
+            try:
+                with self._slots:
+                    with self._lock:
+                        self.stats["requests"] += 1
+                    resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+            except BaseException:
+                # Not retried (redirect loop, broken body, bad URL...), but it still has to settle
+                # a half-open trial; otherwise the breaker would never let another request through
+                breaker.record_failure()
+                raise
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    # A 4xx means the host answered; it counts as healthy for the breaker
+                    breaker.record_success()
+                    resp.raise_for_status()
+                    return resp.content
+                breaker.record_failure()
+                if attempt == self.retries:
+                    resp.raise_for_status()
+                retry_after = _retry_after(resp)
+            with self._lock:
+                self.stats["retries"] += 1
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_backoff))
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def _retry_after(resp) -> Optional[float]:
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> HTTPClient:
+    """The process-wide client, so every ``StockLens`` instance shares one pool, breaker and flight table."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HTTPClient()
+        return _default
@@ -1,7 +1,13 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
-import requests
 import time
+import threading
+
+from .technicals import compute_indicators
+from .streaming import IndicatorState
+from .providers import _period_start, default_provider, fetch_bars
+from .metrics import timed
+
 
 def _safe_float(value):
     try:
@@ -9,105 +15,302 @@ def _safe_float(value):
     except Exception:
         return None
 
-def get_technical_indicators(symbol, max_retries=2):
-    try:
-        possible_symbols = [symbol.upper(), f"{symbol.upper()}.NS", f"{symbol.upper()}.BO", f"{symbol.upper()}.NSE"]
-        data = None
-        successful_symbol = None
-
-        session = requests.Session()
-        session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
-        })
-
-        for attempt in range(max_retries + 1):
-            for s in possible_symbols:
-                try:
-                    # Add delay between retries to avoid rate limiting
-                    if attempt > 0:
-                        time.sleep(1 * attempt)
-                    
-                    temp = yf.download(s, period="6mo", interval="1d", progress=False, show_errors=False, threads=False, session=session)
-                    if temp is not None and not temp.empty and len(temp) >= 30:
-                        data = temp
-                        successful_symbol = s
-                        break
-
-                    ticker = yf.Ticker(s, session=session)
-                    hist = ticker.history(period="6mo", interval="1d")
-                    if hist is not None and not hist.empty and len(hist) >= 30:
-                        data = hist
-                        successful_symbol = s
-                        break
-
-                    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{s}?range=6mo&interval=1d"
-                    resp = session.get(url, timeout=15)
-                    if resp.status_code == 200:
-                        j = resp.json()
-                        result_nodes = (j or {}).get("chart", {}).get("result", [])
-                        if result_nodes:
-                            node = result_nodes[0]
-                            indicators = (node.get("indicators", {}) or {}).get("quote", [])
-                            closes = indicators[0].get("close") if indicators else None
-                            if closes:
-                                close_series = pd.Series(closes, dtype=float).dropna()
-                                if len(close_series) >= 30:
-                                    data = pd.DataFrame({"Close": close_series.values})
-                                    successful_symbol = s
-                                    break
-                except Exception:
-                    continue
-            
-            if data is not None and not data.empty:
-                break
 
+def _column(data, name):
+    """Return one price column as a 1-D float array (some providers nest it under the ticker)."""
+    if name not in data:
+        return None
+    col = data[name]
+    if isinstance(col, pd.DataFrame):
+        col = col.iloc[:, 0]
+    return col.to_numpy(dtype=float)
+
+
+# In-process memo of symbol -> resolved ticker (e.g. INFY -> INFY.NS); PriceCache persists the same map
+_resolved_symbols = {}
+_resolved_lock = threading.Lock()
+
+
+def _candidate_symbols(symbol):
+    return [symbol.upper(), f"{symbol.upper()}.NS", f"{symbol.upper()}.BO", f"{symbol.upper()}.NSE"]
+
+
+def fetch_price_history(symbol, max_retries=2, *, period="6mo", interval="1d", min_bars=30, candidates=None, start=None,
+                        provider=None):
+    """Fetch OHLCV bars, trying the bare ticker and Indian exchange suffixes.
+
+    ``provider`` defaults to ``providers.default_provider()`` (yfinance download, then
+    ``Ticker.history``, then the chart API, ordered by their track record). ``start``
+    (a timestamp) switches from a ``period`` window to "everything since", which is how
+    cached histories fetch only their missing tail.
+    Returns ``(resolved_symbol, DataFrame)``, or ``(None, None)`` when nothing usable was found.
+    """
+    provider = provider or default_provider()
+    possible_symbols = candidates or _candidate_symbols(symbol)
+    attempts = max_retries + 1 if provider.retryable else 1
+
+    for attempt in range(attempts):
+        # Add delay between retries to avoid rate limiting
+        if attempt > 0:
+            time.sleep(1 * attempt)
+        for s in possible_symbols:
+            try:
+                data = fetch_bars(provider, s, min_bars=min_bars, period=period, interval=interval, start=start)
+            except Exception:
+                continue
+            if data is not None:
+                return s, data
+    return None, None
+
+
+@timed("fetch_prices_many")
+def download_price_histories(tickers, *, period="6mo", interval="1d", start=None, batch_size=100, provider=None, min_bars=1):
+    """Fetch many tickers through the provider's batched path; returns ``{ticker: DataFrame}``.
+
+    Missing tickers are not retried here (a miss usually means a wrong exchange suffix);
+    no suffix resolution is done either.
+    """
+    provider = provider or default_provider()
+    got = provider.fetch_many(list(dict.fromkeys(tickers)), period=period, interval=interval, start=start, batch_size=batch_size)
+    return {t: data for t, data in got.items() if len(data) >= min_bars}
+
+
+def load_price_histories(symbols, max_retries=2, *, cache=None, period="6mo", interval="1d", batch_size=100, min_bars=30,
+                         provider=None):
+    """Batched ``load_price_history``: returns ``{SYMBOL: (resolved_symbol, DataFrame)}`` for the symbols found.
+
+    Exchange suffixes are resolved for the whole batch at once: known resolutions (memo
+    or ``PriceCache``) and bare tickers go in the first multi-ticker download, the
+    symbols still missing are retried together with the next suffix, and so on. With a
+    cache, stale symbols share one delta download. Only symbols no batch could resolve
+    fall back to the per-symbol path (``Ticker.history`` and the chart API).
+    """
+    keys = list(dict.fromkeys(s.upper() for s in symbols))
+    resolved = {k: (cache.resolve(k) if cache is not None else None) or _resolved_symbols.get(k) for k in keys}
+    found = {}
+
+    if cache is not None:
+        stale = {}
+        for key in keys:
+            cached = cache.load(resolved[key], interval) if resolved[key] else None
+            if cached is not None and not cached.empty:
+                found[key] = (resolved[key], cached)
+                if not cache.is_fresh(resolved[key], interval):
+                    stale[key] = cached.index[-1]
+        if stale:
+            deltas = download_price_histories([resolved[k] for k in stale], interval=interval, start=min(stale.values()),
+                                              batch_size=batch_size, provider=provider)
+            for key in stale:
+                delta = deltas.get(resolved[key])
+                if delta is not None:
+                    found[key] = (resolved[key], cache.store(resolved[key], delta, interval))
+
+    pending = [k for k in keys if k not in found]
+    candidates = {}
+    for key in pending:
+        tried = _candidate_symbols(key)
+        candidates[key] = [resolved[key]] + [c for c in tried if c != resolved[key]] if resolved[key] else tried
+    for round_ in range(max((len(c) for c in candidates.values()), default=0)):
+        tickers = {candidates[k][round_]: k for k in pending if round_ < len(candidates[k])}
+        if not tickers:
+            break
+        downloaded = download_price_histories(list(tickers), period=period, interval=interval, batch_size=batch_size,
+                                              provider=provider)
+        for ticker, data in downloaded.items():
+            key = tickers[ticker]
+            if len(data) >= min_bars:
+                if cache is not None:
+                    data = cache.store(ticker, data, interval)
+                    cache.remember(key, ticker)
+                found[key] = (ticker, data)
+        pending = [k for k in pending if k not in found]
+
+    # Whatever the batches could not resolve goes through the per-symbol fallbacks
+    for key in pending:
+        ticker, data = load_price_history(key, max_retries, cache=cache, period=period, interval=interval, provider=provider)
+        if data is not None and not data.empty:
+            found[key] = (ticker, data)
+
+    with _resolved_lock:
+        _resolved_symbols.update({key: ticker for key, (ticker, _) in found.items()})
+    for key, (ticker, data) in found.items():
+        start = _period_start(data.index[-1], period)
+        if start is not None:
+            found[key] = (ticker, data[data.index >= start])
+    return found
+
+
+def load_price_history(symbol, max_retries=2, *, cache=None, period="6mo", interval="1d", provider=None):
+    """Return ``(resolved_symbol, DataFrame)`` for the last ``period`` of bars.
+
+    The exchange suffix found for a symbol is remembered. With a ``PriceCache`` the bars
+    are kept on disk and later calls only download the bars from the last cached
+    timestamp onwards (re-fetching that bar, which may still have been forming). If the
+    delta download fails the cached bars are used as they are.
+    """
+    key = symbol.upper()
+    resolved = (cache.resolve(key) if cache is not None else None) or _resolved_symbols.get(key)
+    cached = cache.load(resolved, interval) if cache is not None and resolved else None
+
+    if cached is not None and not cached.empty:
+        data = cached
+        if not cache.is_fresh(resolved, interval):
+            _, delta = fetch_price_history(resolved, max_retries, interval=interval, min_bars=1, candidates=[resolved],
+                                           start=cached.index[-1], provider=provider)
+            if delta is not None and not delta.empty:
+                data = cache.store(resolved, delta, interval)
+    else:
+        candidates = [resolved] + [c for c in _candidate_symbols(symbol) if c != resolved] if resolved else None
+        resolved, data = fetch_price_history(symbol, max_retries, period=period, interval=interval, candidates=candidates,
+                                             provider=provider)
         if data is None or data.empty:
-            return {"error": f"No valid data found for symbol: {symbol}. Tried: {', '.join(possible_symbols)}"}
+            return None, None
+        if cache is not None:
+            data = cache.store(resolved, data, interval)
+            cache.remember(key, resolved)
 
-        close_prices = data["Close"].values.astype(float)
-        result = {"symbol": successful_symbol}
+    with _resolved_lock:
+        _resolved_symbols[key] = resolved
+    start = _period_start(data.index[-1], period)
+    if start is not None:
+        data = data[data.index >= start]
+    return resolved, data
+
+
+@timed("get_technical_indicators")
+def get_technical_indicators(symbol, max_retries=2, *, full_series=False, cache=None, provider=None, **periods):
+    """Fetch ~6 months of daily bars and compute RSI, MACD, Bollinger bands, SMA/EMA, ATR and stochastics.
+
+    Pass a ``PriceCache`` as ``cache`` to keep bars on disk and only fetch new ones, and a
+    ``providers.PriceProvider`` as ``provider`` to read bars from somewhere other than Yahoo.
+    ``periods`` are forwarded to ``technicals.compute_indicators`` (e.g. ``rsi_period=7``).
+    With ``full_series=True`` every indicator is returned as a full NumPy series aligned
+    with ``result["index"]`` instead of only its latest value.
+    """
+    try:
+        successful_symbol, data = load_price_history(symbol, max_retries, cache=cache, provider=provider)
+        if data is None or data.empty:
+            return {"error": f"No valid data found for symbol: {symbol}. Tried: {', '.join(_candidate_symbols(symbol))}"}
 
-        def calculate_rsi(prices, period=14):
-            delta = pd.Series(prices).diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi.dropna().iloc[-1] if not rsi.dropna().empty else None
-
-        result["RSI"] = _safe_float(calculate_rsi(close_prices))
-
-        def calculate_macd(prices, fast=12, slow=26, signal=9):
-            ema_fast = pd.Series(prices).ewm(span=fast).mean()
-            ema_slow = pd.Series(prices).ewm(span=slow).mean()
-            macd_line = ema_fast - ema_slow
-            signal_line = macd_line.ewm(span=signal).mean()
-            return (
-                macd_line.dropna().iloc[-1] if not macd_line.dropna().empty else None,
-                signal_line.dropna().iloc[-1] if not signal_line.dropna().empty else None,
-            )
-
-        macd, signal = calculate_macd(close_prices)
-        result["MACD"] = _safe_float(macd)
-        result["Signal"] = _safe_float(signal)
-
-        def calculate_bollinger_bands(prices, period=20, std_dev=2):
-            sma = pd.Series(prices).rolling(window=period).mean()
-            std = pd.Series(prices).rolling(window=period).std()
-            upper = sma + (std * std_dev)
-            lower = sma - (std * std_dev)
-            return (
-                upper.dropna().iloc[-1] if not upper.dropna().empty else None,
-                sma.dropna().iloc[-1] if not sma.dropna().empty else None,
-                lower.dropna().iloc[-1] if not lower.dropna().empty else None,
-            )
-
-        bb_upper, bb_middle, bb_lower = calculate_bollinger_bands(close_prices)
-        result["BOLL_UPPER"] = _safe_float(bb_upper)
-        result["BOLL_MIDDLE"] = _safe_float(bb_middle)
-        result["BOLL_LOWER"] = _safe_float(bb_lower)
+        close_prices = _column(data, "Close")
+        result = {"symbol": successful_symbol}
+        indicators = compute_indicators(close_prices, _column(data, "High"), _column(data, "Low"), full=full_series, **periods)
+        if full_series:
+            result["index"] = list(data.index)
+            result.update(indicators)
+        else:
+            result.update({name: _safe_float(value) for name, value in indicators.items()})
 
         return result
     except Exception as e:
         return {"error": str(e)}
 
+
+def _price_matrix(frames, name):
+    """Stack one column of each frame into a (bars x symbols) matrix, bottom-aligned and NaN-padded on top."""
+    length = max(len(data) for data in frames)
+    out = np.full((length, len(frames)), np.nan)
+    for j, data in enumerate(frames):
+        values = _column(data, name)
+        if values is not None:
+            out[length - len(values):, j] = values
+    return out
+
+
+@timed("get_technical_indicators_many")
+def get_technical_indicators_many(symbols, max_retries=2, *, full_series=False, cache=None, batch_size=100, provider=None,
+                                  **periods):
+    """``get_technical_indicators`` for a whole universe: ``{SYMBOL: result}`` with the same result shape.
+
+    Prices come from ``load_price_histories`` (a handful of multi-ticker downloads over
+    one pooled session instead of a round trip per symbol and suffix), and indicators
+    are computed once over a wide matrix with one column per symbol. Histories are
+    aligned by bar count, not date, so each column is exactly its own series.
+    """
+    keys = list(dict.fromkeys(s.upper() for s in symbols))
+    try:
+        found = load_price_histories(keys, max_retries, cache=cache, batch_size=batch_size, provider=provider)
+    except Exception as e:
+        return {key: {"error": str(e)} for key in keys}
+    results = {
+        key: {"error": f"No valid data found for symbol: {key}. Tried: {', '.join(_candidate_symbols(key))}"}
+        for key in keys if key not in found
+    }
+    ordered = [k for k in keys if k in found]
+    if not ordered:
+        return results
+
+    frames = [found[k][1] for k in ordered]
+    indicators = compute_indicators(
+        _price_matrix(frames, "Close"), _price_matrix(frames, "High"), _price_matrix(frames, "Low"),
+        full=full_series, **periods,
+    )
+    for j, key in enumerate(ordered):
+        ticker, data = found[key]
+        has_range = "High" in data and "Low" in data
+        result = {"symbol": ticker}
+        if full_series:
+            result["index"] = list(data.index)
+        for name, values in indicators.items():
+            if not has_range and name in ("ATR", "STOCH_K", "STOCH_D"):
+                continue
+            if full_series:
+                result[name] = values[len(values) - len(data):, j]
+            else:
+                result[name] = _safe_float(values[j])
+        results[key] = result
+    return {key: results[key] for key in keys}
+
+
+def _apply_bars(state, data):
+    return state.extend(_column(data, "Close"), list(data.index), _column(data, "High"), _column(data, "Low"))
+
+
+@timed("get_streaming_indicators")
+def get_streaming_indicators(symbol, state=None, max_retries=2, *, recent_period="5d", cache=None, provider=None, **periods):
+    """Incremental variant of ``get_technical_indicators`` for repeated refreshes.
+
+    With a warm ``IndicatorState`` only the last few days of bars are fetched and folded
+    in (the still-forming bar is revised in place); otherwise the full history is
+    downloaded once to seed a new state. With a ``PriceCache`` the bars come from the
+    cache's delta fetch instead. Returns ``(result, state)``; ``state`` is None
+    when no data could be fetched.
+    """
+    try:
+        loaded = False
+        if state is not None and state.symbol and state.last_timestamp is not None and cache is not None:
+            # Look up the caller's symbol, seeded with the state's resolution: state.symbol is
+            # already resolved (INFY.NS), and on a cold cache it would be probed with suffixes
+            # again (INFY.NS.NS, ...) and cached under its own name
+            if cache.resolve(symbol) is None:
+                cache.remember(symbol, state.symbol)
+            resolved, data = load_price_history(symbol, max_retries, cache=cache, provider=provider)
+            loaded = True
+            if resolved == state.symbol and data is not None and not data.empty:
+                recent = data[data.index >= pd.Timestamp(state.last_timestamp, unit="s", tz="UTC")]
+                _apply_bars(state, recent)
+                result = {"symbol": state.symbol}
+                result.update(state.values())
+                return result, state
+        elif state is not None and state.symbol and state.last_timestamp is not None:
+            resolved, recent = fetch_price_history(state.symbol, max_retries, period=recent_period, min_bars=1,
+                                                   candidates=[state.symbol], provider=provider)
+            # Only trust the delta if it overlaps what the state has already seen
+            if recent is not None and not recent.empty and recent.index[0].timestamp() <= state.last_timestamp:
+                _apply_bars(state, recent)
+                result = {"symbol": state.symbol}
+                result.update(state.values())
+                return result, state
+
+        if not loaded:
+            resolved, data = load_price_history(symbol, max_retries, cache=cache, provider=provider)
+        if data is None or data.empty:
+            return {"error": f"No valid data found for symbol: {symbol}. Tried: {', '.join(_candidate_symbols(symbol))}"}, None
+        state = IndicatorState(**periods)
+        state.symbol = resolved
+        _apply_bars(state, data)
+        result = {"symbol": resolved}
+        result.update(state.values())
+        return result, state
+    except Exception as e:
+        return {"error": str(e)}, None
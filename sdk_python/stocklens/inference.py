@@ -0,0 +1,187 @@
+"""Summarizer model and runtime selection, including a one-time ONNX export.
+
+A summarizer is chosen by a spec ``"<model>:<backend>"`` (either part may be left out):
+
+- model: ``bart`` (``facebook/bart-large-cnn``, the default), ``distilbart``
+  (``sshleifer/distilbart-cnn-12-6``, 12 encoder / 6 decoder layers) or any Hugging
+  Face id or local directory;
+- backend:
+
+  - ``torch``: fp32 PyTorch, the default;
+  - ``torch-int8``: PyTorch with its ``Linear`` layers dynamically quantized;
+  - ``onnx``: ONNX Runtime (needs ``optimum[onnxruntime]``);
+  - ``onnx-int8``: ONNX Runtime with int8 weights from dynamic quantization.
+
+``STOCKLENS_SUMMARIZER`` sets the process-wide spec (e.g. ``distilbart:onnx-int8``), or
+call ``configure_summarizer`` before the first summary. The ONNX backends export the
+model once into ``STOCKLENS_MODEL_DIR`` (default ``~/.cache/stocklens/models``) and load
+it from there afterwards; ``python -m stocklens.inference export`` does it ahead of time,
+e.g. while building an image. ``python -m benchmarks.summary_quality`` compares a spec's
+summaries, latency and memory against the fp32 BART pipeline.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+from .models import register_model
+
+MODELS = {
+    "bart": "facebook/bart-large-cnn",
+    "distilbart": "sshleifer/distilbart-cnn-12-6",
+}
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_SPEC = "bart:torch"
+
+_EXPORT_MARKER = "stocklens-export.json"
+_export_lock = threading.Lock()
+
+
+def parse_spec(spec: Optional[str] = None) -> Tuple[str, str]:
+    """``(model_id, backend)`` for ``spec`` (default: ``STOCKLENS_SUMMARIZER``, then ``bart:torch``)."""
+    spec = (spec or os.environ.get("STOCKLENS_SUMMARIZER") or DEFAULT_SPEC).strip()
+    model, sep, backend = spec.rpartition(":")
+    if not sep:
+        model, backend = spec, "torch"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown summarizer backend: {backend} (choose from {', '.join(BACKENDS)})")
+    model = model or "bart"
+    return MODELS.get(model, model), backend
+
+
+def model_dir() -> str:
+    return os.path.expanduser(os.environ.get("STOCKLENS_MODEL_DIR") or os.path.join("~", ".cache", "stocklens", "models"))
+
+
+def export_path(model_id: str, backend: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "--", model_id.strip("/\\"))
+    return os.path.join(model_dir(), slug, backend)
+
+
+def is_exported(model_id: str, backend: str) -> bool:
+    return os.path.exists(os.path.join(export_path(model_id, backend), _EXPORT_MARKER))
+
+
+def export_onnx(model_id: str, quantize: bool = True, force: bool = False) -> str:
+    """Export ``model_id`` to ONNX (and int8-quantize it) under ``model_dir()``; returns the directory.
+
+    Skipped when a finished export exists, unless ``force``. The files are written to a
+    temporary directory and renamed into place, so other processes never see half an export.
+    """
+    backend = "onnx-int8" if quantize else "onnx"
+    target = export_path(model_id, backend)
+    with _export_lock:
+        if is_exported(model_id, backend) and not force:
+            return target
+        # The fp32 export is the input for quantization, so it is kept (and reused) as well
+        source = export_path(model_id, "onnx")
+        if not is_exported(model_id, "onnx") or force:
+            _write_atomically(source, lambda tmp: _export_fp32(model_id, tmp), model_id, "onnx")
+        if quantize:
+            _write_atomically(target, lambda tmp: _quantize_dir(source, tmp), model_id, backend)
+    return target
+
+
+def _write_atomically(target, build, model_id, backend):
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=f".{backend}-")
+    try:
+        build(tmp)
+        with open(os.path.join(tmp, _EXPORT_MARKER), "w", encoding="utf-8") as fh:
+            json.dump({"model": model_id, "backend": backend, "versions": _versions()}, fh, indent=1)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _export_fp32(model_id, out_dir):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    ORTModelForSeq2SeqLM.from_pretrained(model_id, export=True).save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(out_dir)
+
+
+def _quantize_dir(source, out_dir):
+    # Dynamic quantization: int8 weights, activations quantized on the fly (no calibration data)
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    for name in os.listdir(source):
+        path = os.path.join(source, name)
+        if name == _EXPORT_MARKER or os.path.isdir(path):
+            continue
+        if name.endswith(".onnx"):
+            quantize_dynamic(path, os.path.join(out_dir, name), weight_type=QuantType.QInt8)
+        elif not name.endswith(".onnx_data"):
+            shutil.copy2(path, out_dir)  # config, generation config, tokenizer files
+
+
+def _versions():
+    versions = {}
+    for module in ("transformers", "optimum", "onnxruntime", "torch"):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            pass
+    return versions
+
+
+def load_summarizer(spec: Optional[str] = None):
+    """Build a ``transformers`` summarization pipeline for ``spec`` (exporting first if needed)."""
+    model_id, backend = parse_spec(spec)
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    if backend.startswith("onnx"):
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        path = export_onnx(model_id, quantize=backend == "onnx-int8")
+        return pipeline("summarization", model=ORTModelForSeq2SeqLM.from_pretrained(path),
+                        tokenizer=AutoTokenizer.from_pretrained(path))
+    if backend == "torch-int8":
+        import torch
+
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_id).eval()
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(model_id))
+    return pipeline("summarization", model=model_id)
+
+
+def configure_summarizer(spec: Optional[str] = None) -> Tuple[str, str]:
+    """Use ``spec`` for every later summary in this process (a loaded summarizer is dropped); returns it parsed."""
+    parsed = parse_spec(spec)
+    spec = f"{parsed[0]}:{parsed[1]}"
+    register_model("summarizer", lambda: load_summarizer(spec))
+    return parsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m stocklens.inference", description="Export summarizer models for ONNX Runtime")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Export (and quantize) a model into the model cache")
+    export.add_argument("spec", nargs="?", default=None, help="e.g. distilbart:onnx-int8 (default: STOCKLENS_SUMMARIZER)")
+    export.add_argument("--force", action="store_true", help="Re-export even if a finished export exists")
+    sub.add_parser("list", help="Show the known models and finished exports")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, model_id in MODELS.items():
+            done = [backend for backend in ("onnx", "onnx-int8") if is_exported(model_id, backend)]
+            print(f"{name:<12} {model_id:<36} exported: {', '.join(done) or '-'}")
+        return 0
+    model_id, backend = parse_spec(args.spec)
+    if not backend.startswith("onnx"):
+        parser.error(f"{backend} needs no export; pick an onnx or onnx-int8 spec")
+    print(export_onnx(model_id, quantize=backend == "onnx-int8", force=args.force))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,262 @@
+"""Lightweight in-process instrumentation: per-stage latency histograms and counters.
+
+Wrap a pipeline stage with ``span("fetch_news")`` (a context manager) or decorate it
+with ``@timed("fetch_news")``; every call records its wall-clock duration in a
+fixed-bucket histogram for that stage, and exceptions escaping the stage also bump
+its error count. ``inc(name, **labels)`` counts events such as cache hits.
+
+Everything lands in the process-wide ``REGISTRY``; read it with ``snapshot()`` (plain
+dict) or ``render()`` (Prometheus text exposition format, served by the backend at
+``/metrics``). Set ``STOCKLENS_METRICS=0`` or call ``disable()`` to turn recording off:
+a disabled span is a shared no-op object, so the cost is one attribute check per call.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds in seconds: milliseconds for TextBlob/cache hits up to a minute for cold BART/gTTS
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Per-bucket (non-cumulative) counts plus count/sum/max; quantiles interpolate within a bucket."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class _Span:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry: "Registry", stage: str):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.stage, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _label_str(labels: Iterable[Tuple[str, Any]]) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Thread-safe store of per-stage histograms, error counts and labelled counters."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, enabled: bool = True, prefix: str = "stocklens"):
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self.prefix = prefix
+        self._stages: Dict[str, Histogram] = {}
+        self._errors: Dict[str, int] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+        self._lock = threading.Lock()
+
+    def span(self, stage: str):
+        """Context manager timing one run of ``stage``."""
+        return _Span(self, stage) if self.enabled else _NULL_SPAN
+
+    def timed(self, stage: Optional[str] = None):
+        """Decorator timing every call of the wrapped function (``stage`` defaults to its name)."""
+
+        def decorate(func):
+            name = stage or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    def observe(self, stage: str, seconds: float, error: bool = False) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = Histogram(self.buckets)
+            hist.observe(seconds)
+            if error:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_collector(self, collect: Callable[[], Dict[str, float]]) -> None:
+        """Register a callable returning ``{metric_name: value}`` read at render time (e.g. client stats).
+
+        Names ending in ``_total`` are exported as counters, anything else as gauges.
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._errors.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """``{"stages": {stage: {count, errors, total_seconds, mean, p50, p95, p99, max}}, "counters": {...}}``."""
+        with self._lock:
+            stages = {}
+            for stage, hist in self._stages.items():
+                stages[stage] = {
+                    "count": hist.count,
+                    "errors": self._errors.get(stage, 0),
+                    "total_seconds": hist.sum,
+                    "mean": hist.sum / hist.count,
+                    "p50": hist.quantile(0.5),
+                    "p95": hist.quantile(0.95),
+                    "p99": hist.quantile(0.99),
+                    "max": hist.max,
+                }
+            counters = {}
+            for (name, labels), value in self._counters.items():
+                counters[f"{name}{{{_label_str(labels)}}}" if labels else name] = value
+        return {"stages": stages, "counters": counters}
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        p = self.prefix
+        with self._lock:
+            stages = {stage: (list(h.counts), h.count, h.sum) for stage, h in self._stages.items()}
+            errors = dict(self._errors)
+            counters = dict(self._counters)
+            collectors = list(self._collectors)
+
+        lines = []
+        if stages:
+            name = f"{p}_stage_duration_seconds"
+            lines += [f"# HELP {name} Wall-clock time per pipeline stage.", f"# TYPE {name} histogram"]
+            for stage in sorted(stages):
+                counts, count, total = stages[stage]
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{name}_bucket{{{_label_str([('stage', stage), ('le', le)])}}} {cumulative}")
+                lines.append(f"{name}_sum{{{_label_str([('stage', stage)])}}} {_number(total)}")
+                lines.append(f"{name}_count{{{_label_str([('stage', stage)])}}} {count}")
+            name = f"{p}_stage_errors_total"
+            lines += [f"# HELP {name} Stage runs that raised.", f"# TYPE {name} counter"]
+            for stage in sorted(stages):
+                lines.append(f"{name}{{{_label_str([('stage', stage)])}}} {errors.get(stage, 0)}")
+
+        by_name: Dict[str, list] = {}
+        for (counter, labels), value in counters.items():
+            by_name.setdefault(counter, []).append((labels, value))
+        for counter in sorted(by_name):
+            name = f"{p}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(by_name[counter]):
+                lines.append(f"{name}{{{_label_str(labels)}}} {_number(value)}" if labels else f"{name} {_number(value)}")
+
+        for collect in collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for metric, value in sorted(values.items()):
+                name = f"{p}_{metric}"
+                lines.append(f"# TYPE {name} {'counter' if metric.endswith('_total') else 'gauge'}")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry(enabled=os.environ.get("STOCKLENS_METRICS", "1").lower() not in ("0", "false", "no", "off"))
+
+# Prometheus scrapers expect this content type for the text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def span(stage: str):
+    return REGISTRY.span(stage)
+
+
+def timed(stage: Optional[str] = None):
+    return REGISTRY.timed(stage)
+
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    REGISTRY.inc(name, value, **labels)
+
+
+def snapshot() -> Dict[str, Any]:
+    return REGISTRY.snapshot()
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def enable() -> None:
+    REGISTRY.enabled = True
+
+
+def disable() -> None:
+    REGISTRY.enabled = False
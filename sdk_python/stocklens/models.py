@@ -0,0 +1,66 @@
+"""Process-wide registry of lazily loaded models.
+
+Nothing heavy is imported until a model is first requested, so ``import stocklens``
+and ``analyze()``/``fetch_news()`` callers never pay for transformers or torch.
+Long-running services can call ``warmup()`` at startup to load eagerly instead.
+"""
+import threading
+from typing import Any, Callable, Dict, Set
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_optional: Set[str] = set()  # registered with default=False: loaded on use, never by a bare warmup()
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def register_model(name: str, factory: Callable[[], Any], *, default: bool = True) -> None:
+    """Register (or replace) the zero-argument factory used to build ``name`` on first use.
+
+    ``default=False`` marks an optional model (e.g. one behind a non-default backend) that
+    ``warmup()`` without arguments skips.
+    """
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+        if default:
+            _optional.discard(name)
+        else:
+            _optional.add(name)
+
+
+def get_model(name: str) -> Any:
+    """Return the shared instance of ``name``, building it exactly once even under concurrent first use."""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        if name not in _instances:
+            if name not in _factories:
+                raise KeyError(f"Unknown model: {name}")
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def is_loaded(name: str) -> bool:
+    return name in _instances
+
+
+def unload(name: str) -> None:
+    """Drop the shared instance so its memory can be reclaimed; the next ``get_model`` reloads it."""
+    with _lock:
+        _instances.pop(name, None)
+
+
+def warmup(*names: str) -> None:
+    """Load the named models now (every default model when called without arguments)."""
+    for name in names or [name for name in list(_factories) if name not in _optional]:
+        get_model(name)
+
+
+def _load_summarizer():
+    # Model and runtime come from STOCKLENS_SUMMARIZER (fp32 BART by default); see stocklens.inference
+    from .inference import load_summarizer
+    return load_summarizer()
+
+
+register_model("summarizer", _load_summarizer)
@@ -0,0 +1,222 @@
+"""Composable pipeline stages with declared dependencies, run concurrently where they allow.
+
+A ``Stage`` is a named function of the run context (a dict holding the inputs and every
+finished stage's output under its name) plus the names of the stages it ``requires``.
+``Pipeline.run`` starts each stage as soon as its requirements are done, so independent
+stages (e.g. price and news fetches) overlap on a shared thread pool while the calling
+thread coordinates.
+
+Per stage:
+
+- ``timeout``: seconds to wait before giving up on it. A Python call cannot be
+  interrupted, so a timed-out stage keeps its thread until it returns (its result is
+  ignored). Timed stages therefore run on a separate, smaller pool
+  (``timed_executor``): stuck calls can exhaust only that pool, and then later timed
+  stages time out in its queue, while untimed stages and other pipelines keep
+  running. The call should still bound itself (e.g. ``HTTPClient``'s timeout) so the
+  thread comes back;
+- ``optional``: a failure or timeout stores None (and the error under ``ctx["_errors"]``)
+  and dependents still run; a required stage's failure is raised from ``run``;
+- ``cache`` + ``key``: a ``ResultCache`` consulted before running and filled after
+  (``cache_if`` filters which values are worth keeping).
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from . import metrics
+
+
+class StageTimeout(TimeoutError):
+    """A stage did not finish within its ``timeout``."""
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], requires: Sequence[str] = (), *,
+                 timeout: Optional[float] = None, optional: bool = False, cache=None,
+                 key: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+                 cache_if: Optional[Callable[[Any], bool]] = None):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.timeout = timeout
+        self.optional = optional
+        self.cache = cache
+        self.key = key
+        self.cache_if = cache_if
+
+    def run(self, ctx: Dict[str, Any]) -> Any:
+        """Run the stage on ``ctx`` (through its cache, if it has one); no timeout is applied here."""
+        key = self.key(ctx) if self.cache is not None and self.key is not None else None
+        if key is not None:
+            value = self.cache.get(key)
+            metrics.inc("stage_cache", stage=self.name, outcome="miss" if value is None else "hit")
+            if value is not None:
+                return value
+        value = self.func(ctx)
+        if key is not None and value is not None and (self.cache_if is None or self.cache_if(value)):
+            self.cache.set(key, value)
+        return value
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, requires={list(self.requires)})"
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+_timed_executor = None
+TIMED_WORKERS = 8
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for untimed stage work.
+
+    The thread calling ``Pipeline.run`` only coordinates, so pipelines run from
+    ordinary threads never wait on each other. A stage body must not itself call
+    ``Pipeline.run`` on this pool: a coordinator waiting inside a pool thread holds a
+    worker, and enough of them deadlock the pool.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="stage")
+        return _executor
+
+
+def timed_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for stages with a ``timeout`` (``TIMED_WORKERS`` threads), kept apart from ``shared_executor``."""
+    global _timed_executor
+    with _executor_lock:
+        if _timed_executor is None:
+            _timed_executor = ThreadPoolExecutor(max_workers=TIMED_WORKERS, thread_name_prefix="stage-timed")
+        return _timed_executor
+
+
+class Pipeline:
+    """A dependency graph of ``Stage`` objects; see the module docstring.
+
+    ``executor`` and ``timed_executor`` replace the process-wide pools for untimed and
+    timed stages.
+    """
+
+    def __init__(self, stages: Iterable[Stage], executor: Optional[ThreadPoolExecutor] = None,
+                 timed_executor: Optional[ThreadPoolExecutor] = None):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+        for stage in self.stages.values():
+            missing = [name for name in stage.requires if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} requires unknown stage(s): {', '.join(missing)}")
+        self.order = self._topological_order()
+        self.executor = executor
+        self.timed_executor = timed_executor
+
+    def _topological_order(self) -> List[str]:
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in self.stages[name].requires:
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def _needed(self, targets: Iterable[str], known: Mapping[str, Any]) -> List[str]:
+        needed = set()
+
+        def visit(name):
+            if name in needed or name in known:
+                return
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage: {name}")
+            needed.add(name)
+            for dep in self.stages[name].requires:
+                visit(dep)
+
+        for name in targets:
+            visit(name)
+        return [name for name in self.order if name in needed]
+
+    def run(self, inputs: Optional[Mapping[str, Any]] = None, targets: Optional[Iterable[str]] = None,
+            on_stage: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """Run ``targets`` (default: every stage) and whatever they require; returns the context.
+
+        Values in ``inputs`` that are named like a stage count as that stage's output, so
+        a later step can resume from earlier results. ``on_stage(name, value)`` is called
+        on the calling thread as each stage finishes.
+        """
+        ctx: Dict[str, Any] = dict(inputs or {})
+        pending = self._needed(targets if targets is not None else self.order, ctx)
+        executor = self.executor or shared_executor()
+        timed = self.timed_executor or timed_executor()
+        running = {}  # future -> (stage, deadline)
+
+        def finish(stage, value):
+            ctx[stage.name] = value
+            if on_stage is not None:
+                on_stage(stage.name, value)
+
+        def fail(stage, error):
+            metrics.inc("stage_failures", stage=stage.name, reason=type(error).__name__)
+            if not stage.optional:
+                for future in running:
+                    future.cancel()
+                raise error
+            ctx.setdefault("_errors", {})[stage.name] = f"{type(error).__name__}: {error}"
+            finish(stage, None)
+
+        while pending or running:
+            ready = [name for name in pending if all(dep in ctx for dep in self.stages[name].requires)]
+            for name in ready:
+                pending.remove(name)
+                stage = self.stages[name]
+                if len(ready) == 1 and not running and stage.timeout is None:
+                    # Nothing to overlap with: run on this thread and skip the hand-off
+                    try:
+                        value = stage.run(ctx)
+                    except Exception as e:
+                        fail(stage, e)
+                    else:
+                        finish(stage, value)
+                    break
+                if stage.timeout is None:
+                    running[executor.submit(stage.run, dict(ctx))] = (stage, None)
+                else:
+                    running[timed.submit(stage.run, dict(ctx))] = (stage, time.monotonic() + stage.timeout)
+            else:
+                if not running:
+                    raise RuntimeError(f"Stages cannot make progress: {', '.join(pending)}")
+                deadlines = [d for _, d in running.values() if d is not None]
+                timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, _ = running.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        fail(stage, e)
+                    else:
+                        finish(stage, value)
+                now = time.monotonic()
+                for future, (stage, deadline) in list(running.items()):
+                    if deadline is not None and now >= deadline and not future.done():
+                        running.pop(future)
+                        if not future.cancel():
+                            # Still running: its thread stays busy until the call returns
+                            metrics.inc("stage_abandoned", stage=stage.name)
+                        fail(stage, StageTimeout(f"Stage {stage.name!r} timed out after {stage.timeout}s"))
+        return ctx
@@ -0,0 +1,138 @@
+"""On-disk OHLCV cache for the Yahoo price loader.
+
+Each resolved symbol/interval pair is stored as one ``.npy`` file holding a
+column-major float64 matrix (timestamp, open, high, low, close, volume). Reads are
+memory-mapped, so loading only touches the pages of the columns actually used.
+The cache also remembers which exchange suffix a bare symbol resolved to
+(``INFY -> INFY.NS``) so that lookup is not repeated on every call.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def _atomic_write(path: str, write) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            write(fh)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _epoch_seconds(index) -> np.ndarray:
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return index.tz_convert("UTC").as_unit("ns").asi8 / 1e9
+
+
+class PriceCache:
+    """Persistent price store keyed by resolved symbol and interval.
+
+    ``min_refresh_seconds`` lets callers skip the network entirely when the cached
+    file was updated very recently (e.g. several dashboard refreshes in one minute).
+    """
+
+    def __init__(self, cache_dir: str = "~/.cache/stocklens/prices", min_refresh_seconds: float = 60.0):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.min_refresh_seconds = min_refresh_seconds
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._resolutions_path = os.path.join(self.cache_dir, "resolutions.json")
+        self._resolutions: Dict[str, str] = {}
+        if os.path.exists(self._resolutions_path):
+            try:
+                with open(self._resolutions_path, "r", encoding="utf-8") as fh:
+                    self._resolutions = json.load(fh)
+            except Exception:
+                self._resolutions = {}
+
+    def _path(self, symbol: str, interval: str) -> str:
+        safe = symbol.upper().replace("/", "_").replace("^", "_")
+        return os.path.join(self.cache_dir, f"{safe}_{interval}.npy")
+
+    # Symbol resolution
+    def resolve(self, symbol: str) -> Optional[str]:
+        return self._resolutions.get(symbol.upper())
+
+    def remember(self, symbol: str, resolved: str) -> None:
+        with self._lock:
+            if self._resolutions.get(symbol.upper()) == resolved:
+                return
+            self._resolutions[symbol.upper()] = resolved
+            payload = json.dumps(self._resolutions, indent=2).encode("utf-8")
+            _atomic_write(self._resolutions_path, lambda fh: fh.write(payload))
+
+    def forget(self, symbol: str) -> None:
+        with self._lock:
+            if self._resolutions.pop(symbol.upper(), None) is not None:
+                payload = json.dumps(self._resolutions, indent=2).encode("utf-8")
+                _atomic_write(self._resolutions_path, lambda fh: fh.write(payload))
+
+    # Bars
+    def is_fresh(self, symbol: str, interval: str = "1d") -> bool:
+        path = self._path(symbol, interval)
+        return os.path.exists(path) and (time.time() - os.path.getmtime(path)) < self.min_refresh_seconds
+
+    def load(self, symbol: str, interval: str = "1d", columns=COLUMNS) -> Optional[pd.DataFrame]:
+        """Cached bars as a UTC-indexed DataFrame; only the requested ``columns`` are read from disk."""
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            matrix = np.load(path, mmap_mode="r")
+        except Exception:
+            return None
+        index = pd.to_datetime(np.asarray(matrix[:, 0]), unit="s", utc=True)
+        # Fortran order: each column is a contiguous slice of the mapped file
+        return pd.DataFrame({name: matrix[:, COLUMNS.index(name) + 1] for name in columns}, index=index)
+
+    def last_timestamp(self, symbol: str, interval: str = "1d") -> Optional[pd.Timestamp]:
+        data = self.load(symbol, interval, columns=())
+        if data is None or len(data.index) == 0:
+            return None
+        return data.index[-1]
+
+    def store(self, symbol: str, data: pd.DataFrame, interval: str = "1d") -> pd.DataFrame:
+        """Merge ``data`` into the cached bars (newer rows win on equal timestamps) and return the result."""
+        fresh = self._normalize(data)
+        with self._lock:
+            cached = self.load(symbol, interval)
+            if cached is not None and not cached.empty:
+                merged = pd.concat([cached, fresh])
+                merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            else:
+                merged = fresh
+            matrix = np.empty((len(merged), len(COLUMNS) + 1), dtype=np.float64, order="F")
+            matrix[:, 0] = _epoch_seconds(merged.index)
+            for i, name in enumerate(COLUMNS):
+                matrix[:, i + 1] = merged[name].to_numpy(dtype=np.float64)
+            _atomic_write(self._path(symbol, interval), lambda fh: np.save(fh, matrix))
+        return self.load(symbol, interval)
+
+    @staticmethod
+    def _normalize(data: pd.DataFrame) -> pd.DataFrame:
+        frame = pd.DataFrame(index=pd.DatetimeIndex(data.index))
+        if frame.index.tz is None:
+            frame.index = frame.index.tz_localize("UTC")
+        else:
+            frame.index = frame.index.tz_convert("UTC")
+        for name in COLUMNS:
+            col = data[name] if name in data else np.nan
+            if isinstance(col, pd.DataFrame):
+                col = col.iloc[:, 0]
+            frame[name] = np.asarray(col, dtype=np.float64) if not np.isscalar(col) else col
+        return frame.dropna(subset=["Close"])
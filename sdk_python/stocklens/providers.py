@@ -0,0 +1,480 @@
+"""Market-data providers for the price loader.
+
+A provider turns a ticker plus a window (``period`` or ``start``) into an OHLCV
+DataFrame (``Open``/``High``/``Low``/``Close``/``Volume`` on a DatetimeIndex), or None.
+Implementations:
+
+- ``YFinanceDownloadProvider``: ``yf.download``, batched for many tickers.
+- ``YFinanceHistoryProvider``: ``yf.Ticker(...).history``.
+- ``ChartAPIProvider``: Yahoo's ``/v8/finance/chart`` JSON, full OHLCV.
+- ``LocalFileProvider``: Parquet/CSV files (or in-memory frames) for offline runs.
+- ``ReplayProvider``: replays another provider's bars a few at a time, like a live feed.
+
+``ProviderChain`` tries several providers in the order given by a ``ProviderScoreboard``
+(moving averages of latency and failure rate), so a provider that keeps timing out
+drops behind the ones that answer. A ticker no provider has (e.g. a probe with the wrong
+exchange suffix) is not held against any of them. ``default_provider()`` is the Yahoo chain used by
+``stocklens.indicators`` unless a provider is passed explicitly.
+"""
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import timed
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+_session = None
+_session_lock = threading.Lock()
+
+
+def _shared_session():
+    """One keep-alive session with a connection pool, shared by every Yahoo request in the process."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers.update({"User-Agent": _USER_AGENT})
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def _period_start(end, period):
+    """Start of a yfinance-style ``period`` window (``5d``, ``6mo``, ``1y``...) ending at ``end``."""
+    units = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+    for suffix, unit in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return end - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    return None
+
+
+def normalize_ohlcv(data) -> Optional[pd.DataFrame]:
+    """Keep the OHLCV columns as floats on a sorted, de-duplicated DatetimeIndex; rows without a close are dropped."""
+    if data is None or data.empty:
+        return None
+    if isinstance(data.columns, pd.MultiIndex):
+        # Single-ticker yf.download frames nest each field under the ticker
+        data = data.copy()
+        data.columns = data.columns.get_level_values(0)
+    if "Close" not in data:
+        return None
+    frame = data[[c for c in COLUMNS if c in data]].astype(float)
+    frame.index = pd.DatetimeIndex(frame.index)
+    frame = frame[~frame.index.duplicated(keep="last")].sort_index().dropna(subset=["Close"])
+    return frame if not frame.empty else None
+
+
+def _window(data: pd.DataFrame, period: str, start) -> pd.DataFrame:
+    """Trim a full history to what a remote provider would return for ``period``/``start``."""
+    if start is not None:
+        start = pd.Timestamp(start)
+        index = data.index
+        if index.tz is not None and start.tzinfo is None:
+            start = start.tz_localize(index.tz)
+        elif index.tz is None and start.tzinfo is not None:
+            start = start.tz_convert("UTC").tz_localize(None)
+        return data[index >= start]
+    begin = _period_start(data.index[-1], period) if len(data) else None
+    return data[data.index >= begin] if begin is not None else data
+
+
+class PriceProvider:
+    """Base class: implement ``fetch``; override ``fetch_many`` when the source can batch."""
+
+    name = "provider"
+    # Whether a miss is worth retrying after a pause (network sources) or final (local files)
+    retryable = True
+    # Whether fetch_many is cheap for many tickers (one request, or local reads)
+    batches = False
+
+    def fetch(self, ticker: str, *, period: str = "6mo", interval: str = "1d", start=None) -> Optional[pd.DataFrame]:
+        raise NotImplementedError
+
+    def fetch_many(self, tickers: Sequence[str], *, period: str = "6mo", interval: str = "1d", start=None,
+                   batch_size: int = 100) -> Dict[str, pd.DataFrame]:
+        frames = {}
+        for ticker in tickers:
+            try:
+                data = self.fetch(ticker, period=period, interval=interval, start=start)
+            except Exception:
+                continue
+            if data is not None and not data.empty:
+                frames[ticker] = data
+        return frames
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class YFinanceDownloadProvider(PriceProvider):
+    name = "yf_download"
+    batches = True
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def _download(self, tickers, period, interval, start, threads):
+        import yfinance as yf
+
+        window = {"start": pd.Timestamp(start).strftime("%Y-%m-%d")} if start is not None else {"period": period}
+        return yf.download(tickers, **window, interval=interval, group_by="column", progress=False,
+                           threads=threads, session=self.session or _shared_session())
+
+    def fetch(self, ticker, *, period="6mo", interval="1d", start=None):
+        return normalize_ohlcv(self._download(ticker, period, interval, start, threads=False))
+
+    def fetch_many(self, tickers, *, period="6mo", interval="1d", start=None, batch_size=100):
+        tickers = list(dict.fromkeys(tickers))
+        frames = {}
+        for i in range(0, len(tickers), batch_size):
+            chunk = tickers[i:i + batch_size]
+            try:
+                data = self._download(chunk, period, interval, start, threads=True)
+            except Exception:
+                continue
+            frames.update(_split_download(data, chunk))
+        return frames
+
+
+def _split_download(data, tickers):
+    """Split a multi-ticker ``yf.download`` frame into ``{ticker: OHLCV DataFrame}``."""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    if isinstance(data.columns, pd.MultiIndex):
+        level = 1 if set(tickers) & set(data.columns.get_level_values(1)) else 0
+        present = set(data.columns.get_level_values(level))
+        for ticker in tickers:
+            if ticker in present:
+                frame = normalize_ohlcv(data.xs(ticker, axis=1, level=level))
+                if frame is not None:
+                    frames[ticker] = frame
+    elif len(tickers) == 1:
+        frame = normalize_ohlcv(data)
+        if frame is not None:
+            frames[tickers[0]] = frame
+    return frames
+
+
+class YFinanceHistoryProvider(PriceProvider):
+    name = "yf_history"
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def fetch(self, ticker, *, period="6mo", interval="1d", start=None):
+        import yfinance as yf
+
+        window = {"start": pd.Timestamp(start).strftime("%Y-%m-%d")} if start is not None else {"period": period}
+        return normalize_ohlcv(yf.Ticker(ticker, session=self.session or _shared_session()).history(**window, interval=interval))
+
+
+class ChartAPIProvider(PriceProvider):
+    """Yahoo's chart endpoint read directly; returns every OHLCV field it reports."""
+
+    name = "chart_api"
+    URL = "https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
+
+    def __init__(self, session=None, timeout: float = 15):
+        self.session = session
+        self.timeout = timeout
+
+    def fetch(self, ticker, *, period="6mo", interval="1d", start=None):
+        if start is not None:
+            params = {"period1": int(pd.Timestamp(start).timestamp()), "period2": int(time.time())}
+        else:
+            params = {"range": period}
+        params["interval"] = interval
+        resp = (self.session or _shared_session()).get(self.URL.format(ticker=ticker), params=params, timeout=self.timeout)
+        if resp.status_code == 404:
+            return None  # unknown ticker
+        resp.raise_for_status()  # rate limits and outages count as provider failures
+        nodes = ((resp.json() or {}).get("chart") or {}).get("result") or []
+        if not nodes:
+            return None
+        node = nodes[0]
+        quotes = ((node.get("indicators") or {}).get("quote") or [{}])[0]
+        stamps = node.get("timestamp") or []
+        if not stamps or not quotes.get("close"):
+            return None
+        n = min(len(stamps), len(quotes["close"]))
+        columns = {name: quotes.get(name.lower()) for name in COLUMNS}
+        frame = pd.DataFrame(
+            {name: pd.Series(values[:n], dtype=float) for name, values in columns.items() if values and len(values) >= n}
+        )
+        frame.index = pd.to_datetime(stamps[:n], unit="s", utc=True)
+        return normalize_ohlcv(frame)
+
+
+class LocalFileProvider(PriceProvider):
+    """Bars from local files, for offline runs, CI and load tests.
+
+    Looks for ``{TICKER}_{interval}`` then ``{TICKER}`` with a ``.parquet`` or ``.csv``
+    suffix under ``directory`` (Parquet needs pyarrow or fastparquet). ``frames`` can
+    supply DataFrames directly instead. Files are read once and kept in memory, and the
+    requested ``period``/``start`` window is applied like the remote providers do. A
+    missing file is looked for again after ``miss_ttl`` seconds, so one added later is
+    picked up.
+    """
+
+    name = "local"
+    retryable = False
+    batches = True
+
+    def __init__(self, directory: Optional[str] = None, frames: Optional[Mapping[str, pd.DataFrame]] = None,
+                 miss_ttl: float = 5.0):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.miss_ttl = miss_ttl
+        self._frames: Dict[tuple, Optional[pd.DataFrame]] = {}
+        self._missed: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        for ticker, data in (frames or {}).items():
+            self._frames[(ticker.upper(), None)] = normalize_ohlcv(data)
+
+    def _read(self, ticker: str, interval: str) -> Optional[pd.DataFrame]:
+        if self.directory is None:
+            return None
+        for stem in (f"{ticker}_{interval}", ticker):
+            for suffix in (".parquet", ".csv"):
+                path = os.path.join(self.directory, stem + suffix)
+                if os.path.exists(path):
+                    if suffix == ".parquet":
+                        return normalize_ohlcv(pd.read_parquet(path))
+                    return normalize_ohlcv(pd.read_csv(path, index_col=0, parse_dates=True))
+        return None
+
+    def history(self, ticker: str, interval: str = "1d") -> Optional[pd.DataFrame]:
+        """The full stored history for ``ticker`` (no window applied)."""
+        ticker = ticker.upper()
+        key = (ticker, interval)
+        with self._lock:
+            for cached in (key, (ticker, None)):
+                if cached in self._frames:
+                    return self._frames[cached]
+            if time.monotonic() - self._missed.get(key, float("-inf")) < self.miss_ttl:
+                return None
+        data = self._read(ticker, interval)
+        with self._lock:
+            if data is None:
+                self._missed[key] = time.monotonic()
+            else:
+                self._frames[key] = data
+                self._missed.pop(key, None)
+        return data
+
+    def fetch(self, ticker, *, period="6mo", interval="1d", start=None):
+        data = self.history(ticker, interval)
+        if data is None:
+            return None
+        data = _window(data, period, start)
+        return data if not data.empty else None
+
+    def save(self, ticker: str, data: pd.DataFrame, interval: str = "1d", format: str = "csv") -> str:
+        """Record ``data`` as a file this provider will serve (e.g. to build CI fixtures from a live fetch)."""
+        if self.directory is None:
+            raise ValueError("LocalFileProvider has no directory to save to")
+        frame = normalize_ohlcv(data)
+        if frame is None:
+            raise ValueError(f"No price data to save for {ticker}")
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{ticker.upper()}_{interval}.{format}")
+        if format == "parquet":
+            frame.to_parquet(path)
+        elif format == "csv":
+            frame.to_csv(path)
+        else:
+            raise ValueError(f"Unknown format: {format}")
+        with self._lock:
+            self._frames[(ticker.upper(), interval)] = frame
+        return path
+
+
+class ReplayProvider(PriceProvider):
+    """Reveals another provider's history ``step`` bars per fetch, starting with ``start_bars`` bars.
+
+    Each ticker has its own cursor, so repeated refreshes behave like a live feed that
+    keeps printing new bars (useful for exercising incremental indicators offline).
+    """
+
+    name = "replay"
+    retryable = False
+    batches = True
+
+    def __init__(self, source: LocalFileProvider, start_bars: int = 60, step: int = 1):
+        self.source = source
+        self.start_bars = start_bars
+        self.step = step
+        self._cursors: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker, *, period="6mo", interval="1d", start=None):
+        data = self.source.history(ticker, interval)
+        if data is None:
+            return None
+        key = (ticker.upper(), interval)
+        with self._lock:
+            cursor = self._cursors.get(key, self.start_bars)
+            self._cursors[key] = min(cursor + self.step, len(data))
+        visible = _window(data.iloc[:cursor], period, start)
+        return visible if not visible.empty else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._cursors.clear()
+
+
+class ProviderScoreboard:
+    """Exponential moving averages of latency and failure rate per provider.
+
+    ``order`` sorts providers by expected cost, ``latency + failure_rate * failure_penalty``
+    seconds. Providers without any samples keep their configured place at the front, so
+    each one gets tried before the ranking settles.
+    """
+
+    def __init__(self, alpha: float = 0.2, failure_penalty: float = 10.0):
+        self.alpha = alpha
+        self.failure_penalty = failure_penalty
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                self._stats[name] = {"latency": seconds, "failure_rate": 0.0 if ok else 1.0, "calls": 1, "failures": int(not ok)}
+                return
+            a = self.alpha
+            stats["latency"] += a * (seconds - stats["latency"])
+            stats["failure_rate"] += a * ((0.0 if ok else 1.0) - stats["failure_rate"])
+            stats["calls"] += 1
+            stats["failures"] += int(not ok)
+
+    def cost(self, name: str) -> float:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                return 0.0
+            return stats["latency"] + stats["failure_rate"] * self.failure_penalty
+
+    def order(self, providers: Iterable[PriceProvider]) -> List[PriceProvider]:
+        return sorted(providers, key=lambda p: self.cost(p.name))
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+class ProviderChain(PriceProvider):
+    """Tries providers in scoreboard order until one returns at least ``min_bars`` bars.
+
+    ``fetch_many`` only uses the providers that batch (when there are any), so probing a
+    universe for exchange suffixes does not fan out into per-ticker requests.
+    """
+
+    name = "chain"
+
+    def __init__(self, providers: Sequence[PriceProvider], scoreboard: Optional[ProviderScoreboard] = None):
+        if not providers:
+            raise ValueError("ProviderChain needs at least one provider")
+        self.providers = list(providers)
+        self.scoreboard = scoreboard or ProviderScoreboard()
+        self.retryable = any(p.retryable for p in self.providers)
+        self.batches = any(p.batches for p in self.providers)
+
+    def fetch(self, ticker, *, period="6mo", interval="1d", start=None, min_bars: int = 1):
+        misses = []  # (provider, seconds) for clean "no data" answers
+        for provider in self.scoreboard.order(self.providers):
+            started = time.perf_counter()
+            try:
+                data = provider.fetch(ticker, period=period, interval=interval, start=start)
+            except Exception:
+                self.scoreboard.record(provider.name, time.perf_counter() - started, False)
+                continue
+            elapsed = time.perf_counter() - started
+            if data is not None and len(data) >= min_bars:
+                # Another provider had the ticker, so the earlier misses were real failures
+                for name, seconds in misses:
+                    self.scoreboard.record(name, seconds, False)
+                self.scoreboard.record(provider.name, elapsed, True)
+                return data
+            misses.append((provider.name, elapsed))
+        # No provider has it (unknown ticker or wrong suffix): not a provider failure
+        return None
+
+    def fetch_many(self, tickers, *, period="6mo", interval="1d", start=None, batch_size=100, min_bars: int = 1):
+        remaining = list(dict.fromkeys(tickers))
+        frames = {}
+        samples = []  # (provider, seconds per ticker, raised, found any, tickers it had no data for)
+        providers = [p for p in self.providers if p.batches] or self.providers
+        for provider in self.scoreboard.order(providers):
+            if not remaining:
+                break
+            started = time.perf_counter()
+            try:
+                got = provider.fetch_many(remaining, period=period, interval=interval, start=start, batch_size=batch_size)
+                failed = False
+            except Exception:
+                got, failed = {}, True
+            got = {t: data for t, data in got.items() if len(data) >= min_bars}
+            # One sample per ticker-equivalent so batch and single-ticker providers compare fairly
+            samples.append((provider.name, (time.perf_counter() - started) / len(remaining), failed, bool(got),
+                            {t for t in remaining if t not in got}))
+            frames.update(got)
+            remaining = [t for t in remaining if t not in frames]
+        for name, seconds, failed, found, missed in samples:
+            if failed or missed & frames.keys():
+                # Raised, or had no data for tickers a later provider found
+                self.scoreboard.record(name, seconds, False)
+            elif found:
+                self.scoreboard.record(name, seconds, True)
+            # Otherwise it only missed tickers no provider has, which says nothing about it
+        return frames
+
+    def __repr__(self) -> str:
+        return f"ProviderChain({self.providers!r})"
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+@timed("fetch_prices")
+def fetch_bars(provider: PriceProvider, ticker: str, *, min_bars: int = 1, **window) -> Optional[pd.DataFrame]:
+    """``provider.fetch`` with a minimum bar count, for single providers and chains alike."""
+    if isinstance(provider, ProviderChain):
+        return provider.fetch(ticker, min_bars=min_bars, **window)
+    data = provider.fetch(ticker, **window)
+    return data if data is not None and len(data) >= min_bars else None
+
+
+def default_provider() -> PriceProvider:
+    """The process-wide provider: the Yahoo chain, or whatever ``set_default_provider`` installed.
+
+    Setting ``STOCKLENS_PRICE_DIR`` makes the default a ``LocalFileProvider`` over that
+    directory, which runs everything offline without code changes.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            directory = os.environ.get("STOCKLENS_PRICE_DIR")
+            if directory:
+                _default = LocalFileProvider(directory)
+            else:
+                _default = ProviderChain([YFinanceDownloadProvider(), YFinanceHistoryProvider(), ChartAPIProvider()])
+        return _default
+
+
+def set_default_provider(provider: Optional[PriceProvider]) -> None:
+    """Install ``provider`` as the process-wide default (None restores the Yahoo chain on next use)."""
+    global _default
+    with _default_lock:
+        _default = provider
@@ -0,0 +1,162 @@
+"""Content-addressed cache for expensive pipeline results (summaries, audio files).
+
+Keys are hashes of the inputs rather than symbols or timestamps: a summary is keyed by
+the normalized article set it was generated from, and audio by the summary text it
+speaks. Unchanged news therefore skips BART and TTS entirely.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+
+def _normalize(text: Any) -> str:
+    return " ".join(str(text or "").split()).lower()
+
+
+def articles_digest(articles: Iterable[Dict[str, Any]]) -> str:
+    """Order-independent hash of an article set's headline/summary text."""
+    items = sorted(
+        (_normalize(a.get("headline")), _normalize(a.get("summary"))) if isinstance(a, dict) else (_normalize(a), "")
+        for a in articles
+    )
+    return hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+
+def _unlink(path: str) -> bool:
+    # Another thread or process sharing the directory may have removed it already
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and an optional on-disk backend.
+
+    The in-memory layer holds at most ``max_entries`` items. With ``directory`` set,
+    entries are also written as small JSON files so they survive restarts and can be
+    shared by several worker processes; the disk layer is pruned to ``max_disk_entries``
+    files, oldest first.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 6 * 3600, directory: Optional[str] = None,
+                 max_disk_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        safe = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{safe}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as fh:
+                stored = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if stored.get("expires") is not None and stored["expires"] <= now:
+            self._remove_file(key)
+            return None
+        self._remember(key, stored["value"], stored.get("expires"))
+        return stored["value"]
+
+    def set(self, key: str, value: Any) -> None:
+        expires = time.time() + self.ttl if self.ttl else None
+        self._remember(key, value, expires)
+        if self.directory:
+            payload = json.dumps({"key": key, "expires": expires, "value": value})
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    fh.write(payload)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                _unlink(tmp)
+                raise
+            with self._lock:
+                self._writes += 1
+                due = self._writes % 100 == 0
+            if due:
+                self.prune()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.directory:
+            self._remove_file(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    _unlink(os.path.join(self.directory, name))
+
+    def prune(self) -> int:
+        """Drop expired disk entries and the oldest ones beyond ``max_disk_entries``; returns how many were removed.
+
+        Safe to run from several threads or processes at once: a file another pruner
+        removed first is simply not counted.
+        """
+        if not self.directory:
+            return 0
+        now = time.time()
+        files = []
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                with open(path, "r", encoding="utf-8") as fh:
+                    expires = json.load(fh).get("expires")
+            except (OSError, ValueError):
+                continue
+            if expires is not None and expires <= now:
+                removed += _unlink(path)
+            else:
+                files.append((stat.st_mtime, path))
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_disk_entries)]:
+            removed += _unlink(path)
+        return removed
+
+    def _remember(self, key: str, value: Any, expires: Optional[float]) -> None:
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _remove_file(self, key: str) -> None:
+        _unlink(self._path(key))
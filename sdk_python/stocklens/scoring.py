@@ -0,0 +1,83 @@
+"""The thresholds and weights behind ``StockLens.analyze``, in one place.
+
+``analyze`` scores the latest bar with these methods; ``backtest`` applies the same
+rule to whole arrays of bars. Keeping the constants on one object means a rule tuned
+by a backtest sweep can be handed straight to ``StockLens(scoring_rule=...)``.
+"""
+from typing import Any, Dict, Optional
+
+
+class ScoringRule:
+    """RSI thresholds, MACD/RSI weights, news weight and the tech/news blend.
+
+    - RSI >= ``rsi_upper`` adds ``rsi_weight``; RSI <= ``rsi_lower`` subtracts it.
+    - MACD above/below its signal line adds/subtracts ``macd_weight``.
+    - News scores ``+/-news_weight`` times the share of articles on the winning side.
+    - With news, the combined score is ``tech_blend * tech + (1 - tech_blend) * news``.
+    - Scores >= ``threshold`` are Positive, <= ``-threshold`` Negative.
+    """
+
+    PARAMS = ("rsi_upper", "rsi_lower", "rsi_weight", "macd_weight", "news_weight", "tech_blend", "threshold")
+
+    def __init__(self, rsi_upper: float = 60.0, rsi_lower: float = 40.0, rsi_weight: float = 0.35,
+                 macd_weight: float = 0.45, news_weight: float = 0.5, tech_blend: float = 0.6,
+                 threshold: float = 0.2):
+        self.rsi_upper = rsi_upper
+        self.rsi_lower = rsi_lower
+        self.rsi_weight = rsi_weight
+        self.macd_weight = macd_weight
+        self.news_weight = news_weight
+        self.tech_blend = tech_blend
+        self.threshold = threshold
+
+    def tech_score(self, rsi: Optional[float], macd: Optional[float], signal: Optional[float]) -> float:
+        score = 0.0
+        if isinstance(rsi, (int, float)):
+            if rsi >= self.rsi_upper:
+                score += self.rsi_weight
+            elif rsi <= self.rsi_lower:
+                score -= self.rsi_weight
+        if isinstance(macd, (int, float)) and isinstance(signal, (int, float)):
+            if macd > signal:
+                score += self.macd_weight
+            elif macd < signal:
+                score -= self.macd_weight
+        return score
+
+    def news_score(self, overall: Dict[str, Any]) -> float:
+        """Score an overall-sentiment dict as built by ``StockLens`` (counts plus ``overall`` label)."""
+        total = max(overall["total_articles"], 1)
+        if overall["overall"] == "Positive":
+            return self.news_weight * (overall["positive_articles"] / total)
+        if overall["overall"] == "Negative":
+            return -self.news_weight * (overall["negative_articles"] / total)
+        return 0.0
+
+    def combine(self, tech_score: float, news_score: Optional[float] = None) -> float:
+        if news_score is None:
+            return tech_score
+        return tech_score * self.tech_blend + news_score * (1.0 - self.tech_blend)
+
+    def label(self, score: float) -> str:
+        if score >= self.threshold:
+            return "Positive"
+        if score <= -self.threshold:
+            return "Negative"
+        return "Neutral"
+
+    def to_dict(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.PARAMS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScoringRule":
+        return cls(**{name: data[name] for name in cls.PARAMS if name in data})
+
+    def replace(self, **changes) -> "ScoringRule":
+        return ScoringRule(**{**self.to_dict(), **changes})
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ScoringRule) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        params = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"ScoringRule({params})"
@@ -1,13 +1,142 @@
-from textblob import TextBlob
+from typing import Dict, List, Sequence, Tuple
+
+from .models import get_model, register_model
+from .serving import remote_client
+
+
+def _label(polarity):
+    if polarity > 0.1:
+        return "Positive"
+    if polarity < -0.1:
+        return "Negative"
+    return "Neutral"
+
 
 def analyze_sentiment(text):
+    from textblob import TextBlob  # imported on first use to keep `import stocklens` fast
+
     blob = TextBlob(text or "")
     polarity = blob.sentiment.polarity
-    if polarity > 0.1:
-        sentiment = "Positive"
-    elif polarity < -0.1:
-        sentiment = "Negative"
-    else:
-        sentiment = "Neutral"
-    return sentiment, round(polarity, 2)
+    return _label(polarity), round(polarity, 2)
+
+
+class LexiconScorer:
+    """TextBlob's pattern sentiment algorithm over a precompiled lexicon index.
+
+    TextBlob resolves every word through its lazily-loaded, nested ``{word: {pos: [p, s, i]}}``
+    lexicon and scans the emoticon table per token. Here the lexicon is flattened once
+    into ``{word: (polarity, subjectivity, intensity, is_modifier)}`` and emoticons into a
+    direct lookup, then the same assessment rules (modifiers, negation, "!", "(!)")
+    are applied. Polarities are identical to ``TextBlob(text).sentiment.polarity``.
+    """
+
+    def __init__(self):
+        from textblob.en import sentiment as pattern_sentiment
+        from textblob._text import EMOTICONS, PUNCTUATION
+
+        lexicon = pattern_sentiment
+        len(lexicon)  # force the lazy XML load
+        modifiers = lexicon.modifiers
+        self.index: Dict[str, Tuple[float, float, float, bool]] = {}
+        for word, by_pos in dict.items(lexicon):
+            if None in by_pos:
+                p, s, i = by_pos[None]
+                self.index[word] = (p, s, i, any(m in by_pos for m in modifiers))
+        self.emoticons: Dict[str, float] = {}
+        for (_, polarity), faces in EMOTICONS.items():
+            for face in faces:
+                self.emoticons.setdefault(face.lower(), polarity)
+        self.negations = frozenset(lexicon.negations)
+        self.punctuation = PUNCTUATION
+        self.tokenize = lexicon.tokenizer
 
+    def polarity(self, text: str) -> float:
+        index, negations, emoticons = self.index, self.negations, self.emoticons
+        assessed = []  # [polarity, intensity, negated]
+        modifier = None  # preceding modifier word ("really good")
+        negation = None  # preceding negation ("not good")
+        for w in " ".join(self.tokenize(text)).split():
+            w = w.lower()
+            entry = index.get(w)
+            if entry is not None:
+                p, _, i, is_modifier = entry
+                if modifier is None:
+                    assessed.append([p, i, False])
+                else:
+                    last = assessed[-1]
+                    last[0] = max(-1.0, min(p * last[1], 1.0))
+                    last[1] = i
+                if negation is not None:
+                    assessed[-1][1] = 1.0 / assessed[-1][1]
+                    assessed[-1][2] = True
+                modifier = w if is_modifier else None
+                negation = w if w in negations else None
+                continue
+            if w in negations:
+                negation = w
+            elif negation and len(w.strip("'")) > 1:
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                # "really not good"
+                assessed[-1][2] = True
+                negation = None
+            elif modifier and len(w) > 2:
+                modifier = None
+            if w == "!" and assessed:
+                assessed[-1][0] = max(-1.0, min(assessed[-1][0] * 1.25, 1.0))
+            if w == "(!)":
+                assessed.append([0.0, 1.0, False])
+            if not w.isalpha() and len(w) <= 5 and w not in self.punctuation:
+                mood = emoticons.get(w)
+                if mood is not None:
+                    assessed.append([mood, 1.0, False])
+        if not assessed:
+            return 0.0
+        # "not good" = slightly bad, "not bad" = slightly good
+        return sum(p * -0.5 if negated else p for p, _, negated in assessed) / float(len(assessed))
+
+
+def _load_classifier():
+    from transformers import pipeline
+    return pipeline("text-classification", model="ProsusAI/finbert")
+
+
+register_model("sentiment_lexicon", LexiconScorer)
+# Only used by backend="transformer", so a bare warmup() does not download FinBERT
+register_model("sentiment_classifier", _load_classifier, default=False)
+
+
+def _classifier_polarities(texts: Sequence[str], batch_size: int) -> List[float]:
+    # FinBERT runs in the shared worker when STOCKLENS_INFERENCE is set (stocklens.serving)
+    client = remote_client()
+    if client is not None:
+        return client.classify(texts, batch_size)
+    return classifier_polarities_local(texts, batch_size)
+
+
+def classifier_polarities_local(texts: Sequence[str], batch_size: int = 32) -> List[float]:
+    classifier = get_model("sentiment_classifier")
+    outputs = classifier(list(texts), batch_size=batch_size, truncation=True)
+    signs = {"positive": 1.0, "negative": -1.0}
+    return [signs.get(o["label"].lower(), 0.0) * o["score"] for o in outputs]
+
+
+def analyze_sentiments(texts: Sequence[str], *, backend: str = "lexicon", batch_size: int = 32) -> List[Tuple[str, float]]:
+    """Score many texts at once; returns ``(label, rounded polarity)`` per text, in order.
+
+    Identical texts are scored once. ``backend="lexicon"`` (default) gives exactly the
+    same results as calling ``analyze_sentiment`` per text. ``backend="transformer"``
+    runs a FinBERT classifier in batches and maps its confidence to a signed polarity,
+    labelled with the same +/-0.1 thresholds.
+    """
+    texts = [t or "" for t in texts]
+    unique = list(dict.fromkeys(texts))
+    if backend == "lexicon":
+        scorer = get_model("sentiment_lexicon")
+        polarities = [scorer.polarity(t) for t in unique]
+    elif backend == "transformer":
+        polarities = _classifier_polarities(unique, batch_size) if unique else []
+    else:
+        raise ValueError(f"Unknown sentiment backend: {backend}")
+    scored = {t: (_label(p), round(p, 2)) for t, p in zip(unique, polarities)}
+    return [scored[t] for t in texts]
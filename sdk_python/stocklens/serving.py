@@ -0,0 +1,455 @@
+"""Shared inference worker: one process owns the models and micro-batches requests from many clients.
+
+Each web worker that summarizes in-process loads its own BART copy, and concurrent
+requests then run batch-of-one forward passes that compete for the same cores. Instead,
+run one worker::
+
+    python -m stocklens.serving --address 127.0.0.1:6011
+
+and point the clients at it with ``STOCKLENS_INFERENCE=127.0.0.1:6011`` (or call
+``configure_client``). ``generate_summaries``/``generate_summary`` and the ``transformer``
+sentiment backend then send their inputs to the worker. The lexicon sentiment scorer
+always stays in-process, because it is cheaper than a round trip.
+
+The worker collects requests that arrive within ``max_wait`` seconds of the first one,
+up to ``max_batch`` items (article sets or texts), and runs them as one padded batch.
+Requests that arrive while a batch is running join the next one, so batches grow with
+load. Transport is ``multiprocessing.connection`` over TCP (``host:port``) or a Unix
+socket / Windows pipe (a path). Requests are pickles, so connections are authenticated:
+with ``STOCKLENS_INFERENCE_KEY`` (or ``authkey``) when set, which a ``host:port`` that
+is not loopback requires. Otherwise worker and clients share a random key in
+``STOCKLENS_INFERENCE_KEY_FILE`` (default ``~/.cache/stocklens/inference.key``), created
+on first use and readable only by its owner.
+
+When the worker cannot be reached, ``InferenceClient`` runs the call in-process (loading
+the model there) and retries the worker after ``retry_after`` seconds. Pass
+``fallback=False`` to raise instead.
+"""
+import argparse
+import ipaddress
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from . import metrics
+from .http_client import CircuitBreaker, CircuitOpenError
+
+DEFAULT_ADDRESS = "127.0.0.1:6011"
+DEFAULT_KEY_FILE = os.path.join("~", ".cache", "stocklens", "inference.key")
+
+Address = Union[str, Tuple[str, int]]
+
+
+class InferenceError(RuntimeError):
+    """The worker received the request but the model call failed."""
+
+
+class _Closed(RuntimeError):
+    """The worker is shutting down; the connection is dropped so the client falls back."""
+
+
+def parse_address(address: Optional[Address] = None) -> Address:
+    """``(host, port)`` for ``"host:port"``; anything else is a Unix socket path or Windows pipe name."""
+    address = address or os.environ.get("STOCKLENS_INFERENCE") or DEFAULT_ADDRESS
+    if isinstance(address, tuple):
+        return address
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address and "\\" not in address:
+        return host or "127.0.0.1", int(port)
+    return os.path.expanduser(address)
+
+
+def _is_local(address: Address) -> bool:
+    # Unix sockets and Windows pipes are local; a TCP address only when it is loopback
+    if not isinstance(address, tuple):
+        return True
+    host = address[0]
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _key_file() -> bytes:
+    # Shared by the worker and its clients (same user); whoever comes first creates it
+    path = os.path.expanduser(os.environ.get("STOCKLENS_INFERENCE_KEY_FILE") or DEFAULT_KEY_FILE)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as fh:
+            fh.write(secrets.token_hex(32))
+        try:
+            os.link(tmp, path)  # fails if another process created it meanwhile; that key wins
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+    if os.name == "posix" and os.stat(path).st_mode & 0o077:
+        raise ValueError(f"Inference key file {path} must be readable by its owner only (chmod 600)")
+    with open(path, "rb") as fh:
+        return fh.read().strip()
+
+
+def _authkey(authkey: Optional[Union[str, bytes]], address: Address) -> bytes:
+    authkey = authkey or os.environ.get("STOCKLENS_INFERENCE_KEY")
+    if not authkey:
+        if not _is_local(address):
+            raise ValueError(f"The inference worker at {address[0]}:{address[1]} is reachable from other hosts; "
+                             "set STOCKLENS_INFERENCE_KEY or pass authkey")
+        return _key_file()
+    return authkey.encode("utf-8") if isinstance(authkey, str) else authkey
+
+
+# Worker side
+
+class _Request:
+    __slots__ = ("key", "items", "future")
+
+    def __init__(self, key, items):
+        self.key = key
+        self.items = items
+        self.future: Future = Future()
+
+
+class _Batcher:
+    """Collects requests for one operation and runs them together on a single thread."""
+
+    def __init__(self, op: str, run: Callable[[Any, List[Any]], List[Any]], max_batch: int, max_wait: float):
+        self.op = op
+        self.run = run
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        # Held while checking/setting _closed and queueing, so no request can land behind the stop marker
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name=f"batch-{op}", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, items: List[Any]) -> Future:
+        request = _Request(key, list(items))
+        with self._lock:
+            if self._closed:
+                raise _Closed(f"{self.op} batcher is closed")
+            self._queue.put(request)
+        return request.future
+
+    def close(self) -> None:
+        """Stop taking requests; those already queued are still run."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        batch, size = [first], len(first.items)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            try:
+                # Whatever queued up during the previous batch is taken without waiting
+                request = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            size += len(request.items)
+        return batch, False
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            groups: Dict[Any, List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(request.key, []).append(request)
+            for key, requests in groups.items():
+                items = [item for request in requests for item in request.items]
+                metrics.inc("serving_batches", op=self.op)
+                metrics.inc("serving_batch_items", len(items), op=self.op)
+                try:
+                    with metrics.span(f"serving_{self.op}_batch"):
+                        outputs = self.run(key, items) if items else []
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+                start = 0
+                for request in requests:
+                    request.future.set_result(outputs[start:start + len(request.items)])
+                    start += len(request.items)
+            if stop:
+                return
+
+
+def _summarize(key, article_sets):
+    from .summarizer import summarize_local
+    return summarize_local(article_sets, batch_size=key)
+
+
+def _classify(key, texts):
+    from .sentiment import classifier_polarities_local
+    return classifier_polarities_local(texts, batch_size=key)
+
+
+class InferenceServer:
+    """Listens on ``address`` and serves ``summarize``/``classify`` requests through micro-batchers.
+
+    ``batch_size`` is the padded batch size handed to the model; ``max_batch`` bounds
+    how many items one micro-batch collects (it is split into ``batch_size`` batches).
+    """
+
+    def __init__(self, address: Optional[Address] = None, *, authkey: Optional[Union[str, bytes]] = None,
+                 max_batch: int = 32, max_wait: float = 0.005, batch_size: int = 16):
+        # The default backlog of 1 stalls handshakes when many web workers connect at once
+        address = parse_address(address)
+        self._listener = Listener(address, backlog=128, authkey=_authkey(authkey, address))
+        self.address = self._listener.address
+        self.batch_size = batch_size
+        self._batchers = {
+            "summarize": _Batcher("summarize", _summarize, max_batch, max_wait),
+            "classify": _Batcher("classify", _classify, max_batch * 4, max_wait),
+        }
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
+    def serve_forever(self) -> None:
+        """Accept clients until ``close``; each connection is served on its own thread."""
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except AuthenticationError:
+                metrics.inc("serving_rejected")
+                continue
+            except OSError:
+                if self._closed.is_set():
+                    return
+                raise
+            with self._connections_lock:
+                if self._closed.is_set():
+                    conn.close()
+                    return
+                self._connections.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), name="serving-conn", daemon=True).start()
+
+    def start(self) -> "InferenceServer":
+        """Run ``serve_forever`` on a background thread; returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, name="serving-accept", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop accepting, finish the queued batches and drop every client connection.
+
+        Clients see the connection close and fall back to running in-process.
+        """
+        self._closed.set()
+        self._listener.close()
+        for batcher in self._batchers.values():
+            batcher.close()
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+
+    def _serve(self, conn: Connection) -> None:
+        try:
+            while not self._closed.is_set():
+                try:
+                    # Wake up now and then so close() is noticed even on an idle connection
+                    if not conn.poll(0.5):
+                        continue
+                    op, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ("ok", self._handle(op, args))
+                except _Closed:
+                    return
+                except Exception as e:
+                    reply = ("error", f"{type(e).__name__}: {e}")
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+        finally:
+            with self._connections_lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    def _handle(self, op: str, args: Tuple) -> Any:
+        metrics.inc("serving_requests", op=op)
+        if op == "summarize":
+            return self._batchers["summarize"].submit(self.batch_size, args[0]).result()
+        if op == "classify":
+            return self._batchers["classify"].submit(args[1], args[0]).result()
+        if op == "ping":
+            from .models import is_loaded
+            counters = {k: v for k, v in metrics.snapshot()["counters"].items() if "serving_" in k}
+            return {"pid": os.getpid(), "models": {name: is_loaded(name) for name in ("summarizer", "sentiment_classifier")},
+                    "counters": counters}
+        raise ValueError(f"Unknown operation: {op}")
+
+
+# Client side
+
+class InferenceClient:
+    """Thin client for an ``InferenceServer``; one pooled connection per concurrent caller.
+
+    A call that cannot reach the worker (refused, dropped, wrong key, or no answer within
+    ``timeout`` seconds) runs in-process instead when ``fallback`` is set. The worker is
+    then skipped for ``retry_after`` seconds. Errors the worker reports are raised as
+    ``InferenceError`` either way. ``timeout=None`` waits for a reply indefinitely.
+    """
+
+    def __init__(self, address: Optional[Address] = None, *, authkey: Optional[Union[str, bytes]] = None,
+                 fallback: bool = True, retry_after: float = 30.0, timeout: Optional[float] = 120.0):
+        self.address = parse_address(address)
+        self.authkey = _authkey(authkey, self.address)
+        self.fallback = fallback
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=retry_after)
+        self._idle: List[Connection] = []
+        self._lock = threading.Lock()
+
+    def _call(self, op: str, *args: Any) -> Any:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+        try:
+            conn.send((op, args))
+            if self.timeout is not None and not conn.poll(self.timeout):
+                raise TimeoutError(f"No reply from the inference worker within {self.timeout}s")
+            status, value = conn.recv()
+        except BaseException:
+            conn.close()  # a half-read reply would poison the next caller
+            raise
+        with self._lock:
+            self._idle.append(conn)
+        if status == "error":
+            raise InferenceError(value)
+        return value
+
+    def _remote(self, op: str, local: Callable[..., Any], *args: Any) -> Any:
+        if self.breaker.allow():
+            # Every path reports to the breaker: a half-open trial left unreported would keep it open for good
+            reached = False
+            try:
+                with metrics.span(f"serving_{op}"):
+                    value = self._call(op, *args)
+                reached = True
+                return value
+            except InferenceError:
+                reached = True  # the worker answered; only the model call failed
+                raise
+            except (OSError, EOFError, AuthenticationError) as e:
+                if not self.fallback:
+                    raise
+                metrics.inc("serving_fallbacks", op=op, reason=type(e).__name__)
+            finally:
+                if reached:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+        elif not self.fallback:
+            raise CircuitOpenError(f"Inference worker at {self.address} is unavailable")
+        else:
+            metrics.inc("serving_fallbacks", op=op, reason="CircuitOpenError")
+        return local(*args)
+
+    def summarize(self, article_sets: Sequence[Any], batch_size: int = 16) -> List[str]:
+        """One summary per article set, as ``generate_summaries`` returns (the worker picks its own batch size)."""
+        from .summarizer import summarize_local
+
+        return self._remote("summarize", lambda sets: summarize_local(sets, batch_size), list(article_sets))
+
+    def classify(self, texts: Sequence[str], batch_size: int = 32) -> List[float]:
+        """Signed FinBERT polarity per text (the ``transformer`` sentiment backend)."""
+        from .sentiment import classifier_polarities_local
+
+        return self._remote("classify", classifier_polarities_local, list(texts), batch_size)
+
+    def ping(self) -> Dict[str, Any]:
+        """The worker's pid, which models it has loaded and its batch counters; raises if it cannot be reached."""
+        return self._call("ping")
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_UNSET = object()
+_client: Any = _UNSET
+_client_lock = threading.Lock()
+
+
+def configure_client(address: Optional[Address] = None, **kwargs: Any) -> Optional[InferenceClient]:
+    """Send later summaries to the worker at ``address`` (None: run them in-process); returns the client."""
+    global _client
+    with _client_lock:
+        if isinstance(_client, InferenceClient):
+            _client.close()
+        _client = InferenceClient(address, **kwargs) if address else None
+        return _client
+
+
+def remote_client() -> Optional[InferenceClient]:
+    """The process-wide client, created from ``STOCKLENS_INFERENCE`` on first use (None when unset)."""
+    global _client
+    if _client is _UNSET:
+        with _client_lock:
+            if _client is _UNSET:
+                address = os.environ.get("STOCKLENS_INFERENCE")
+                _client = InferenceClient(address) if address else None
+    return _client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m stocklens.serving", description="Run the shared inference worker")
+    parser.add_argument("--address", default=None, help=f"host:port or socket path (default: STOCKLENS_INFERENCE or {DEFAULT_ADDRESS})")
+    parser.add_argument("--max-batch", type=int, default=32, help="Most article sets one micro-batch collects")
+    parser.add_argument("--max-wait", type=float, default=0.005, help="Seconds to wait for more requests after the first")
+    parser.add_argument("--batch-size", type=int, default=16, help="Padded batch size per forward pass")
+    parser.add_argument("--preload", nargs="*", default=["summarizer"],
+                        help="Models to load before accepting requests (e.g. summarizer sentiment_classifier)")
+    args = parser.parse_args(argv)
+
+    from .models import warmup
+
+    try:
+        _authkey(None, parse_address(args.address))  # refuse an unauthenticated public address before loading models
+    except ValueError as e:
+        parser.error(str(e))
+    if args.preload:
+        warmup(*args.preload)
+    server = InferenceServer(args.address, max_batch=args.max_batch, max_wait=args.max_wait, batch_size=args.batch_size)
+    print(f"serving on {server.address}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,30 +1,205 @@
-from typing import Optional, Dict, Any
+import atexit
+import hashlib
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+
+from . import metrics
 
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, UpdateOne, ASCENDING, DESCENDING
+    from bson import ObjectId
 except Exception:
     MongoClient = None  # optional dependency
 
 
+def article_hash(article: Dict[str, Any]) -> str:
+    """Stable identity for an article: its URL when present, otherwise its normalized headline + summary."""
+    url = (article.get("url") or article.get("link") or "").strip()
+    if url:
+        key = url
+    else:
+        key = " ".join(f"{article.get('headline', '')} {article.get('summary', '')}".lower().split())
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _unwritten(collection: str, ops: list, error: Exception) -> list:
+    """The ``ops`` a failed unordered write did not apply (all of them unless the server listed its errors)."""
+    details = getattr(error, "details", None)
+    if not isinstance(details, dict) or "writeErrors" not in details:
+        return list(ops)
+    failed = []
+    for item in details["writeErrors"]:
+        if collection != "articles" and item.get("code") == 11000:
+            continue  # an insert that an earlier, partly failed flush already applied
+        failed.append(ops[item["index"]])
+    return failed
+
+
+def _flush_at_exit(ref):
+    storage = ref()
+    if storage is not None:
+        try:
+            storage.flush()
+        except Exception:
+            pass
+
+
 class MongoStorage:
-    def __init__(self, uri: str, db_name: str = "stocklens"):
+    """Buffered MongoDB persistence for articles, summaries and indicators.
+
+    Writes are queued and sent as one unordered ``bulk_write``/``insert_many`` per collection when
+    ``buffer_size`` operations are pending, when the oldest pending write is older than
+    ``flush_interval`` seconds, on ``flush()``/``close()``, and at interpreter exit.
+    Operations leave the buffer only once they are written, so a failed write is retried
+    by the next flush. Articles are upserted on ``(symbol, article_hash)``, so re-running a symbol updates
+    existing rows instead of appending duplicates.
+
+    Pass ``client`` to use an existing client, e.g. ``mongomock.MongoClient()`` in tests.
+    """
+
+    def __init__(self, uri: Optional[str] = None, db_name: str = "stocklens", *, client=None,
+                 buffer_size: int = 500, flush_interval: float = 5.0, create_indexes: bool = True):
         if MongoClient is None:
             raise RuntimeError("pymongo is not installed. Install with `pip install pymongo`.")
-        self.client = MongoClient(uri)
+        self.client = client if client is not None else MongoClient(uri)
         self.db = self.client[db_name]
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, list] = {"articles": [], "summaries": [], "indicators": []}
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        # One flush at a time: two flushes of the same buffered ops would write them twice
+        self._flush_lock = threading.Lock()
+        if create_indexes:
+            self.ensure_indexes()
+        atexit.register(_flush_at_exit, weakref.ref(self))
 
-    def save_article_analysis(self, symbol: str, articles: list) -> str:
-        doc = {"symbol": symbol, "articles": articles}
-        res = self.db["articles"].insert_one(doc)
-        return str(res.inserted_id)
+    def ensure_indexes(self) -> None:
+        self.db["articles"].create_index([("symbol", ASCENDING), ("article_hash", ASCENDING)], unique=True)
+        self.db["articles"].create_index([("symbol", ASCENDING), ("timestamp", DESCENDING)])
+        self.db["summaries"].create_index([("symbol", ASCENDING), ("timestamp", DESCENDING)])
+        self.db["indicators"].create_index([("symbol", ASCENDING), ("timestamp", DESCENDING)])
+
+    # Writes
+    def _queue(self, collection: str, ops: list) -> None:
+        with self._lock:
+            self._pending[collection].extend(ops)
+            if self._oldest is None:
+                self._oldest = time.time()
+            due = (
+                sum(len(v) for v in self._pending.values()) >= self.buffer_size
+                or time.time() - self._oldest >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def save_article_analysis(self, symbol: str, articles: list) -> int:
+        """Queue one upsert per article; returns how many were queued."""
+        now = datetime.now(timezone.utc)
+        symbol = symbol.upper()
+        ops = []
+        for article in articles:
+            digest = article_hash(article)
+            fields = {k: v for k, v in article.items() if k != "_id"}
+            fields.update({"symbol": symbol, "article_hash": digest, "last_seen": now})
+            ops.append(UpdateOne(
+                {"symbol": symbol, "article_hash": digest},
+                {"$set": fields, "$setOnInsert": {"timestamp": now}},
+                upsert=True,
+            ))
+        self._queue("articles", ops)
+        return len(ops)
 
     def save_summary(self, symbol: str, summary_text: str, audio_path: Optional[str] = None) -> str:
-        doc = {"symbol": symbol, "summary_text": summary_text, "audio_path": audio_path}
-        res = self.db["summaries"].insert_one(doc)
-        return str(res.inserted_id)
+        doc = {"_id": ObjectId(), "symbol": symbol.upper(), "summary_text": summary_text, "audio_path": audio_path,
+               "timestamp": datetime.now(timezone.utc)}
+        self._queue("summaries", [doc])
+        return str(doc["_id"])
 
     def save_indicators(self, symbol: str, indicators: Dict[str, Any]) -> str:
-        doc = {"symbol": symbol, "indicators": indicators}
-        res = self.db["indicators"].insert_one(doc)
-        return str(res.inserted_id)
+        doc = {"_id": ObjectId(), "symbol": symbol.upper(), "indicators": indicators, "timestamp": datetime.now(timezone.utc)}
+        self._queue("indicators", [doc])
+        return str(doc["_id"])
+
+    def flush(self) -> Dict[str, int]:
+        """Send all pending writes; returns the number of operations written per collection.
+
+        If a collection's write fails, the operations that were not written stay buffered,
+        the other collections are still written, and the first error is raised at the end.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = {name: list(ops) for name, ops in self._pending.items()}
+            written, error = {}, None
+            for name, ops in pending.items():
+                if not ops:
+                    continue
+                unwritten = []
+                try:
+                    with metrics.span("storage_write"):
+                        if name == "articles":
+                            self.db[name].bulk_write(ops, ordered=False)
+                        else:
+                            self.db[name].insert_many(ops, ordered=False)
+                except Exception as e:
+                    unwritten = _unwritten(name, ops, e)
+                    error = error or e
+                    metrics.inc("storage_write_errors", collection=name)
+                with self._lock:
+                    # Only this flush removes ops and new ones are appended, so the prefix is exactly `ops`
+                    self._pending[name][:len(ops)] = unwritten
+                if len(ops) > len(unwritten):
+                    metrics.inc("storage_ops", len(ops) - len(unwritten), collection=name)
+                    written[name] = len(ops) - len(unwritten)
+            with self._lock:
+                self._oldest = time.time() if any(self._pending.values()) else None
+        if error is not None:
+            raise error
+        return written
+
+    def close(self) -> None:
+        self.flush()
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Reads (pending writes are flushed first so callers always see their own writes)
+    def latest_summary(self, symbol: str) -> Optional[Dict[str, Any]]:
+        self.flush()
+        return self.db["summaries"].find_one(
+            {"symbol": symbol.upper()},
+            {"_id": 0, "symbol": 1, "summary_text": 1, "audio_path": 1, "timestamp": 1},
+            sort=[("timestamp", DESCENDING)],
+        )
+
+    def latest_indicators(self, symbol: str) -> Optional[Dict[str, Any]]:
+        self.flush()
+        return self.db["indicators"].find_one(
+            {"symbol": symbol.upper()},
+            {"_id": 0, "symbol": 1, "indicators": 1, "timestamp": 1},
+            sort=[("timestamp", DESCENDING)],
+        )
 
+    def sentiment_history(self, symbol: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                          limit: int = 1000) -> List[Dict[str, Any]]:
+        """Scored articles for ``symbol``, newest first, with only the fields needed for charts."""
+        self.flush()
+        query: Dict[str, Any] = {"symbol": symbol.upper()}
+        if since is not None or until is not None:
+            query["timestamp"] = {}
+            if since is not None:
+                query["timestamp"]["$gte"] = since
+            if until is not None:
+                query["timestamp"]["$lt"] = until
+        cursor = self.db["articles"].find(
+            query,
+            {"_id": 0, "timestamp": 1, "headline": 1, "sentiment": 1, "score": 1, "article_hash": 1},
+        ).sort("timestamp", DESCENDING).limit(limit)
+        return list(cursor)
@@ -0,0 +1,580 @@
+"""Incremental indicators that update in O(1) per bar.
+
+Each indicator keeps only a few floats (plus a ``period``-sized window where the
+definition needs one), so a live feed can be folded in one bar at a time instead of
+recomputing six months of history. Values match ``technicals.compute_indicators`` on
+the same bars, and every object round-trips through ``to_dict``/``from_dict`` so warm
+state can be persisted between processes.
+
+Each ``update`` also records what it overwrote (the previous accumulators and the one
+value evicted from a window), so ``revert`` can undo the last bar without a copy of
+the windows.
+"""
+import math
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+
+def _finite(value) -> bool:
+    return value is not None and math.isfinite(value)
+
+
+class StreamingSMA:
+    """Rolling mean and sample variance over the last ``period`` values (sliding Welford update)."""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        self.period = period
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._undo: Optional[list] = None  # [mean, m2, evicted value or None]
+
+    @property
+    def ready(self) -> bool:
+        return len(self.window) == self.period
+
+    def update(self, value: float) -> Optional[float]:
+        window = self.window
+        if len(window) < self.period:
+            self._undo = [self.mean, self.m2, None]
+            window.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(window)
+            self.m2 += delta * (value - self.mean)
+        else:
+            old = window.popleft()
+            self._undo = [self.mean, self.m2, old]
+            window.append(value)
+            old_mean = self.mean
+            self.mean += (value - old) / self.period
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+            self.m2 = max(self.m2, 0.0)
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.mean if self.ready else None
+
+    def revert(self) -> None:
+        """Undo the last ``update``."""
+        self.mean, self.m2, evicted = self._undo
+        self.window.pop()
+        if evicted is not None:
+            self.window.appendleft(evicted)
+        self._undo = None
+
+    def std(self, ddof: int = 1) -> Optional[float]:
+        if not self.ready or self.period <= ddof:
+            return None
+        return math.sqrt(self.m2 / (self.period - ddof))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"period": self.period, "window": list(self.window), "mean": self.mean, "m2": self.m2, "undo": self._undo}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingSMA":
+        obj = cls(data["period"])
+        obj.window = deque(data["window"])
+        obj.mean = data["mean"]
+        obj.m2 = data["m2"]
+        obj._undo = data.get("undo")
+        return obj
+
+
+class StreamingEMA:
+    """EMA with pandas' ``adjust=True`` weighting, kept as a decayed numerator/denominator pair."""
+
+    def __init__(self, span: int):
+        if span < 1:
+            raise ValueError("span must be >= 1")
+        self.span = span
+        self.decay = 1.0 - 2.0 / (span + 1.0)
+        self.num = 0.0
+        self.den = 0.0
+        self._undo: Optional[list] = None
+
+    def update(self, value: float) -> Optional[float]:
+        self._undo = [self.num, self.den]
+        self.num = self.num * self.decay + value
+        self.den = self.den * self.decay + 1.0
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.num / self.den if self.den else None
+
+    def revert(self) -> None:
+        """Undo the last ``update``."""
+        self.num, self.den = self._undo
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"span": self.span, "num": self.num, "den": self.den, "undo": self._undo}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingEMA":
+        obj = cls(data["span"])
+        obj.num = data["num"]
+        obj.den = data["den"]
+        obj._undo = data.get("undo")
+        return obj
+
+
+class StreamingWilder:
+    """Wilder smoothing: mean of the first ``period`` values, then ``avg += (value - avg) / period``."""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        self.period = period
+        self.count = 0
+        self.avg = 0.0
+        self._undo: Optional[list] = None
+
+    def update(self, value: float) -> Optional[float]:
+        self._undo = [self.count, self.avg]
+        self.count += 1
+        if self.count <= self.period:
+            self.avg += (value - self.avg) / self.count
+        else:
+            self.avg += (value - self.avg) / self.period
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.avg if self.count >= self.period else None
+
+    def revert(self) -> None:
+        """Undo the last ``update``."""
+        self.count, self.avg = self._undo
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"period": self.period, "count": self.count, "avg": self.avg, "undo": self._undo}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingWilder":
+        obj = cls(data["period"])
+        obj.count = data["count"]
+        obj.avg = data["avg"]
+        obj._undo = data.get("undo")
+        return obj
+
+
+class StreamingRSI:
+    """RSI over closing prices; ``method`` is ``"sma"`` (rolling mean, the SDK default) or ``"wilder"``."""
+
+    def __init__(self, period: int = 14, method: str = "sma"):
+        if method not in ("sma", "wilder"):
+            raise ValueError(f"Unknown RSI method: {method}")
+        self.period = period
+        self.method = method
+        self.prev_close: Optional[float] = None
+        if method == "sma":
+            self.gain, self.loss = StreamingSMA(period), StreamingSMA(period)
+        else:
+            self.gain, self.loss = StreamingWilder(period), StreamingWilder(period)
+        self._undo: Optional[list] = None  # [prev_close, whether gain/loss were updated]
+
+    def update(self, close: float) -> Optional[float]:
+        if self.prev_close is None:
+            self._undo = [None, self.method == "sma"]
+            self.prev_close = close
+            # The rolling-mean formula counts the first bar as a zero change; Wilder starts at the first real change
+            if self.method == "sma":
+                self.gain.update(0.0)
+                self.loss.update(0.0)
+            return self.value
+        self._undo = [self.prev_close, True]
+        delta = close - self.prev_close
+        self.prev_close = close
+        self.gain.update(delta if delta > 0 else 0.0)
+        self.loss.update(-delta if delta < 0 else 0.0)
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        gain, loss = self.gain.value, self.loss.value
+        if gain is None or loss is None:
+            return None
+        if loss == 0:
+            return 100.0 if gain > 0 else None
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def revert(self) -> None:
+        """Undo the last ``update``."""
+        self.prev_close, averaged = self._undo
+        if averaged:
+            self.gain.revert()
+            self.loss.revert()
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "period": self.period,
+            "method": self.method,
+            "prev_close": self.prev_close,
+            "gain": self.gain.to_dict(),
+            "loss": self.loss.to_dict(),
+            "undo": self._undo,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingRSI":
+        obj = cls(data["period"], data["method"])
+        obj.prev_close = data["prev_close"]
+        avg_cls = StreamingSMA if obj.method == "sma" else StreamingWilder
+        obj.gain = avg_cls.from_dict(data["gain"])
+        obj.loss = avg_cls.from_dict(data["loss"])
+        obj._undo = data.get("undo")
+        return obj
+
+
+class StreamingMACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, close: float):
+        line = self.fast.update(close) - self.slow.update(close)
+        self.signal.update(line)
+        return self.value
+
+    @property
+    def value(self):
+        """``(macd_line, signal_line, histogram)``, or Nones before the first bar."""
+        if self.fast.value is None:
+            return None, None, None
+        line = self.fast.value - self.slow.value
+        return line, self.signal.value, line - self.signal.value
+
+    def revert(self) -> None:
+        """Undo the last ``update``."""
+        self.fast.revert()
+        self.slow.revert()
+        self.signal.revert()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingMACD":
+        obj = cls.__new__(cls)
+        obj.fast = StreamingEMA.from_dict(data["fast"])
+        obj.slow = StreamingEMA.from_dict(data["slow"])
+        obj.signal = StreamingEMA.from_dict(data["signal"])
+        return obj
+
+
+class StreamingBollinger:
+    def __init__(self, period: int = 20, num_std: float = 2.0):
+        self.window = StreamingSMA(period)
+        self.num_std = num_std
+
+    def update(self, close: float):
+        self.window.update(close)
+        return self.value
+
+    @property
+    def value(self):
+        """``(upper, middle, lower)``, or Nones until ``period`` bars have been seen."""
+        middle, std = self.window.value, self.window.std()
+        if middle is None or std is None:
+            return None, None, None
+        return middle + self.num_std * std, middle, middle - self.num_std * std
+
+    def revert(self) -> None:
+        """Undo the last ``update``."""
+        self.window.revert()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"window": self.window.to_dict(), "num_std": self.num_std}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingBollinger":
+        obj = cls.__new__(cls)
+        obj.window = StreamingSMA.from_dict(data["window"])
+        obj.num_std = data["num_std"]
+        return obj
+
+
+class StreamingExtreme:
+    """Rolling max (or min) over the last ``period`` values using a monotonic queue (amortized O(1))."""
+
+    def __init__(self, period: int, mode: str = "max"):
+        self.period = period
+        self.mode = mode
+        self.count = 0
+        self.queue = deque()  # (bar number, value), values monotonic from the front
+        self._undo: Optional[list] = None  # [entries popped from the back, entry expired from the front or None]
+
+    def update(self, value: float) -> Optional[float]:
+        queue = self.queue
+        dominated = (lambda v: v <= value) if self.mode == "max" else (lambda v: v >= value)
+        popped = []
+        while queue and dominated(queue[-1][1]):
+            popped.append(queue.pop())
+        queue.append((self.count, value))
+        # Bar numbers are unique, so at most one entry expires per bar
+        expired = queue.popleft() if queue[0][0] <= self.count - self.period else None
+        self._undo = [popped, expired]
+        self.count += 1
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.queue[0][1] if self.count >= self.period else None
+
+    def revert(self) -> None:
+        """Undo the last ``update`` (costs as much as that update did)."""
+        popped, expired = self._undo
+        self.queue.pop()
+        self.queue.extend(reversed(popped))
+        if expired is not None:
+            self.queue.appendleft(expired)
+        self.count -= 1
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        undo = None
+        if self._undo is not None:
+            popped, expired = self._undo
+            undo = [[list(item) for item in popped], None if expired is None else list(expired)]
+        return {"period": self.period, "mode": self.mode, "count": self.count, "queue": [list(item) for item in self.queue],
+                "undo": undo}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingExtreme":
+        obj = cls(data["period"], data["mode"])
+        obj.count = data["count"]
+        obj.queue = deque(tuple(item) for item in data["queue"])
+        undo = data.get("undo")
+        if undo is not None:
+            popped, expired = undo
+            obj._undo = [[tuple(item) for item in popped], None if expired is None else tuple(expired)]
+        return obj
+
+
+class StreamingRange:
+    """ATR (Wilder) and the stochastic oscillator; needs high/low as well as close."""
+
+    def __init__(self, atr_period: int = 14, stoch_period: int = 14, stoch_smooth: int = 3):
+        self.prev_close: Optional[float] = None
+        self.atr = StreamingWilder(atr_period)
+        self.highest = StreamingExtreme(stoch_period, "max")
+        self.lowest = StreamingExtreme(stoch_period, "min")
+        self.stoch_d = StreamingSMA(stoch_smooth)
+        self.stoch_k: Optional[float] = None
+        self._undo: Optional[list] = None  # [prev_close, stoch_k, whether stoch_d was updated]
+
+    def update(self, high: float, low: float, close: float):
+        self._undo = [self.prev_close, self.stoch_k, False]
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.atr.update(tr)
+        hi, lo = self.highest.update(high), self.lowest.update(low)
+        self.stoch_k = None
+        if hi is not None and lo is not None and hi > lo:
+            self.stoch_k = 100.0 * (close - lo) / (hi - lo)
+            self.stoch_d.update(self.stoch_k)
+            self._undo[2] = True
+        return self.value
+
+    @property
+    def value(self):
+        """``(atr, stoch_k, stoch_d)``."""
+        return self.atr.value, self.stoch_k, self.stoch_d.value
+
+    def revert(self) -> None:
+        """Undo the last ``update``."""
+        self.prev_close, self.stoch_k, smoothed = self._undo
+        self.atr.revert()
+        self.highest.revert()
+        self.lowest.revert()
+        if smoothed:
+            self.stoch_d.revert()
+        self._undo = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "prev_close": self.prev_close,
+            "atr": self.atr.to_dict(),
+            "highest": self.highest.to_dict(),
+            "lowest": self.lowest.to_dict(),
+            "stoch_d": self.stoch_d.to_dict(),
+            "stoch_k": self.stoch_k,
+            "undo": self._undo,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingRange":
+        obj = cls.__new__(cls)
+        obj.prev_close = data["prev_close"]
+        obj.atr = StreamingWilder.from_dict(data["atr"])
+        obj.highest = StreamingExtreme.from_dict(data["highest"])
+        obj.lowest = StreamingExtreme.from_dict(data["lowest"])
+        obj.stoch_d = StreamingSMA.from_dict(data["stoch_d"])
+        obj.stoch_k = data["stoch_k"]
+        obj._undo = data.get("undo")
+        return obj
+
+
+def _to_epoch(timestamp) -> Optional[float]:
+    if timestamp is None:
+        return None
+    if hasattr(timestamp, "timestamp"):
+        return float(timestamp.timestamp())
+    return float(timestamp)
+
+
+class IndicatorState:
+    """Warm indicator state for one symbol.
+
+    Bars are applied with ``update``; a bar whose timestamp equals the last one applied
+    replaces it (the still-forming daily bar during market hours), anything older is
+    ignored. The output keys match ``get_technical_indicators``.
+    """
+
+    def __init__(self, *, rsi_period: int = 14, rsi_method: str = "sma", macd_fast: int = 12, macd_slow: int = 26,
+                 macd_signal: int = 9, bb_period: int = 20, bb_std: float = 2.0, sma_period: int = 50,
+                 ema_period: int = 20, atr_period: int = 14, stoch_period: int = 14, stoch_smooth: int = 3):
+        self.params = {
+            "rsi_period": rsi_period, "rsi_method": rsi_method, "macd_fast": macd_fast, "macd_slow": macd_slow,
+            "macd_signal": macd_signal, "bb_period": bb_period, "bb_std": bb_std, "sma_period": sma_period,
+            "ema_period": ema_period, "atr_period": atr_period, "stoch_period": stoch_period, "stoch_smooth": stoch_smooth,
+        }
+        self.rsi = StreamingRSI(rsi_period, rsi_method)
+        self.macd = StreamingMACD(macd_fast, macd_slow, macd_signal)
+        self.bollinger = StreamingBollinger(bb_period, bb_std)
+        self.sma = StreamingSMA(sma_period)
+        self.ema = StreamingEMA(ema_period)
+        self.range = StreamingRange(atr_period, stoch_period, stoch_smooth)
+        self.has_range = True
+        self.symbol: Optional[str] = None  # resolved ticker the bars came from, e.g. "INFY.NS"
+        self.bars = 0
+        self.last_timestamp: Optional[float] = None
+        # [bars, last_timestamp, has_range, whether range was updated] before the last bar, for revising it
+        self._previous: Optional[list] = None
+
+    def update(self, close: float, timestamp=None, high: Optional[float] = None, low: Optional[float] = None) -> bool:
+        """Apply one bar; returns False when it was skipped (stale timestamp or missing close)."""
+        if not _finite(close):
+            return False
+        ts = _to_epoch(timestamp)
+        if ts is not None and self.last_timestamp is not None:
+            if ts < self.last_timestamp:
+                return False
+            if ts == self.last_timestamp:
+                if self._previous is None:
+                    return False
+                self._revert()
+        previous = [self.bars, self.last_timestamp, self.has_range, False]
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.bollinger.update(close)
+        self.sma.update(close)
+        self.ema.update(close)
+        if self.has_range and _finite(high) and _finite(low):
+            self.range.update(high, low, close)
+            previous[3] = True
+        else:
+            # A single bar without high/low would misalign ATR and stochastics for good
+            self.has_range = False
+        self._previous = previous
+        self.bars += 1
+        if ts is not None:
+            self.last_timestamp = ts
+        return True
+
+    def extend(self, closes: Iterable[float], timestamps: Optional[Iterable] = None,
+               highs: Optional[Iterable[float]] = None, lows: Optional[Iterable[float]] = None) -> int:
+        """Apply a sequence of bars; returns how many were applied."""
+        closes = list(closes)
+        timestamps = list(timestamps) if timestamps is not None else [None] * len(closes)
+        highs = list(highs) if highs is not None else [None] * len(closes)
+        lows = list(lows) if lows is not None else [None] * len(closes)
+        applied = 0
+        for close, ts, high, low in zip(closes, timestamps, highs, lows):
+            applied += self.update(float(close), ts, None if high is None else float(high), None if low is None else float(low))
+        return applied
+
+    @classmethod
+    def from_history(cls, closes, timestamps=None, highs=None, lows=None, **params) -> "IndicatorState":
+        state = cls(**params)
+        state.extend(closes, timestamps, highs, lows)
+        return state
+
+    def values(self) -> Dict[str, Optional[float]]:
+        macd_line, signal_line, hist = self.macd.value
+        upper, middle, lower = self.bollinger.value
+        out = {
+            "RSI": self.rsi.value,
+            "MACD": macd_line,
+            "Signal": signal_line,
+            "MACD_HIST": hist,
+            "BOLL_UPPER": upper,
+            "BOLL_MIDDLE": middle,
+            "BOLL_LOWER": lower,
+            "SMA": self.sma.value,
+            "EMA": self.ema.value,
+        }
+        if self.has_range and self.bars:
+            out["ATR"], out["STOCH_K"], out["STOCH_D"] = self.range.value
+        return out
+
+    def _revert(self) -> None:
+        # Undo the last bar so a revision of it can be applied in its place
+        self.bars, self.last_timestamp, self.has_range, ranged = self._previous
+        self.rsi.revert()
+        self.macd.revert()
+        self.bollinger.revert()
+        self.sma.revert()
+        self.ema.revert()
+        if ranged:
+            self.range.revert()
+        self._previous = None
+
+    def _components(self) -> Dict[str, Any]:
+        return {
+            "rsi": self.rsi.to_dict(),
+            "macd": self.macd.to_dict(),
+            "bollinger": self.bollinger.to_dict(),
+            "sma": self.sma.to_dict(),
+            "ema": self.ema.to_dict(),
+            "range": self.range.to_dict(),
+            "has_range": self.has_range,
+            "bars": self.bars,
+            "last_timestamp": self.last_timestamp,
+        }
+
+    def _restore(self, data: Dict[str, Any]) -> None:
+        self.rsi = StreamingRSI.from_dict(data["rsi"])
+        self.macd = StreamingMACD.from_dict(data["macd"])
+        self.bollinger = StreamingBollinger.from_dict(data["bollinger"])
+        self.sma = StreamingSMA.from_dict(data["sma"])
+        self.ema = StreamingEMA.from_dict(data["ema"])
+        self.range = StreamingRange.from_dict(data["range"])
+        self.has_range = data["has_range"]
+        self.bars = data["bars"]
+        self.last_timestamp = data["last_timestamp"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable snapshot, including what is needed to revise the last bar."""
+        data = self._components()
+        data["params"] = dict(self.params)
+        data["symbol"] = self.symbol
+        data["previous"] = self._previous
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorState":
+        state = cls(**data["params"])
+        state._restore(data)
+        state.symbol = data.get("symbol")
+        state._previous = data.get("previous")
+        return state
@@ -1,48 +1,183 @@
-from transformers import pipeline
+from typing import List, Sequence
 
-# Load once at import time for efficiency
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+from .models import get_model
+from . import metrics
+from .metrics import timed
+from .serving import remote_client
+
+# BART has 1024 positions; leave room for the special tokens the pipeline adds
+MAX_INPUT_TOKENS = 1000
+MAX_REDUCE_ROUNDS = 4
+FAILED_SUMMARY = "Failed to generate summary due to input size or model error."
 
-def generate_summary(news_articles):
-    if not news_articles:
-        return "No relevant news articles found for this stock."
 
-    # Accept plain string OR list of dicts/strings
+def _article_texts(news_articles) -> List[str]:
+    """Accept plain string OR list of dicts/strings and return the individual texts."""
     if isinstance(news_articles, str):
-        text = news_articles.strip()
+        texts = [news_articles]
     elif isinstance(news_articles, list):
         if len(news_articles) > 0 and isinstance(news_articles[0], dict):
-            text = " ".join([a.get("headline", "") + " " + a.get("summary", "") for a in news_articles]).strip()
+            texts = [a.get("headline", "") + " " + a.get("summary", "") for a in news_articles]
         else:
-            text = " ".join([str(x) for x in news_articles]).strip()
+            texts = [str(x) for x in news_articles]
     else:
-        text = str(news_articles).strip()
-
-    if not text:
-        return "No content available for summarization."
-
-    # Hugging Face model limit ~1024 tokens; truncate conservatively
-    text = text[:3000]
-    
-    # Dynamically adjust max_length based on input length to avoid warnings
-    text_length = len(text.split())
-    # For very short texts, return as-is or use minimal summary
-    if text_length < 15:
-        # For very short texts, return original or simplified version
-        if text_length < 10:
-            return text  # Too short to summarize meaningfully
-        max_len = max(5, text_length - 2)
-        min_len = max(3, max_len // 2)
-    elif text_length < 30:
-        max_len = min(50, max(10, text_length - 5))
-        min_len = max(5, max_len // 2)
-    else:
-        max_len = 100
-        min_len = 30
+        texts = [str(news_articles)]
+    return [t.strip() for t in texts if t and t.strip()]
+
+
+def _summarizer():
+    # BART is loaded on first use (or by stocklens.warmup()) and shared process-wide
+    return get_model("summarizer")
+
+
+def _token_counts(texts: Sequence[str]) -> List[int]:
+    if not texts:
+        return []
+    encoded = _summarizer().tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+    return [len(ids) for ids in encoded]
+
+
+def _length_bounds(n_tokens: int):
+    """(max_length, min_length) for an input of ``n_tokens`` tokens, avoiding max_length > input warnings."""
+    if n_tokens < 15:
+        max_len = max(5, n_tokens - 2)
+        return max_len, max(3, max_len // 2)
+    if n_tokens < 30:
+        max_len = min(50, max(10, n_tokens - 5))
+        return max_len, max(5, max_len // 2)
+    return 100, 30
+
+
+def _split_long(text: str, max_tokens: int) -> List[str]:
+    ids = _summarizer().tokenizer(text, add_special_tokens=False)["input_ids"]
+    return [
+        _summarizer().tokenizer.decode(ids[i:i + max_tokens], skip_special_tokens=True)
+        for i in range(0, len(ids), max_tokens)
+    ]
+
+
+def _chunk(texts: Sequence[str], max_tokens: int = MAX_INPUT_TOKENS) -> List[str]:
+    """Pack article texts into chunks of at most ``max_tokens`` real tokenizer tokens.
 
-    try:
-        result = summarizer(text, max_length=max_len, min_length=min_len, do_sample=False)
-        return result[0]["summary_text"]
-    except Exception:
-        return "Failed to generate summary due to input size or model error."
+    Articles stay whole where possible; a single article longer than the limit is split
+    on token boundaries.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for text, n_tokens in zip(texts, _token_counts(texts)):
+        # +1 for the joining space
+        if current and current_tokens + n_tokens + 1 > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        if n_tokens > max_tokens:
+            chunks.extend(_split_long(text, max_tokens))
+            continue
+        current.append(text)
+        current_tokens += n_tokens + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
 
+
+def _run_batches(texts: Sequence[str], batch_size: int) -> List[str]:
+    """Summarize ``texts`` in padded batches; inputs with the same length bounds share a forward pass."""
+    results = [FAILED_SUMMARY] * len(texts)
+    groups = {}
+    for i, n_tokens in enumerate(_token_counts(texts)):
+        groups.setdefault(_length_bounds(n_tokens), []).append(i)
+    for (max_len, min_len), indices in groups.items():
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            inputs = [texts[i] for i in batch]
+            try:
+                outputs = _summarizer()(inputs, max_length=max_len, min_length=min_len, do_sample=False,
+                                     truncation=True, batch_size=len(inputs))
+            except Exception:
+                # One bad input should not fail the whole batch
+                outputs = []
+                for text in inputs:
+                    try:
+                        outputs.extend(_summarizer()(text, max_length=max_len, min_length=min_len, do_sample=False, truncation=True))
+                    except Exception:
+                        outputs.append({"summary_text": FAILED_SUMMARY})
+            for i, output in zip(batch, outputs):
+                results[i] = output["summary_text"]
+    return results
+
+
+@timed("generate_summaries")
+def generate_summaries(article_sets, batch_size: int = 16) -> List[str]:
+    """Summarize many symbols' article sets at once; returns one summary per set, in order.
+
+    Each set is split into chunks by real token counts, all chunks from all sets go
+    through the model in padded batches (map), and sets that produced several chunk
+    summaries are summarized again from those (reduce) until one summary remains.
+    Nothing is truncated, so every article contributes to the summary. A set the model
+    cannot summarize (including when the model fails to load) gets ``FAILED_SUMMARY``.
+
+    With ``STOCKLENS_INFERENCE`` set, the sets are summarized by the shared worker
+    (``stocklens.serving``), batched together with other processes' requests.
+    """
+    client = remote_client()
+    if client is not None:
+        return client.summarize(article_sets, batch_size)
+    return summarize_local(article_sets, batch_size)
+
+
+def summarize_local(article_sets, batch_size: int = 16) -> List[str]:
+    """``generate_summaries`` on this process's model, never through the worker."""
+    summaries: List[str] = [""] * len(article_sets)
+    pending = {}
+    for i, articles in enumerate(article_sets):
+        if not articles:
+            summaries[i] = "No relevant news articles found for this stock."
+            continue
+        texts = _article_texts(articles)
+        if not texts:
+            summaries[i] = "No content available for summarization."
+            continue
+        joined = " ".join(texts)
+        if len(joined.split()) < 10:
+            summaries[i] = joined  # Too short to summarize meaningfully
+            continue
+        pending[i] = texts
+
+    if pending:
+        try:
+            _summarizer()
+        except Exception:
+            # A model that cannot load is a model error for every set, not an exception for the caller
+            metrics.inc("summary_failures", len(pending), reason="model_load")
+            for i in pending:
+                summaries[i] = FAILED_SUMMARY
+            return summaries
+
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if not pending:
+            break
+        flat = []
+        for i, texts in list(pending.items()):
+            try:
+                flat.extend((i, chunk) for chunk in _chunk(texts))
+            except Exception:
+                summaries[i] = FAILED_SUMMARY
+                del pending[i]
+        outputs = _run_batches([chunk for _, chunk in flat], batch_size)
+        collected = {}
+        for (i, _), output in zip(flat, outputs):
+            collected.setdefault(i, []).append(output)
+        pending = {}
+        for i, parts in collected.items():
+            if len(parts) == 1:
+                summaries[i] = parts[0]
+            elif FAILED_SUMMARY in parts:
+                summaries[i] = FAILED_SUMMARY
+            else:
+                pending[i] = parts
+    for i, parts in pending.items():
+        summaries[i] = " ".join(parts)
+    return summaries
+
+
+@timed("generate_summary")
+def generate_summary(news_articles):
+    return generate_summaries([news_articles], batch_size=1)[0]
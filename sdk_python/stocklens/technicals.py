@@ -0,0 +1,281 @@
+"""NumPy indicator engine shared by the SDK and the Flask backend.
+
+Every function takes a float64 array with time on axis 0. A 1-D array is a single
+price series; a 2-D array is a price matrix with one column per symbol. Outputs are
+aligned with the input and NaN-padded where the indicator is not yet defined, so full
+series can be fed straight into a backtest. Columns may start with NaN padding, so
+histories of different lengths can share one bottom-aligned matrix.
+
+Defaults reproduce the pandas formulas the SDK used before (rolling-mean RSI, adjusted
+``ewm(span=...)`` EMAs, sample-std Bollinger bands), so ``analyze()`` scores are unchanged.
+"""
+import math
+from typing import Any, Dict, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def as_price_array(values) -> np.ndarray:
+    """Return ``values`` as a contiguous float64 array (time on axis 0)."""
+    arr = np.ascontiguousarray(values, dtype=np.float64)
+    if arr.ndim not in (1, 2):
+        raise ValueError("price arrays must be 1-D (one symbol) or 2-D (time x symbols)")
+    return arr
+
+
+def _decayed_cumsum(values: np.ndarray, decay: float, initial=None) -> np.ndarray:
+    """Vectorized ``s[t] = decay * s[t-1] + values[t]`` along axis 0.
+
+    Works block by block: inside a block the recursion is a cumulative sum of
+    ``values * decay**-i`` rescaled by ``decay**i``. The block length keeps
+    ``decay**-i`` below ~1e100 so nothing overflows and precision stays at float64.
+    """
+    n = values.shape[0]
+    out = np.empty_like(values)
+    if n == 0:
+        return out
+    carry = np.zeros(values.shape[1:]) if initial is None else np.asarray(initial, dtype=np.float64)
+    if decay <= 0.0:
+        out[:] = values
+        return out
+    block = n if decay >= 1.0 else max(1, min(n, int(230.0 / -math.log(decay))))
+    steps = np.arange(block, dtype=np.float64)
+    grow = decay ** -steps
+    shrink = decay ** steps
+    if values.ndim == 2:
+        grow = grow[:, None]
+        shrink = shrink[:, None]
+    for start in range(0, n, block):
+        chunk = values[start:start + block]
+        size = chunk.shape[0]
+        acc = np.cumsum(chunk * grow[:size], axis=0) + carry * decay
+        out[start:start + size] = acc * shrink[:size]
+        carry = out[start + size - 1]
+    return out
+
+
+def _rolling(values: np.ndarray, period: int, reducer, **kwargs) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if period < 1:
+        raise ValueError("period must be >= 1")
+    if values.shape[0] >= period:
+        windows = sliding_window_view(values, period, axis=0)
+        out[period - 1:] = reducer(windows, axis=-1, **kwargs)
+    return out
+
+
+def sma(values, period: int) -> np.ndarray:
+    """Simple moving average; NaN until ``period`` observations are available."""
+    return _rolling(as_price_array(values), period, np.mean)
+
+
+def rolling_std(values, period: int, ddof: int = 1) -> np.ndarray:
+    return _rolling(as_price_array(values), period, np.std, ddof=ddof)
+
+
+def rolling_max(values, period: int) -> np.ndarray:
+    return _rolling(as_price_array(values), period, np.max)
+
+
+def rolling_min(values, period: int) -> np.ndarray:
+    return _rolling(as_price_array(values), period, np.min)
+
+
+def ema(values, span: int) -> np.ndarray:
+    """Exponential moving average matching ``pd.Series.ewm(span=span).mean()``.
+
+    Missing values are skipped but still decay older weights (pandas' ``ignore_na=False``).
+    """
+    if span < 1:
+        raise ValueError("span must be >= 1")
+    x = as_price_array(values)
+    present = np.isfinite(x)
+    decay = 1.0 - 2.0 / (span + 1.0)
+    num = _decayed_cumsum(np.where(present, x, 0.0), decay)
+    den = _decayed_cumsum(present.astype(np.float64), decay)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = num / den
+    out[den == 0] = np.nan
+    return out
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    present = np.isfinite(values)
+    return np.where(present.any(axis=0), present.argmax(axis=0), values.shape[0])
+
+
+def _before_first(values: np.ndarray, inclusive: bool = False) -> np.ndarray:
+    """Mask of the rows before (or up to, with ``inclusive``) each column's first finite value."""
+    rows = np.arange(values.shape[0]).reshape((-1,) + (1,) * (values.ndim - 1))
+    first = _first_valid(values)
+    return rows <= first if inclusive else rows < first
+
+
+def _wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder smoothing: seeded with the mean of the first ``period`` values, then ``a = a + (v - a) / period``."""
+    out = np.full(values.shape, np.nan)
+    n = values.shape[0]
+    starts = np.atleast_1d(_first_valid(values))
+    if starts.any():
+        # Columns with a shorter history start later; seed each group from its own first value
+        for start in np.unique(starts[starts < n]):
+            if values.ndim == 1:
+                out[start:] = _wilder(values[start:], period)
+            else:
+                cols = starts == start
+                out[start:, cols] = _wilder(values[start:, cols], period)
+        return out
+    if n < period:
+        return out
+    seed = values[:period].mean(axis=0)
+    out[period - 1] = seed
+    if n > period:
+        decay = 1.0 - 1.0 / period
+        out[period:] = _decayed_cumsum(values[period:] / period, decay, initial=seed)
+    return out
+
+
+def price_changes(close) -> np.ndarray:
+    """Bar-to-bar change with the first bar (and gaps) treated as no change.
+
+    Rows before a column's first price stay NaN, so a late-starting column behaves like
+    its own shorter series.
+    """
+    close = as_price_array(close)
+    delta = np.zeros_like(close)
+    delta[1:] = close[1:] - close[:-1]
+    delta[~np.isfinite(delta)] = 0.0
+    delta[_before_first(close)] = np.nan
+    return delta
+
+
+def rsi(close, period: int = 14, method: str = "sma") -> np.ndarray:
+    """Relative Strength Index.
+
+    ``method="sma"`` averages gains/losses over a rolling window (the SDK's historical
+    formula); ``method="wilder"`` uses Wilder's smoothing.
+    """
+    delta = price_changes(close)
+    missing = np.isnan(delta)
+    gains = np.where(delta > 0, delta, np.where(missing, np.nan, 0.0))
+    losses = np.where(delta < 0, -delta, np.where(missing, np.nan, 0.0))
+    if method == "sma":
+        avg_gain = _rolling(gains, period, np.mean)
+        avg_loss = _rolling(losses, period, np.mean)
+    elif method == "wilder":
+        # Wilder's average starts from the first real change, not the padded first bar
+        first_bar = _before_first(delta, inclusive=True)
+        avg_gain = _wilder(np.where(first_bar, np.nan, gains), period)
+        avg_loss = _wilder(np.where(first_bar, np.nan, losses), period)
+    else:
+        raise ValueError(f"Unknown RSI method: {method}")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = avg_gain / avg_loss
+        return 100.0 - (100.0 / (1.0 + rs))
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9):
+    """Return ``(macd_line, signal_line, histogram)``."""
+    close = as_price_array(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger_bands(close, period: int = 20, num_std: float = 2.0):
+    """Return ``(upper, middle, lower)`` bands around a simple moving average."""
+    close = as_price_array(close)
+    middle = sma(close, period)
+    width = rolling_std(close, period) * num_std
+    return middle + width, middle, middle - width
+
+
+def true_range(high, low, close) -> np.ndarray:
+    high, low, close = as_price_array(high), as_price_array(low), as_price_array(close)
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    # fmax ignores the missing previous close on the first bar
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """Average True Range with Wilder smoothing."""
+    return _wilder(true_range(high, low, close), period)
+
+
+def stochastic(high, low, close, period: int = 14, smooth: int = 3):
+    """Return ``(%K, %D)`` of the stochastic oscillator."""
+    close = as_price_array(close)
+    highest = rolling_max(high, period)
+    lowest = rolling_min(low, period)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        k = 100.0 * (close - lowest) / (highest - lowest)
+    return k, sma(k, smooth)
+
+
+def last_valid(series: np.ndarray):
+    """Last finite value of a series: a float (or None) for 1-D input, a per-column list for 2-D input."""
+    valid = np.isfinite(series)
+    if series.ndim == 1:
+        idx = np.flatnonzero(valid)
+        return float(series[idx[-1]]) if idx.size else None
+    rows = np.arange(series.shape[0])[:, None]
+    last_row = np.where(valid, rows, -1).max(axis=0)
+    cols = np.arange(series.shape[1])
+    values = series[np.maximum(last_row, 0), cols]
+    return [float(v) if r >= 0 else None for v, r in zip(values, last_row)]
+
+
+def compute_indicators(
+    close,
+    high=None,
+    low=None,
+    *,
+    full: bool = False,
+    rsi_period: int = 14,
+    rsi_method: str = "sma",
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+    bb_period: int = 20,
+    bb_std: float = 2.0,
+    sma_period: int = 50,
+    ema_period: int = 20,
+    atr_period: int = 14,
+    stoch_period: int = 14,
+    stoch_smooth: int = 3,
+) -> Dict[str, Any]:
+    """Compute the full indicator set over one price array.
+
+    With ``full=False`` (default) each key maps to the latest defined value, which is the
+    shape ``get_technical_indicators`` has always returned. With ``full=True`` each key maps
+    to the whole NaN-padded series aligned with ``close``. ATR and the stochastic
+    oscillator are only included when ``high`` and ``low`` are provided.
+    """
+    close = as_price_array(close)
+    macd_line, signal_line, hist = macd(close, macd_fast, macd_slow, macd_signal)
+    upper, middle, lower = bollinger_bands(close, bb_period, bb_std)
+    series: Dict[str, np.ndarray] = {
+        "RSI": rsi(close, rsi_period, rsi_method),
+        "MACD": macd_line,
+        "Signal": signal_line,
+        "MACD_HIST": hist,
+        "BOLL_UPPER": upper,
+        "BOLL_MIDDLE": middle,
+        "BOLL_LOWER": lower,
+        "SMA": middle if sma_period == bb_period else sma(close, sma_period),
+        "EMA": ema(close, ema_period),
+    }
+    if high is not None and low is not None:
+        series["ATR"] = atr(high, low, close, atr_period)
+        series["STOCH_K"], series["STOCH_D"] = stochastic(high, low, close, stoch_period, stoch_smooth)
+    if full:
+        return series
+    return {name: last_valid(values) for name, values in series.items()}
+
+
+def latest_indicators(close, high=None, low=None, **params) -> Dict[str, Optional[float]]:
+    """Shortcut for ``compute_indicators(..., full=False)``."""
+    return compute_indicators(close, high, low, full=False, **params)
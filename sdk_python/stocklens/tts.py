@@ -1,20 +1,362 @@
-from gtts import gTTS
+"""Text-to-speech with pluggable engines, background synthesis and a size-capped audio directory.
+
+Engines (``TTSBackend`` subclasses):
+
+- ``Pyttsx3Backend``: offline, through pyttsx3 (eSpeak/SAPI5/NSSpeechSynthesizer), writes WAV.
+- ``EspeakBackend``: offline, through the ``espeak-ng``/``espeak`` command line, writes WAV.
+- ``GTTSBackend``: Google Translate TTS over the network, writes MP3.
+
+``get_backend("auto")`` (the default, or whatever ``STOCKLENS_TTS`` names) picks the first
+offline engine that is installed and falls back to gTTS.
+
+An ``AudioStore`` owns one output directory. Files are named after a hash of the engine and
+the text, so the same summary is only ever synthesized once. ``submit`` returns the file's
+path right away and a single worker thread synthesizes it in the background; ``wait`` blocks
+until it is ready. After each new file the directory is pruned, least recently used first,
+to stay under ``max_bytes``.
+
+While a file is being synthesized, a ``.tts-<name>.pending`` marker sits next to it (and a
+``.tts-<name>.failed`` one holds the error if synthesis fails). Every process using the
+directory, e.g. several gunicorn workers, therefore sees the same ``status``.
+"""
 import os
+import shutil
+import subprocess
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Union
+
+from . import metrics
+from .result_cache import text_digest
+
+EMPTY_SUMMARY = "No summary text available for this stock."
+# A pending marker older than this was left by a process that died mid-synthesis
+PENDING_TIMEOUT = 600.0
+
+
+class TTSBackend:
+    """Base class: write speech for ``text`` to ``path`` (a file ending in ``extension``)."""
+
+    name = "base"
+    extension = "wav"
+    offline = True
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def synthesize(self, text: str, path: str) -> None:
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+    extension = "mp3"
+    offline = False
+
+    def __init__(self, lang: str = "en"):
+        self.lang = lang
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import gtts  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def synthesize(self, text: str, path: str) -> None:
+        from gtts import gTTS
+
+        gTTS(text, lang=self.lang).save(path)
+
+
+class Pyttsx3Backend(TTSBackend):
+    name = "pyttsx3"
+
+    def __init__(self, rate: Optional[int] = None, voice: Optional[str] = None):
+        self.rate = rate
+        self.voice = voice
+        self._engine = None
+        self._lock = threading.Lock()  # pyttsx3 engines are not thread-safe
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import pyttsx3  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def synthesize(self, text: str, path: str) -> None:
+        with self._lock:
+            if self._engine is None:
+                import pyttsx3
+
+                self._engine = pyttsx3.init()
+                if self.rate:
+                    self._engine.setProperty("rate", self.rate)
+                if self.voice:
+                    self._engine.setProperty("voice", self.voice)
+            self._engine.save_to_file(text, path)
+            self._engine.runAndWait()
+
+
+class EspeakBackend(TTSBackend):
+    name = "espeak"
+
+    def __init__(self, voice: str = "en", speed: int = 160, executable: Optional[str] = None):
+        self.voice = voice
+        self.speed = speed
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+
+    @classmethod
+    def available(cls) -> bool:
+        return bool(shutil.which("espeak-ng") or shutil.which("espeak"))
+
+    def synthesize(self, text: str, path: str) -> None:
+        if not self.executable:
+            raise RuntimeError("espeak-ng/espeak is not installed")
+        # Text goes through stdin so it is never parsed as command-line options
+        subprocess.run([self.executable, "-v", self.voice, "-s", str(self.speed), "-w", path, "--stdin"],
+                       input=text.encode("utf-8"), check=True, capture_output=True, timeout=120)
 
-def generate_audio(summary_text, symbol, output_dir="static/audio"):
-    os.makedirs(output_dir, exist_ok=True)
 
-    if not summary_text or summary_text.strip() == "":
-        summary_text = "No summary text available for this stock."
+BACKENDS = {backend.name: backend for backend in (Pyttsx3Backend, EspeakBackend, GTTSBackend)}
 
-    filename = f"{symbol}_{int(time.time())}.mp3"
-    filepath = os.path.join(output_dir, filename)
 
+def get_backend(name: Optional[str] = None) -> TTSBackend:
+    """Instantiate a backend by name; ``auto`` prefers an installed offline engine over gTTS."""
+    name = (name or os.environ.get("STOCKLENS_TTS") or "auto").lower()
+    if name == "auto":
+        for backend in BACKENDS.values():
+            if backend.available():
+                return backend()
+        return GTTSBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend: {name} (choose from {', '.join(BACKENDS)} or auto)")
+    return BACKENDS[name]()
+
+
+class AudioStore:
+    """Content-addressed audio directory with a background synthesis queue.
+
+    ``submit(text)`` returns the path the audio will have and queues synthesis unless the
+    file already exists or is already queued (here or by another process sharing the
+    directory). ``status(name)`` is ``ready``, ``pending``, ``failed`` or ``missing``. Files
+    are written to a temporary name and renamed into place, so a path that exists is
+    always complete.
+    """
+
+    def __init__(self, output_dir: str = "static/audio", backend: Union[TTSBackend, str, None] = None,
+                 max_bytes: Optional[int] = None, workers: int = 1):
+        self.output_dir = output_dir
+        self.backend = backend if isinstance(backend, TTSBackend) else get_backend(backend)
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("STOCKLENS_AUDIO_MAX_MB", "200")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._pending: Dict[str, threading.Event] = {}
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        os.makedirs(output_dir, exist_ok=True)
+
+    def filename(self, text: str) -> str:
+        return f"{self.backend.name}-{text_digest(text)[:24]}.{self.backend.extension}"
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.output_dir, os.path.basename(name))
+
+    def _marker(self, name: str, kind: str) -> str:
+        # Dot-names starting with .tts- are skipped by prune and never served
+        return os.path.join(self.output_dir, f".tts-{os.path.basename(name)}.{kind}")
+
+    def _pending_elsewhere(self, name: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self._marker(name, "pending")) < PENDING_TIMEOUT
+        except OSError:
+            return False
+
+    def _claim(self, name: str) -> bool:
+        # Create the pending marker; False when another process already holds a live one
+        marker = self._marker(name, "pending")
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            return True
+        except FileExistsError:
+            if self._pending_elsewhere(name):
+                return False
+            _touch(marker)  # abandoned by a process that died; take it over
+            return True
+
+    def submit(self, text: str) -> str:
+        """Queue ``text`` for synthesis (if needed) and return its eventual path immediately."""
+        text = text if text and text.strip() else EMPTY_SUMMARY
+        name = self.filename(text)
+        path = self.path(name)
+        with self._lock:
+            if name in self._pending:
+                metrics.inc("audio", outcome="coalesced")
+                return path
+            if os.path.exists(path):
+                metrics.inc("audio", outcome="hit")
+                _touch(path)
+                return path
+            if not self._claim(name):
+                metrics.inc("audio", outcome="coalesced")
+                return path
+            self._failed.pop(name, None)
+            _remove(self._marker(name, "failed"))
+            self._pending[name] = threading.Event()
+        metrics.inc("audio", outcome="queued")
+        self._worker.submit(self._synthesize, name, text)
+        return path
+
+    def synthesize(self, text: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Blocking ``submit``: the finished path, or None if synthesis failed or timed out."""
+        path = self.submit(text)
+        return path if self.wait(os.path.basename(path), timeout) == "ready" else None
+
+    def status(self, name: str) -> str:
+        name = os.path.basename(name)
+        with self._lock:
+            if name in self._pending:
+                return "pending"
+            if name in self._failed:
+                return "failed"
+        if os.path.exists(self.path(name)):
+            return "ready"
+        if self._pending_elsewhere(name):
+            return "pending"
+        return "failed" if os.path.exists(self._marker(name, "failed")) else "missing"
+
+    def error(self, name: str) -> Optional[str]:
+        name = os.path.basename(name)
+        with self._lock:
+            if name in self._failed:
+                return self._failed[name]
+        try:
+            with open(self._marker(name, "failed"), "r", encoding="utf-8") as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    def wait(self, name: str, timeout: Optional[float] = None, poll: float = 0.2) -> str:
+        """Block until ``name`` is no longer pending (or ``timeout`` passes); returns its status.
+
+        A file another process is synthesizing is polled every ``poll`` seconds.
+        """
+        name = os.path.basename(name)
+        with self._lock:
+            event = self._pending.get(name)
+        if event is not None:
+            event.wait(timeout)
+            return self.status(name)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self.status(name)
+            if state != "pending" or (deadline is not None and time.monotonic() >= deadline):
+                return state
+            time.sleep(poll if deadline is None else max(0.0, min(poll, deadline - time.monotonic())))
+
+    def _synthesize(self, name: str, text: str) -> None:
+        path = self.path(name)
+        fd, tmp = tempfile.mkstemp(dir=self.output_dir, prefix=".tts-", suffix="." + self.backend.extension)
+        os.close(fd)
+        error = None
+        try:
+            with metrics.span("generate_audio"):
+                self.backend.synthesize(text, tmp)
+            if not os.path.getsize(tmp):
+                raise RuntimeError("TTS engine produced an empty file")
+            os.replace(tmp, path)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        with self._lock:
+            if error is not None:
+                self._failed[name] = error
+                try:
+                    with open(self._marker(name, "failed"), "w", encoding="utf-8") as fh:
+                        fh.write(error)
+                except OSError:
+                    pass
+            _remove(self._marker(name, "pending"))
+            event = self._pending.pop(name)
+        event.set()
+        if error is None:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete least recently used files until the directory fits in ``max_bytes``; returns files removed."""
+        files = []
+        for entry in os.scandir(self.output_dir):
+            if entry.is_file() and not entry.name.startswith(".tts-"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        with self._lock:
+            pending = set(self._pending)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path) in pending:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def close(self) -> None:
+        self._worker.shutdown(wait=True)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _touch(path: str) -> None:
+    # Reuse counts as a use for the LRU pruning
     try:
-        tts = gTTS(summary_text)
-        tts.save(filepath)
-        return filepath
-    except Exception:
-        return None
+        now = time.time()
+        os.utime(path, (now, now))
+    except OSError:
+        pass
+
+
+_stores: Dict[tuple, AudioStore] = {}
+_stores_lock = threading.Lock()
+
+
+def audio_store(output_dir: str = "static/audio", backend: Optional[str] = None) -> AudioStore:
+    """The shared ``AudioStore`` for ``output_dir`` (one worker queue per directory and engine)."""
+    key = (os.path.abspath(output_dir), backend)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = AudioStore(output_dir, backend)
+        return _stores[key]
+
+
+def generate_audio(summary_text, symbol, output_dir="static/audio", *, backend=None, wait=True):
+    """Speak ``summary_text`` into ``output_dir``; returns the audio file path.
 
+    With ``wait=True`` (default) this blocks until the file exists and returns None if
+    synthesis failed. With ``wait=False`` the path is returned immediately and the file
+    appears once the background worker has written it. ``symbol`` is kept for API
+    compatibility; files are named by content so identical summaries share one file.
+    """
+    store = audio_store(output_dir, backend)
+    if not wait:
+        return store.submit(summary_text)
+    return store.synthesize(summary_text)
@@ -0,0 +1,60 @@
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from stocklens import archive as archive_module  # noqa: E402
+from stocklens.archive import ArticleArchive  # noqa: E402
+
+DAY = datetime(2024, 6, 3, 12, tzinfo=timezone.utc)
+
+
+def _articles(n, prefix="a"):
+    return [{"headline": f"{prefix}{i}", "summary": "", "sentiment": "Positive", "score": 0.5} for i in range(n)]
+
+
+def test_failed_write_keeps_rows_queued(tmp_path, monkeypatch):
+    archive = ArticleArchive(str(tmp_path), buffer_size=1000, flush_interval=3600)
+    archive.write("INFY", _articles(3), DAY)
+    archive.write("TCS", _articles(2), DAY)
+
+    real = archive_module.pq.write_table
+
+    def fail_for_infy(table, path, **kwargs):
+        if "symbol=INFY" in path:
+            raise OSError("disk full")
+        return real(table, path, **kwargs)
+
+    monkeypatch.setattr(archive_module.pq, "write_table", fail_for_infy)
+    with pytest.raises(OSError):
+        archive.flush()
+    monkeypatch.setattr(archive_module.pq, "write_table", real)
+
+    archive.write("INFY", _articles(1, "b"), DAY)
+    assert archive.flush() == 4
+    counts = archive.scan(["symbol"]).to_pandas()["symbol"].value_counts().to_dict()
+    assert counts == {"INFY": 4, "TCS": 2}
+    assert archive.flush() == 0
+
+
+def test_concurrent_flushes_compact_without_losing_rows(tmp_path):
+    archive = ArticleArchive(str(tmp_path), buffer_size=1, flush_interval=3600, max_files=2)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(20):
+                archive.write("INFY", _articles(1, f"{n}-{i}-"), DAY)
+        except Exception as e:  # pragma: no cover - reported by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert archive.scan(["article_hash"]).num_rows == 80
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import PRICE_DIR
+from stocklens.backtest import backtest, backtest_symbol
+from stocklens.providers import LocalFileProvider
+
+
+def test_backtest_symbol_from_csv_fixture():
+    provider = LocalFileProvider(PRICE_DIR)
+    result = backtest_symbol("INFY", period="max", provider=provider)
+
+    assert "error" not in result
+    assert result["symbol"] == "INFY"
+    close = pd.read_csv(f"{PRICE_DIR}/INFY_1d.csv", index_col=0)["Close"].to_numpy(dtype=float)
+    assert len(result["index"]) == len(close) == len(result["score"])
+    expected = backtest(close)
+    np.testing.assert_array_equal(result["label"], expected["label"])
+    assert result["stats"] == expected["stats"]
+
+
+def test_backtest_symbol_without_history():
+    result = backtest_symbol("NOSUCH", provider=LocalFileProvider(PRICE_DIR))
+    assert result == {"symbol": "NOSUCH", "error": "No price history"}
@@ -0,0 +1,45 @@
+import threading
+from types import SimpleNamespace
+
+from stocklens.daemon import WatchlistDaemon
+
+
+class BlockingDaemon(WatchlistDaemon):
+    """Records refreshes instead of running the pipeline; the first one waits for ``release``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def refresh(self, symbol):
+        self.calls.append(symbol)
+        self.started.release()
+        self.release.wait(5)
+        return {"symbol": symbol}
+
+
+def test_refresh_now_during_a_refresh_runs_it_again():
+    daemon = BlockingDaemon(SimpleNamespace(archive=None), ["INFY"], interval=3600).start()
+    try:
+        assert daemon.started.acquire(timeout=5)
+        daemon.refresh_now("INFY")
+        daemon.release.set()
+        assert daemon.started.acquire(timeout=5)
+        assert daemon.calls == ["INFY", "INFY"]
+    finally:
+        daemon.release.set()
+        daemon.stop()
+
+
+def test_refresh_runs_on_its_interval_otherwise():
+    daemon = BlockingDaemon(SimpleNamespace(archive=None), ["INFY"], interval=3600)
+    daemon.release.set()
+    daemon.start()
+    try:
+        assert daemon.started.acquire(timeout=5)
+        assert not daemon.started.acquire(timeout=0.5)
+        assert 3500 < daemon.status()["INFY"]["next_run_in"] <= 3600
+    finally:
+        daemon.stop()
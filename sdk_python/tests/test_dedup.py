@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+from stocklens import dedup
+from stocklens.dedup import SignatureIndex, article_text, clusters, dedupe, shingles, signatures, similarity
+
+INFY = "Infosys shares jump 5% after quarterly profit beats estimates on strong deal wins"
+RELIANCE = "Reliance to raise $2 billion through overseas bond sale, sources say"
+
+
+def _feed():
+    return [
+        {"headline": INFY, "summary": ""},
+        {"headline": RELIANCE, "summary": ""},
+        {"headline": INFY + " - Reuters", "summary": "Infosys reported higher profit."},
+        {"headline": "TCS wins $1 billion contract from UK insurer", "summary": ""},
+        {"headline": "UPDATE 1-" + INFY, "summary": ""},
+        {"headline": "Reliance Industries to raise $2 billion through overseas bond sale, sources say", "summary": ""},
+    ]
+
+
+def _jaccard(a, b):
+    left, right = shingles(article_text(a)), shingles(article_text(b))
+    return len(left & right) / len(left | right)
+
+
+def test_signatures_estimate_jaccard():
+    feed = _feed()
+    estimated = similarity(signatures(feed), signatures(feed))
+    for i, a in enumerate(feed):
+        for j, b in enumerate(feed):
+            assert estimated[i, j] == pytest.approx(_jaccard(a, b), abs=0.2)
+
+
+def test_syndicated_copies_cluster_together():
+    feed = _feed()
+    assert clusters(signatures(feed)) == [[0, 2, 4], [1, 5], [3]]
+
+    reps, sigs = dedupe(feed)
+    assert [r["headline"] for r in reps] == [INFY + " - Reuters", feed[5]["headline"], feed[3]["headline"]]
+    assert [r["duplicates"] for r in reps] == [2, 1, 0]
+    assert len(sigs) == 3
+
+
+def test_empty_texts_are_not_duplicates():
+    assert clusters(signatures(["", "", "Shares slip"])) == [[0], [1], [2]]
+
+
+def test_index_round_trips_through_disk(tmp_path):
+    reps, sigs = dedupe(_feed())
+    for rep, sentiment in zip(reps, ["positive", "neutral", "positive"]):
+        rep.update(sentiment=sentiment, score=0.9)
+    SignatureIndex(str(tmp_path)).add("infy", sigs, reps)
+    assert os.listdir(tmp_path) == ["INFY.json"]
+
+    # A new process: the next run's copies of the same stories reuse the stored sentiment
+    index = SignatureIndex(str(tmp_path))
+    later = [{"headline": "UPDATE 2-" + INFY, "summary": ""}, {"headline": "Wipro names new chief executive", "summary": ""}]
+    reps, _ = dedupe(later, index=index, symbol="INFY")
+    assert reps[0]["seen"] is True and reps[0]["sentiment"] == "positive" and reps[0]["score"] == 0.9
+    assert "seen" not in reps[1]
+
+    index.forget("INFY")
+    assert os.listdir(tmp_path) == []
+    assert SignatureIndex(str(tmp_path)).match("INFY", sigs) == [None] * 3
+
+
+def test_index_drops_expired_and_mismatched_entries(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCKLENS_DEDUP_DIR", str(tmp_path))
+    reps, sigs = dedupe(_feed())
+    SignatureIndex().add("INFY", sigs, reps)
+    path = tmp_path / "INFY.json"
+    stored = json.loads(path.read_text())
+    for entry in stored["entries"][:2]:
+        entry["last_seen"] = 0
+    path.write_text(json.dumps(stored))
+    assert [m is not None for m in SignatureIndex().match("INFY", sigs)] == [False, False, True]
+
+    stored["num_perm"] = dedup.NUM_PERM * 2  # written with other settings: not comparable
+    path.write_text(json.dumps(stored))
+    assert SignatureIndex().match("INFY", sigs) == [None] * 3
+
+
+def test_failed_save_leaves_no_temp_file(tmp_path, monkeypatch):
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    reps, sigs = dedupe(_feed())
+    monkeypatch.setattr(dedup.os, "replace", fail)
+    with pytest.raises(OSError):
+        SignatureIndex(str(tmp_path)).add("INFY", sigs, reps)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,27 @@
+import pytest
+import requests
+
+from stocklens.http_client import CircuitOpenError, HTTPClient
+
+URL = "http://news.invalid/webhook"
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.ChunkedEncodingError, requests.TooManyRedirects,
+                                   requests.exceptions.InvalidURL])
+def test_failed_half_open_trial_lets_the_next_trial_through(monkeypatch, error):
+    client = HTTPClient(retries=0, failure_threshold=1, reset_timeout=0.05)
+    breaker = client.breaker(URL)
+    breaker.record_failure()  # open
+
+    def get(*args, **kwargs):
+        raise error("boom")
+
+    monkeypatch.setattr(client.session, "get", get)
+    with pytest.raises(CircuitOpenError):
+        client.get_json(URL)
+    breaker.opened_at -= 1  # reset_timeout has passed: the next call is the half-open trial
+    with pytest.raises(error):
+        client.get_json(URL)
+    assert breaker.state == "open"  # the trial failed; it must not stay claimed
+    breaker.opened_at -= 1
+    assert breaker.allow()
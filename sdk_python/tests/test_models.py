@@ -0,0 +1,30 @@
+import pytest
+
+import stocklens.sentiment  # noqa: F401  (registers the sentiment models)
+from stocklens import models
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(models, "_factories", {})
+    monkeypatch.setattr(models, "_instances", {})
+    monkeypatch.setattr(models, "_optional", set())
+    return models
+
+
+def test_bare_warmup_skips_optional_models(registry):
+    loaded = []
+    registry.register_model("summarizer", lambda: loaded.append("summarizer") or "bart")
+    registry.register_model("sentiment_classifier", lambda: loaded.append("finbert") or "finbert", default=False)
+
+    registry.warmup()
+    assert loaded == ["summarizer"]
+    assert not registry.is_loaded("sentiment_classifier")
+
+    registry.warmup("sentiment_classifier")
+    assert registry.get_model("sentiment_classifier") == "finbert"
+
+
+def test_finbert_is_optional():
+    assert "sentiment_classifier" in models._optional
+    assert "sentiment_lexicon" not in models._optional
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from stocklens import pipeline
+from stocklens.pipeline import Pipeline, Stage, StageTimeout
+from stocklens.result_cache import ResultCache
+
+
+def _boom(ctx):
+    raise ValueError("upstream down")
+
+
+def test_stages_run_after_their_requirements():
+    seen = []
+    p = Pipeline([
+        Stage("total", lambda ctx: ctx["a"] + ctx["b"], ["a", "b"]),
+        Stage("a", lambda ctx: ctx["x"] * 2),
+        Stage("b", lambda ctx: ctx["x"] + 1),
+    ])
+    ctx = p.run({"x": 3}, ["total"], on_stage=lambda name, value: seen.append(name))
+    assert ctx["total"] == 10
+    assert seen[-1] == "total" and sorted(seen[:2]) == ["a", "b"]
+
+
+def test_inputs_named_like_a_stage_skip_it():
+    p = Pipeline([Stage("a", _boom), Stage("b", lambda ctx: ctx["a"] + 1, ["a"])])
+    assert p.run({"a": 1}, ["b"])["b"] == 2
+
+
+def test_optional_failure_stores_none_and_dependents_run():
+    p = Pipeline([
+        Stage("news", _boom, optional=True),
+        Stage("prices", lambda ctx: 100),
+        Stage("analysis", lambda ctx: (ctx["prices"], ctx["news"]), ["prices", "news"]),
+    ])
+    ctx = p.run({}, ["analysis"])
+    assert ctx["analysis"] == (100, None)
+    assert ctx["_errors"] == {"news": "ValueError: upstream down"}
+
+
+def test_required_failure_is_raised():
+    p = Pipeline([Stage("news", _boom), Stage("summary", lambda ctx: "s", ["news"])])
+    with pytest.raises(ValueError, match="upstream down"):
+        p.run({}, ["summary"])
+
+
+def test_graph_errors():
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([Stage("a", _boom, ["b"]), Stage("b", _boom, ["a"])])
+    with pytest.raises(ValueError, match="unknown"):
+        Pipeline([Stage("a", _boom, ["missing"])])
+
+
+def test_cached_stage_runs_once():
+    calls = []
+    cache = ResultCache()
+    stage = Stage("summary", lambda ctx: calls.append(1) or "text", cache=cache, key=lambda ctx: ctx["digest"],
+                  cache_if=lambda value: value != "failed")
+    p = Pipeline([stage])
+    assert p.run({"digest": "d1"})["summary"] == "text"
+    assert p.run({"digest": "d1"})["summary"] == "text"
+    assert len(calls) == 1
+
+
+def test_timeouts():
+    release = threading.Event()
+
+    def slow(ctx):
+        release.wait(5)
+        return "late"
+
+    try:
+        required = Pipeline([Stage("news", slow, timeout=0.05)])
+        with pytest.raises(StageTimeout):
+            required.run({})
+        optional = Pipeline([Stage("news", slow, timeout=0.05, optional=True), Stage("prices", lambda ctx: 1)])
+        start = time.monotonic()
+        ctx = optional.run({})
+        assert time.monotonic() - start < 2
+        assert ctx["news"] is None and ctx["prices"] == 1
+        assert "StageTimeout" in ctx["_errors"]["news"]
+    finally:
+        release.set()
+
+
+def test_stuck_timed_out_stages_do_not_starve_other_pipelines():
+    # More stuck calls than either process-wide pool has threads
+    release = threading.Event()
+    stuck = Pipeline([Stage("news", lambda ctx: release.wait(10), timeout=0.01, optional=True)])
+    untimed = Pipeline([Stage("a", lambda ctx: 1), Stage("b", lambda ctx: 2),
+                        Stage("total", lambda ctx: ctx["a"] + ctx["b"], ["a", "b"])])
+    done = {}
+
+    def run_untimed():
+        done["total"] = untimed.run({})["total"]
+
+    try:
+        for _ in range(40):
+            assert stuck.run({})["news"] is None
+        # Timed stages now wait in the saturated timed pool's queue and time out instead of hanging
+        start = time.monotonic()
+        assert stuck.run({})["news"] is None
+        assert time.monotonic() - start < 2
+        thread = threading.Thread(target=run_untimed, daemon=True)
+        thread.start()
+        thread.join(5)
+        assert done.get("total") == 3
+        assert pipeline.shared_executor() is not pipeline.timed_executor()
+    finally:
+        release.set()
@@ -0,0 +1,89 @@
+import shutil
+import time
+
+import pandas as pd
+
+from benchmarks.fixtures import PRICE_DIR
+from stocklens.providers import LocalFileProvider, PriceProvider, ProviderChain, ProviderScoreboard
+
+
+def _bars(n=30):
+    index = pd.date_range("2024-01-01", periods=n, freq="D")
+    return pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": range(1, n + 1), "Volume": 100.0}, index=index)
+
+
+class FakeProvider(PriceProvider):
+    def __init__(self, name, tickers=(), *, error=None, delay=0.0, batches=False):
+        self.name = name
+        self.tickers = set(tickers)
+        self.error = error
+        self.delay = delay
+        self.batches = batches
+        self.calls = 0
+
+    def fetch(self, ticker, *, period="6mo", interval="1d", start=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return _bars() if ticker in self.tickers else None
+
+
+def test_scoreboard_orders_by_latency_and_failures():
+    board = ProviderScoreboard(failure_penalty=10.0)
+    slow, failing, fast = FakeProvider("slow"), FakeProvider("failing"), FakeProvider("fast")
+    board.record("slow", 2.0, True)
+    board.record("failing", 0.1, False)
+    board.record("fast", 0.1, True)
+    assert [p.name for p in board.order([slow, failing, fast])] == ["fast", "slow", "failing"]
+    assert board.order([FakeProvider("new"), fast])[0].name == "new"  # untried providers go first
+
+
+def test_chain_falls_back_and_demotes_the_failing_provider():
+    broken = FakeProvider("broken", error=TimeoutError("read timed out"))
+    good = FakeProvider("good", {"INFY.NS"})
+    chain = ProviderChain([broken, good])
+    assert chain.fetch("INFY.NS") is not None
+    assert chain.scoreboard.snapshot()["broken"]["failures"] == 1
+    assert chain.scoreboard.order(chain.providers)[0] is good
+    chain.fetch("INFY.NS")
+    assert broken.calls == 1  # now tried after the provider that answers
+
+
+def test_unknown_ticker_is_not_a_provider_failure():
+    first, second = FakeProvider("first", {"INFY.NS"}), FakeProvider("second", {"INFY.NS"})
+    chain = ProviderChain([first, second])
+    for probe in ("INFY.NS.NS", "INFY.NS.BO", "INFY.NS"):
+        chain.fetch(probe)
+    stats = chain.scoreboard.snapshot()
+    assert stats["first"]["failures"] == 0
+    assert "second" not in stats  # never needed
+
+
+def test_miss_counts_when_another_provider_has_the_ticker():
+    stale, full = FakeProvider("stale"), FakeProvider("full", {"TCS.NS"})
+    chain = ProviderChain([stale, full])
+    assert chain.fetch("TCS.NS") is not None
+    stats = chain.scoreboard.snapshot()
+    assert stats["stale"]["failures"] == 1 and stats["full"]["failures"] == 0
+
+
+def test_fetch_many_scores_only_real_misses():
+    partial = FakeProvider("partial", {"A"}, batches=True)
+    full = FakeProvider("full", {"A", "B"}, batches=True)
+    chain = ProviderChain([partial, full])
+    frames = chain.fetch_many(["A", "B", "NOPE"])
+    assert set(frames) == {"A", "B"}
+    stats = chain.scoreboard.snapshot()
+    assert stats["partial"]["failures"] == 1  # lacked B, which "full" had
+    assert stats["full"]["failures"] == 0  # NOPE exists nowhere
+
+
+def test_local_provider_picks_up_a_file_added_later(tmp_path):
+    provider = LocalFileProvider(str(tmp_path), miss_ttl=0.05)
+    assert provider.fetch("INFY", period="max") is None
+    shutil.copy(f"{PRICE_DIR}/INFY_1d.csv", tmp_path / "INFY_1d.csv")
+    assert provider.fetch("INFY", period="max") is None  # the miss is still cached
+    time.sleep(0.1)
+    data = provider.fetch("INFY", period="max")
+    assert data is not None and len(data) > 100
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+import pytest
+
+from stocklens import result_cache
+from stocklens.result_cache import ResultCache, articles_digest
+
+
+def _files(directory, suffix=".json"):
+    return sorted(n for n in os.listdir(directory) if n.endswith(suffix))
+
+
+def test_digest_ignores_order_case_and_whitespace():
+    a = [{"headline": "Profit rises", "summary": "Beat  estimates"}, {"headline": "Shares slip", "summary": ""}]
+    b = [{"headline": "shares slip", "summary": None}, {"headline": " PROFIT rises", "summary": "beat estimates"}]
+    assert articles_digest(a) == articles_digest(b)
+    assert articles_digest(a) != articles_digest(a[:1])
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = ResultCache(ttl=0.05, directory=str(tmp_path))
+    cache.set("k", {"summary": "s"})
+    assert cache.get("k") == {"summary": "s"}
+    assert ResultCache(directory=str(tmp_path)).get("k") == {"summary": "s"}  # shared through the disk layer
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert _files(tmp_path) == []
+
+
+def test_memory_layer_is_an_lru():
+    cache = ResultCache(max_entries=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_prune_drops_expired_then_oldest(tmp_path):
+    cache = ResultCache(ttl=None, directory=str(tmp_path), max_disk_entries=3)
+    for i in range(5):
+        cache.set(f"k{i}", i)
+        path = cache._path(f"k{i}")
+        os.utime(path, (1000 + i, 1000 + i))
+    expired = ResultCache(ttl=0.01, directory=str(tmp_path))
+    expired.set("gone", 0)
+    time.sleep(0.05)
+
+    assert cache.prune() == 3
+    assert _files(tmp_path) == sorted(os.path.basename(cache._path(k)) for k in ("k2", "k3", "k4"))
+
+
+def test_concurrent_prunes_do_not_raise(tmp_path):
+    writer = ResultCache(ttl=None, directory=str(tmp_path), max_disk_entries=1000)
+    for i in range(200):
+        writer.set(f"k{i}", i)
+    caches = [ResultCache(ttl=None, directory=str(tmp_path), max_disk_entries=10) for _ in range(4)]
+    start = threading.Barrier(len(caches))
+    removed, errors = [], []
+
+    def prune(cache):
+        start.wait()
+        try:
+            removed.append(cache.prune())
+        except Exception as e:  # pragma: no cover - reported by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=prune, args=(cache,)) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(_files(tmp_path)) == 10
+    assert sum(removed) == 190
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    cache = ResultCache(directory=str(tmp_path))
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(result_cache.os, "replace", fail)
+    with pytest.raises(OSError):
+        cache.set("k", "v")
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,135 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+
+import pytest
+
+import stocklens.sentiment  # noqa: F401  (registers the real classifier, replaced below)
+from stocklens import models
+from stocklens.serving import InferenceClient, InferenceError, InferenceServer
+
+TEXT = "Shares rose after the company reported higher quarterly profit and raised its annual outlook again"
+
+
+class _Tokenizer:
+    def __call__(self, texts, add_special_tokens=False):
+        if isinstance(texts, str):
+            return {"input_ids": texts.split()}
+        return {"input_ids": [t.split() for t in texts]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+class FakeSummarizer:
+    """Stands in for BART: records each forward pass's batch size."""
+
+    tokenizer = _Tokenizer()
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, inputs, **kwargs):
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        self.batches.append(len(inputs))
+        time.sleep(self.delay)
+        return [{"summary_text": "summary of " + text.split()[0]} for text in inputs]
+
+
+@pytest.fixture
+def summarizer():
+    saved = models._factories["summarizer"]
+    model = FakeSummarizer()
+    models.register_model("summarizer", lambda: model)
+    yield model
+    models.register_model("summarizer", saved)
+
+
+@pytest.fixture
+def broken_classifier():
+    saved = models._factories["sentiment_classifier"]
+
+    def classify(texts, **kwargs):
+        raise ValueError("model failed")
+
+    models.register_model("sentiment_classifier", lambda: classify)
+    yield
+    models.register_model("sentiment_classifier", saved)
+
+
+@pytest.fixture(autouse=True)
+def key_file(tmp_path, monkeypatch):
+    path = tmp_path / "inference.key"
+    monkeypatch.delenv("STOCKLENS_INFERENCE_KEY", raising=False)
+    monkeypatch.setenv("STOCKLENS_INFERENCE_KEY_FILE", str(path))
+    return path
+
+
+@pytest.fixture
+def server():
+    srv = InferenceServer("127.0.0.1:0", max_wait=0.02).start()
+    yield srv
+    srv.close()
+
+
+def _sets(n):
+    return [[{"headline": f"H{i}", "summary": TEXT}] for i in range(n)]
+
+
+def test_concurrent_requests_share_a_batch(summarizer, server):
+    summarizer.delay = 0.05
+    client = InferenceClient(server.address, fallback=False)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda news: client.summarize([news])[0], _sets(8)))
+    assert results == [f"summary of H{i}" for i in range(8)]
+    assert sum(summarizer.batches) == 8
+    assert max(summarizer.batches) > 1
+
+
+def test_close_drops_pooled_connections_and_client_falls_back(summarizer, server):
+    client = InferenceClient(server.address, timeout=None)
+    assert client.summarize(_sets(1)) == ["summary of H0"]
+    assert client.ping()["pid"]
+    server.close()
+
+    done = threading.Event()
+    result = []
+    thread = threading.Thread(target=lambda: (result.append(client.summarize(_sets(1))), done.set()), daemon=True)
+    thread.start()
+    assert done.wait(10), "client hung on a closed worker"
+    assert result == [["summary of H0"]]  # ran in-process
+    assert client.breaker.state == "open"
+
+
+def test_worker_error_closes_half_open_breaker(broken_classifier, server):
+    client = InferenceClient(server.address, retry_after=0.0)
+    client.breaker.record_failure()  # open; retry_after=0 makes the next call the half-open trial
+    with pytest.raises(InferenceError):
+        client.classify(["text"])
+    assert client.breaker.state == "closed"
+    with pytest.raises(InferenceError):
+        client.classify(["text"])  # still sent to the worker, not run in-process
+
+
+def test_loopback_worker_shares_a_private_generated_key(summarizer, server, key_file):
+    assert oct(key_file.stat().st_mode & 0o777) == "0o600"
+    assert len(key_file.read_text()) == 64
+    client = InferenceClient(server.address, fallback=False)
+    assert client.summarize(_sets(1)) == ["summary of H0"]
+
+
+def test_wrong_key_is_rejected(server):
+    client = InferenceClient(server.address, authkey="not-the-key", fallback=False)
+    with pytest.raises(AuthenticationError):
+        client.ping()
+
+
+def test_public_address_needs_an_explicit_key(monkeypatch):
+    with pytest.raises(ValueError, match="STOCKLENS_INFERENCE_KEY"):
+        InferenceServer("0.0.0.0:0")
+    with pytest.raises(ValueError):
+        InferenceClient("10.0.0.5:6011")
+    monkeypatch.setenv("STOCKLENS_INFERENCE_KEY", "secret")
+    assert InferenceClient("10.0.0.5:6011").authkey == b"secret"
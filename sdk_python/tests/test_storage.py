@@ -0,0 +1,114 @@
+import mongomock
+import pymongo
+import pytest
+
+from benchmarks.bench_pipeline import RECORDED_SUMMARY
+from benchmarks.fixtures import articles, news_server, price_provider, symbols
+from stocklens.core import StockLens
+from stocklens.http_client import HTTPClient
+from stocklens.result_cache import ResultCache, articles_digest
+from stocklens.storage import MongoStorage
+
+
+def _mongomock_supports_bulk_upserts():
+    try:
+        mongomock.MongoClient().db.probe.bulk_write([pymongo.UpdateOne({"a": 1}, {"$set": {"a": 1}}, upsert=True)])
+    except TypeError:  # pymongo >= 4.11 passes UpdateOne(sort=...), which mongomock 4.3 does not accept
+        return False
+    return True
+
+
+pytestmark = pytest.mark.skipif(not _mongomock_supports_bulk_upserts(),
+                                reason=f"mongomock {mongomock.__version__} cannot run pymongo {pymongo.version}'s "
+                                       "bulk upserts; install the test extra")
+
+
+@pytest.fixture
+def storage():
+    return MongoStorage(client=mongomock.MongoClient(), buffer_size=1000, flush_interval=3600)
+
+
+def _articles():
+    return [
+        {"headline": "Profit rises", "summary": "Quarterly profit beat estimates", "url": "https://x/1",
+         "sentiment": "Positive", "score": 0.4},
+        {"headline": "Shares slip", "summary": "Stock fell on weak guidance", "sentiment": "Negative", "score": -0.2},
+    ]
+
+
+def test_writes_are_buffered_until_flush(storage):
+    storage.save_article_analysis("infy", _articles())
+    storage.save_summary("INFY", "Summary", None)
+    assert storage.db["articles"].count_documents({}) == 0
+
+    assert storage.flush() == {"articles": 2, "summaries": 1}
+    assert storage.db["articles"].count_documents({"symbol": "INFY"}) == 2
+    assert storage.flush() == {}
+
+
+def test_articles_are_upserted(storage):
+    storage.save_article_analysis("INFY", _articles())
+    storage.flush()
+    first_seen = storage.db["articles"].find_one({"url": "https://x/1"})["timestamp"]
+    rescored = _articles()
+    rescored[0]["score"] = 0.9
+    storage.save_article_analysis("INFY", rescored)
+    storage.flush()
+
+    assert storage.db["articles"].count_documents({}) == 2
+    doc = storage.db["articles"].find_one({"url": "https://x/1"})
+    assert doc["score"] == 0.9 and doc["timestamp"] == first_seen
+    assert [a["headline"] for a in storage.sentiment_history("INFY")]
+
+
+def test_buffer_size_triggers_flush():
+    storage = MongoStorage(client=mongomock.MongoClient(), buffer_size=2, flush_interval=3600)
+    storage.save_article_analysis("INFY", _articles())
+    assert storage.db["articles"].count_documents({}) == 2
+
+
+def test_failed_write_stays_buffered(storage, monkeypatch):
+    storage.save_article_analysis("INFY", _articles())
+    storage.save_summary("INFY", "Summary", None)
+    storage.save_indicators("INFY", {"RSI": 55.0})
+    summaries = storage.db["summaries"]
+    insert_many = summaries.insert_many
+
+    def fail_once(*args, **kwargs):
+        monkeypatch.setattr(summaries, "insert_many", insert_many)
+        raise ConnectionError("primary stepped down")
+
+    monkeypatch.setattr(summaries, "insert_many", fail_once)
+    with pytest.raises(ConnectionError):
+        storage.flush()
+    # The other collections were still written; the failed ops wait for the next flush
+    assert storage.db["articles"].count_documents({}) == 2
+    assert storage.db["indicators"].count_documents({}) == 1
+    assert summaries.count_documents({}) == 0
+
+    assert storage.flush() == {"summaries": 1}
+    assert storage.latest_summary("INFY")["summary_text"] == "Summary"
+
+
+def test_partly_applied_inserts_are_not_retried(storage):
+    storage.save_summary("INFY", "First", None)
+    storage.save_summary("INFY", "Second", None)
+    pending = list(storage._pending["summaries"])
+    storage.db["summaries"].insert_one(dict(pending[0]))  # applied by an earlier, interrupted flush
+    with pytest.raises(Exception):
+        storage.flush()
+    assert storage._pending["summaries"] == []
+    assert storage.db["summaries"].count_documents({}) == 2
+
+
+def test_process_symbols_flushes_when_stopped_early(storage):
+    cache = ResultCache()
+    for symbol in symbols():
+        cache.set("summary:" + articles_digest(articles(symbol)), RECORDED_SUMMARY)
+    sl = StockLens(news_server().url, price_provider=price_provider(), result_cache=cache,
+                   http_client=HTTPClient(retries=0))
+    results = sl.process_symbols(symbols(), max_workers=1, do_tts=False, storage=storage)
+    first = next(results)
+    assert storage.db["articles"].count_documents({}) == 0  # still buffered
+    results.close()
+    assert storage.db["articles"].count_documents({"symbol": first["symbol"]}) == len(first["articles"])
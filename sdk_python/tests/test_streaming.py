@@ -0,0 +1,81 @@
+import json
+import random
+
+import pandas as pd
+import pytest
+
+from stocklens import indicators
+from stocklens.indicators import get_streaming_indicators
+from stocklens.price_cache import PriceCache
+from stocklens.providers import PriceProvider
+from stocklens.streaming import IndicatorState
+
+
+def _bars(n, seed=7):
+    rng = random.Random(seed)
+    price, bars = 100.0, []
+    for day in range(n):
+        price *= 1 + rng.gauss(0, 0.02)
+        spread = abs(rng.gauss(0, 0.01)) * price
+        bars.append((price, 86400.0 * day, price + spread, price - spread))
+    return bars
+
+
+@pytest.mark.parametrize("rsi_method", ["sma", "wilder"])
+def test_revised_bars_match_a_fresh_computation(rsi_method):
+    rng = random.Random(3)
+    final = _bars(120)
+    state = IndicatorState(rsi_method=rsi_method)
+    for close, ts, high, low in final:
+        # The still-forming bar is seen a few times before it settles
+        for _ in range(rng.randint(0, 2)):
+            forming = close * (1 + rng.gauss(0, 0.01))
+            assert state.update(forming, ts, max(high, forming), min(low, forming))
+        if rng.random() < 0.2:
+            state = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+        assert state.update(close, ts, high, low)
+
+    fresh = IndicatorState.from_history(*zip(*final), rsi_method=rsi_method)
+    assert state.bars == fresh.bars == len(final)
+    assert state.values() == pytest.approx(fresh.values())
+    assert list(state.sma.window) == list(fresh.sma.window)
+    assert state.range.highest.queue == fresh.range.highest.queue
+    assert state.range.lowest.queue == fresh.range.lowest.queue
+
+
+def test_revision_needs_the_previous_bar():
+    state = IndicatorState.from_history([1.0, 2.0], [0.0, 1.0])
+    assert state.update(2.5, 1.0)
+    assert state.update(3.0, 1.0)
+    assert not state.update(4.0, 0.0)  # older than the last bar
+    assert state.values() == pytest.approx(IndicatorState.from_history([1.0, 3.0], [0.0, 1.0]).values())
+
+
+class _OneTickerProvider(PriceProvider):
+    retryable = False
+
+    def __init__(self, ticker, n=60):
+        self.ticker = ticker
+        closes = [close for close, _, _, _ in _bars(n)]
+        index = pd.date_range(end=pd.Timestamp.now(tz="UTC").normalize(), periods=n, freq="D")
+        self.data = pd.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": 1.0},
+                                 index=index)
+        self.requests = []
+
+    def fetch(self, ticker, *, period="6mo", interval="1d", start=None):
+        self.requests.append(ticker)
+        return self.data if ticker == self.ticker else None
+
+
+def test_warm_state_on_a_cold_cache_does_not_reprobe_suffixes(tmp_path, monkeypatch):
+    provider = _OneTickerProvider("INFY.NS")
+    result, state = get_streaming_indicators("INFY", provider=provider)
+    assert result["symbol"] == state.symbol == "INFY.NS"
+
+    # A new process: the state was persisted, but neither the memo nor the price cache is warm
+    monkeypatch.setattr(indicators, "_resolved_symbols", {})
+    provider.requests.clear()
+    result, refreshed = get_streaming_indicators("INFY", state, cache=PriceCache(str(tmp_path)), provider=provider)
+    assert refreshed is state and result["symbol"] == "INFY.NS"
+    assert provider.requests == ["INFY.NS"]  # one full download, no INFY.NS.NS probes
+    assert PriceCache(str(tmp_path)).resolve("INFY") == "INFY.NS"
@@ -0,0 +1,43 @@
+import pytest
+
+from stocklens import summarizer
+from stocklens.summarizer import FAILED_SUMMARY, generate_summaries
+
+LONG = "Quarterly profit rose sharply as export orders recovered across every region this year"
+
+
+class FakeTokenizer:
+    def __call__(self, texts, add_special_tokens=False):
+        if isinstance(texts, str):
+            return {"input_ids": list(range(len(texts.split())))}
+        return {"input_ids": [list(range(len(t.split()))) for t in texts]}
+
+
+class FakeModel:
+    tokenizer = FakeTokenizer()
+
+    def __call__(self, inputs, **kwargs):
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        return [{"summary_text": " ".join(text.split()[:3])} for text in inputs]
+
+
+@pytest.fixture(autouse=True)
+def local(monkeypatch):
+    monkeypatch.delenv("STOCKLENS_INFERENCE", raising=False)
+
+
+def test_summaries_come_back_in_order(monkeypatch):
+    monkeypatch.setattr(summarizer, "_summarizer", FakeModel)
+    sets = [[{"headline": LONG, "summary": ""}], [], ["Shares slip"]]
+    assert generate_summaries(sets) == ["Quarterly profit rose", "No relevant news articles found for this stock.",
+                                        "Shares slip"]
+
+
+def test_model_load_failure_is_a_failed_summary(monkeypatch):
+    def broken():
+        raise OSError("weights not found")
+
+    monkeypatch.setattr(summarizer, "_summarizer", broken)
+    assert generate_summaries([[LONG], [], [LONG + " again"]]) == [
+        FAILED_SUMMARY, "No relevant news articles found for this stock.", FAILED_SUMMARY]
+    assert summarizer.generate_summary([LONG]) == FAILED_SUMMARY
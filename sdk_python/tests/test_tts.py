@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+
+import pytest
+
+from stocklens import tts
+from stocklens.tts import AudioStore, TTSBackend
+
+
+class FakeBackend(TTSBackend):
+    """Writes the text as the "audio"; each call waits for ``release`` and fails if ``error`` is set."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.error = None
+        self.calls = 0
+
+    def synthesize(self, text, path):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error:
+            raise RuntimeError(self.error)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+@pytest.fixture
+def store(tmp_path, backend):
+    store = AudioStore(str(tmp_path), backend)
+    yield store
+    backend.release.set()
+    store.close()
+
+
+def test_placeholder_then_ready(store, backend):
+    path = store.submit("Profit rises")
+    name = os.path.basename(path)
+    assert store.status(name) == "pending"
+    assert store.submit("Profit rises") == path  # coalesced, not queued twice
+
+    backend.release.set()
+    assert store.wait(name, timeout=5) == "ready"
+    with open(path, encoding="utf-8") as fh:
+        assert fh.read() == "Profit rises"
+    assert backend.calls == 1
+    assert not [n for n in os.listdir(store.output_dir) if n.startswith(".tts-")]
+
+
+def test_placeholder_then_failed_then_retried(store, backend):
+    backend.error = "engine crashed"
+    name = os.path.basename(store.submit("Shares slip"))
+    backend.release.set()
+    assert store.wait(name, timeout=5) == "failed"
+    assert "engine crashed" in store.error(name)
+
+    backend.error = None
+    store.submit("Shares slip")
+    assert store.wait(name, timeout=5) == "ready"
+    assert store.error(name) is None
+
+
+def test_other_processes_see_the_pending_state(tmp_path, store, backend):
+    # A second store on the same directory stands in for another gunicorn worker
+    other = AudioStore(str(tmp_path), FakeBackend())
+    name = os.path.basename(store.submit("Profit rises"))
+    assert other.status(name) == "pending"
+    assert other.submit("Profit rises") == store.path(name)
+    assert other.backend.calls == 0
+
+    backend.error = "engine crashed"
+    backend.release.set()
+    assert store.wait(name, timeout=5) == "failed"
+    assert other.status(name) == "failed"
+    assert "engine crashed" in other.error(name)
+    other.close()
+
+
+def test_abandoned_pending_marker_expires(tmp_path, store, backend, monkeypatch):
+    name = store.filename("Profit rises")
+    marker = store._marker(name, "pending")
+    open(marker, "w").close()
+    assert store.status(name) == "pending"
+
+    old = time.time() - tts.PENDING_TIMEOUT - 1
+    os.utime(marker, (old, old))
+    assert store.status(name) == "missing"
+    backend.release.set()
+    store.submit("Profit rises")
+    assert store.wait(name, timeout=5) == "ready"